@@ -0,0 +1,166 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmarks for the distinguishability SDPs at increasing scale.
+
+The benchmarks are written for `asv <https://asv.readthedocs.io>`_, which stores the results per
+commit under `.asv/results` so that they can be compared between commits, e.g.::
+
+    asv run HEAD~1..HEAD
+    asv compare HEAD~1 HEAD
+
+Besides the total time (`time_*`) and peak memory (`peakmem_*`) of a solve, the time of each
+phase of the solve recorded in :code:`SolveStats` is tracked separately (`track_*`) so that
+regressions in building or canonicalizing the problem are not hidden by the solver time. Memory
+is not split by phase, `track_peak_memory` only records the peak memory of the solver call.
+"""
+import itertools
+
+import numpy as np
+from toqito.states import gen_bell
+
+from qustop import Ensemble, OptDist, State
+
+# Solves are shared between the phase trackers of a benchmark to avoid solving
+# the same problem once per tracked quantity.
+_STATS_CACHE = {}
+
+
+def bell_ensemble(num_states: int, dim: int, num_copies: int) -> Ensemble:
+    """Ensemble of `num_copies` copies of `num_states` generalized Bell states on ℂ^dim ⊗ ℂ^dim.
+
+    Each copy is appended as another (Alice, Bob) pair so that the systems of Alice remain on the
+    odd labels.
+
+    Raises:
+        ValueError:
+            * If `num_states` exceeds the `dim**2` generalized Bell states.
+    """
+    if num_states > dim**2:
+        raise ValueError(
+            f"The number of states {num_states} is not supported, there are only "
+            f"{dim**2} generalized Bell states on ℂ^{dim} ⊗ ℂ^{dim}."
+        )
+    pairs = list(itertools.product(range(dim), repeat=2))[:num_states]
+    states = []
+    for k_1, k_2 in pairs:
+        rho = gen_bell(k_1, k_2, dim)
+        state = rho
+        for _ in range(num_copies - 1):
+            state = np.kron(state, rho)
+        states.append(State(state, [dim] * 2 * num_copies))
+    return Ensemble(states)
+
+
+class _DistBenchmark:
+    """Common machinery for the distinguishability benchmarks.
+
+    The ensemble is built by :code:`bell_ensemble` from the parameters of the benchmark, and the
+    parameters named in `solver_kwargs` are passed on to :code:`OptDist`.
+    """
+
+    dist_measurement = None
+    timeout = 600
+    processes = 1
+
+    # The values of the ensemble parameters that a benchmark does not vary.
+    defaults = {"dim": 2, "num_copies": 1}
+    solver_kwargs = ()
+
+    def setup(self, *params):
+        params = {**self.defaults, **dict(zip(self.param_names, params))}
+        self.ensemble = bell_ensemble(
+            params["num_states"], params["dim"], params["num_copies"]
+        )
+        self.kwargs = {key: params[key] for key in self.solver_kwargs}
+
+    def solve(self) -> OptDist:
+        res = OptDist(
+            self.ensemble,
+            self.dist_measurement,
+            "min-error",
+            return_optimal_meas=True,
+            **self.kwargs,
+        )
+        res.solve()
+        return res
+
+    def stats(self, *params):
+        key = (type(self).__name__,) + params
+        if key not in _STATS_CACHE:
+            _STATS_CACHE[key] = self.solve().stats
+        return _STATS_CACHE[key]
+
+    def time_solve(self, *params):
+        self.solve()
+
+    def peakmem_solve(self, *params):
+        self.solve()
+
+    def track_build_time(self, *params):
+        return self.stats(*params).build_time
+
+    def track_compile_time(self, *params):
+        return self.stats(*params).compile_time
+
+    def track_solver_time(self, *params):
+        return self.stats(*params).solver_time
+
+    def track_iterations(self, *params):
+        return self.stats(*params).iterations
+
+    def track_num_variables(self, *params):
+        return self.stats(*params).num_variables
+
+    def track_num_constraints(self, *params):
+        return self.stats(*params).num_constraints
+
+    def track_peak_memory(self, *params):
+        return self.stats(*params).peak_memory
+
+    track_build_time.unit = "seconds"
+    track_compile_time.unit = "seconds"
+    track_solver_time.unit = "seconds"
+    track_iterations.unit = "iterations"
+    track_num_variables.unit = "variables"
+    track_num_constraints.unit = "constraints"
+    track_peak_memory.unit = "bytes"
+
+
+class Positive(_DistBenchmark):
+    """Positive (global) measurements over number of states, local dimension, and number of
+    copies."""
+
+    dist_measurement = "pos"
+    params = ([2, 4, 8], [3, 4], [1, 2])
+    param_names = ["num_states", "dim", "num_copies"]
+
+
+class PPT(_DistBenchmark):
+    """PPT measurements over number of states, local dimension, and number of copies."""
+
+    dist_measurement = "ppt"
+    params = ([2, 4], [2, 3], [1, 2])
+    param_names = ["num_states", "dim", "num_copies"]
+
+
+class Separable(_DistBenchmark):
+    """Separable measurements over number of states, local dimension, and level of the
+    hierarchy."""
+
+    dist_measurement = "sep"
+    params = ([2, 4], [2, 3], [1, 2])
+    param_names = ["num_states", "dim", "level"]
+    solver_kwargs = ("level",)
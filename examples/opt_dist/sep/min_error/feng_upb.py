@@ -15,32 +15,29 @@
 import numpy as np
 from toqito.states import basis
 
-from qustop import Ensemble, OptDist, State
+from qustop import Ensemble, OptDist, ProductState
 
-e_0, e_1, e_2, e_3 = basis(4, 0), basis(4, 1), basis(4, 2), basis(4, 3)
+e_0, e_1, e_2, e_3 = (basis(4, i).ravel() for i in range(4))
 
-phi_1 = np.kron(e_0, e_0)
-phi_2 = np.kron(e_1, (e_0 - e_2 + e_3) / np.sqrt(3))
-phi_3 = np.kron(e_2, (e_0 + e_1 - e_3) / np.sqrt(3))
-phi_4 = np.kron(e_3, e_3)
-phi_5 = np.kron((e_1 + e_2 + e_3), (e_0 - e_1 + e_2) / 3)
-phi_6 = np.kron((e_0 - e_2 + e_3), e_2 / np.sqrt(3))
-phi_7 = np.kron((e_0 + e_1 - e_3), e_1 / np.sqrt(3))
-phi_8 = np.kron((e_0 - e_1 + e_2), (e_1 + e_2 + e_3) / 3)
-
-dims = [4, 4]
+# The states of the UPB are products, so only their local vectors are
+# stored. The density matrices are formed when the SDP is constructed.
 ensemble = Ensemble(
     [
-        State(phi_1, dims),
-        State(phi_2, dims),
-        State(phi_3, dims),
-        State(phi_4, dims),
-        State(phi_5, dims),
-        State(phi_6, dims),
-        State(phi_7, dims),
-        State(phi_8, dims),
+        ProductState([e_0, e_0]),
+        ProductState([e_1, (e_0 - e_2 + e_3) / np.sqrt(3)]),
+        ProductState([e_2, (e_0 + e_1 - e_3) / np.sqrt(3)]),
+        ProductState([e_3, e_3]),
+        ProductState([e_1 + e_2 + e_3, (e_0 - e_1 + e_2) / 3]),
+        ProductState([e_0 - e_2 + e_3, e_2 / np.sqrt(3)]),
+        ProductState([e_0 + e_1 - e_3, e_1 / np.sqrt(3)]),
+        ProductState([e_0 - e_1 + e_2, (e_1 + e_2 + e_3) / 3]),
     ]
 )
+
+# The states of a UPB are mutually orthogonal, which is checked on the
+# local vectors.
+assert ensemble.is_mutually_orthogonal
+
 res = OptDist(ensemble, "sep", "min-error", level=2)
 res.solve()
 
@@ -12,19 +12,22 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
-from toqito.states import basis, tile
+import numpy as np
+from toqito.states import basis
 
-from qustop import Ensemble, OptDist, State
+from qustop import Ensemble, OptDist, ProductState
 
-# Construct the corresponding density matrices of the Tiles UPB.
-dims = [3, 3]
+e_0, e_1, e_2 = (basis(3, i).ravel() for i in range(3))
+
+# The states of the Tiles UPB are products, so only their local vectors
+# are stored. The density matrices are formed when the SDP is constructed.
 ensemble = Ensemble(
     [
-        State(tile(0) * tile(0).conj().T, dims),
-        State(tile(1) * tile(1).conj().T, dims),
-        State(tile(2) * tile(2).conj().T, dims),
-        State(tile(3) * tile(3).conj().T, dims),
-        State(tile(4) * tile(4).conj().T, dims),
+        ProductState([e_0, (e_0 - e_1) / np.sqrt(2)]),
+        ProductState([(e_0 - e_1) / np.sqrt(2), e_2]),
+        ProductState([e_2, (e_1 - e_2) / np.sqrt(2)]),
+        ProductState([(e_1 - e_2) / np.sqrt(2), e_0]),
+        ProductState([(e_0 + e_1 + e_2) / np.sqrt(3)] * 2),
     ]
 )
 res = OptDist(ensemble, "sep", "min-error", level=2)
@@ -14,7 +14,13 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from qustop._about import about
-from qustop.core import Ensemble, State
+from qustop.core import (
+    Ensemble,
+    Measurement,
+    ProductState,
+    SolveStats,
+    State,
+)
 from qustop.opt_clone import OptClone
 from qustop.opt_dist import PPT, OptDist, Positive, Separable
 from qustop.opt_exclude import OptExclude
@@ -0,0 +1,271 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Command-line interface for solving ensemble files in batches.
+
+Examples:
+    Distinguish every ensemble in a directory of shards with PPT measurements on four processes:
+
+        $ qustop dist --measurement ppt --method min-error --jobs 4 shards/
+
+    Exclude the states of a few ensemble files and write a JSON summary:
+
+        $ qustop exclude --method min-error -o exclude.jsonl --summary exclude.json a.qens b.qens
+
+    Keep four warm workers listening on a Unix socket for requests of a :code:`ServiceClient`:
+
+        $ qustop serve --address ~/qustop.sock --jobs 4
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import Optional
+
+from qustop.batch.runner import BatchRunner
+from qustop.batch.service import DEFAULT_ADDRESS, SolveService, parse_address
+from qustop.core import Ensemble
+from qustop.io import ResultsLog
+
+SUFFIX = ".qens"
+
+
+def ensemble_paths(paths: list[str]) -> list[str]:
+    """Expands the given files, directories of shards and glob patterns into ensemble files."""
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded += sorted(glob.glob(os.path.join(path, f"*{SUFFIX}")))
+        elif glob.has_magic(path):
+            expanded += sorted(glob.glob(path))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="qustop",
+        description="Solve state distinguishability and exclusion SDPs for ensemble files.",
+    )
+    subparsers = parser.add_subparsers(dest="problem", required=True)
+
+    dist = subparsers.add_parser(
+        "dist", help="Optimal state distinguishability."
+    )
+    dist.add_argument(
+        "--measurement",
+        choices=["pos", "ppt", "sep"],
+        default="pos",
+        help="The class of measurements.",
+    )
+    dist.add_argument(
+        "--method",
+        choices=["min-error", "unambiguous"],
+        default="min-error",
+        help="The distinguishability method.",
+    )
+    dist.add_argument(
+        "--level",
+        type=int,
+        default=2,
+        help="The level of the symmetric extension hierarchy.",
+    )
+
+    exclude = subparsers.add_parser("exclude", help="Optimal state exclusion.")
+    exclude.add_argument(
+        "--measurement",
+        choices=["pos", "ppt", "sep"],
+        default="pos",
+        help="The class of measurements.",
+    )
+    exclude.add_argument(
+        "--method",
+        choices=["min-error", "unambiguous", "worst-case"],
+        default="min-error",
+        help="The exclusion method.",
+    )
+    exclude.add_argument(
+        "--level",
+        type=int,
+        default=2,
+        help="The level of the symmetric extension hierarchy.",
+    )
+
+    for sub in (dist, exclude):
+        sub.add_argument(
+            "paths",
+            nargs="+",
+            help=f"Ensemble files ({SUFFIX}), directories of shards or glob patterns.",
+        )
+        sub.add_argument(
+            "--solver",
+            default="SCS",
+            help="The SDP solver, or auto to choose by problem size.",
+        )
+        sub.add_argument(
+            "--eps", type=float, default=1e-8, help="The solver tolerance."
+        )
+        sub.add_argument(
+            "--time-limit",
+            type=float,
+            help="The number of seconds each solve may take.",
+        )
+        sub.add_argument(
+            "--max-iters",
+            type=int,
+            help="The number of iterations each solve may take.",
+        )
+        sub.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            help="The number of worker processes.",
+        )
+        sub.add_argument(
+            "-o",
+            "--output",
+            default="results.jsonl",
+            help="The JSONL results log, which doubles as the result cache.",
+        )
+        sub.add_argument(
+            "--no-resume",
+            action="store_true",
+            help="Solve every ensemble again instead of skipping those in the log. The new "
+            "results are appended and the earlier ones are kept.",
+        )
+        sub.add_argument(
+            "--save-measurements",
+            action="store_true",
+            help="Store the optimal measurements in .npz files next to the log.",
+        )
+        sub.add_argument(
+            "--summary",
+            help="Write the results of this run as a single JSON document to this path.",
+        )
+
+    serve = subparsers.add_parser(
+        "serve", help="Run a local solve service with warm workers."
+    )
+    serve.add_argument(
+        "--address",
+        default=DEFAULT_ADDRESS,
+        help="The path of the Unix socket, or localhost:port to listen on TCP, "
+        "which requires an authkey.",
+    )
+    serve.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="The number of worker processes.",
+    )
+    serve.add_argument(
+        "--authkey",
+        default=os.environ.get("QUSTOP_AUTHKEY"),
+        help="The key clients have to present, defaults to $QUSTOP_AUTHKEY. Required on TCP, "
+        "generated next to the socket otherwise.",
+    )
+    return parser
+
+
+def serve(args: argparse.Namespace) -> int:
+    """Runs a solve service until it is interrupted."""
+    try:
+        service = SolveService(
+            parse_address(args.address),
+            num_workers=args.jobs,
+            authkey=args.authkey.encode() if args.authkey else None,
+        )
+        service.start()
+    except ValueError as err:
+        print(f"qustop: {err}", file=sys.stderr)
+        return 1
+    print(f"qustop: serving on {service.address}.")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.problem == "serve":
+        return serve(args)
+
+    paths = ensemble_paths(args.paths)
+    if not paths:
+        print("qustop: no ensemble files found.", file=sys.stderr)
+        return 1
+
+    problem_args = (
+        (args.measurement, args.method)
+        if args.problem == "dist"
+        else (args.method,)
+    )
+    problem_kwargs = {
+        "solver": args.solver,
+        "eps": args.eps,
+        "level": args.level,
+        "time_limit": args.time_limit,
+        "max_iters": args.max_iters,
+    }
+    if args.problem == "exclude":
+        problem_kwargs["dist_measurement"] = args.measurement
+
+    runner = BatchRunner(
+        args.problem,
+        *problem_args,
+        log_path=args.output,
+        resume=not args.no_resume,
+        save_measurements=args.save_measurements,
+        num_workers=args.jobs,
+        **problem_kwargs,
+    )
+    runner.run((Ensemble.from_file(path) for path in paths), sources=paths)
+    print(
+        f"qustop: solved {runner.num_solved}, skipped {runner.num_skipped} "
+        f"already in {args.output}."
+    )
+
+    if args.summary:
+        # A log solved again without resume holds several records of a source, of which the
+        # latest is reported.
+        sources = set(paths)
+        latest = {
+            record["source"]: record
+            for record in ResultsLog.read(args.output)
+            if record.get("source") in sources
+        }
+        records = list(latest.values())
+        with open(args.summary, "w") as out:
+            json.dump(
+                {
+                    "problem": args.problem,
+                    "arguments": list(problem_args),
+                    "num_solved": runner.num_solved,
+                    "num_skipped": runner.num_skipped,
+                    "results": records,
+                },
+                out,
+                indent=2,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Resumable batch solving of streams of ensembles."""
+import multiprocessing
+import multiprocessing.pool
+import queue
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import numpy as np
+
+from qustop.core import Ensemble, Measurement
+from qustop.io import ResultsLog
+from qustop.opt_dist import OptDist
+from qustop.opt_exclude import OptExclude
+
+PROBLEMS = {"dist": OptDist, "exclude": OptExclude}
+
+
+def solve_ensemble(
+    problem: str,
+    args: tuple,
+    kwargs: dict[str, Any],
+    index: int,
+    ensemble: Ensemble,
+    save_measurements: bool,
+) -> tuple[dict[str, Any], Optional[dict[str, np.ndarray]]]:
+    """Solves a single ensemble and returns its record and matrices for the results log."""
+    res = PROBLEMS[problem](ensemble, *args, **kwargs)
+    res.solve()
+
+    record = {
+        "fingerprint": ensemble.fingerprint,
+        "index": index,
+        "value": res.value,
+        "stats": res.stats.to_dict() if res.stats is not None else None,
+    }
+    arrays = None
+    if save_measurements and kwargs.get("return_optimal_meas", True):
+        arrays = measurement_arrays(res.measurements)
+        if arrays is None:
+            record["measurements"] = None
+    return record, arrays
+
+
+def measurement_arrays(measurements) -> Optional[dict[str, np.ndarray]]:
+    """Returns the arrays storing the optimal measurements in a results log.
+
+    A :code:`Measurement` is stored in its compact form, which :code:`Measurement.from_arrays`
+    reads back, and other measurements as one `measurement_<i>` matrix per operator. If the
+    solver stopped before producing a measurement, there is nothing to store and `None` is
+    returned.
+    """
+    if isinstance(measurements, Measurement):
+        return measurements.arrays()
+    if any(meas is None for meas in measurements):
+        return None
+    return {
+        f"measurement_{i}": np.asarray(meas)
+        for i, meas in enumerate(measurements)
+    }
+
+
+def _solve_item(item: tuple) -> tuple[dict[str, Any], Optional[dict]]:
+    return solve_ensemble(*item)
+
+
+def imap_bounded(
+    pool: multiprocessing.pool.Pool,
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_pending: int,
+) -> Iterator[Any]:
+    """Yields `func(item)` for each item in the order the results become available.
+
+    Unlike :code:`Pool.imap_unordered`, whose feeder thread reads the whole stream ahead of the
+    workers, at most `max_pending` items are submitted without their result having been yielded,
+    so that the memory used by a long stream is bounded.
+
+    Args:
+        pool: The worker pool.
+        func: The function applied to the items.
+        items: The stream of items.
+        max_pending: The maximal number of items in flight.
+    """
+    done: queue.Queue = queue.Queue()
+
+    def take() -> Any:
+        result, error = done.get()
+        if error is not None:
+            raise error
+        return result
+
+    num_pending = 0
+    for item in items:
+        if num_pending == max_pending:
+            yield take()
+            num_pending -= 1
+        pool.apply_async(
+            func,
+            (item,),
+            callback=lambda result: done.put((result, None)),
+            error_callback=lambda error: done.put((None, error)),
+        )
+        num_pending += 1
+    for _ in range(num_pending):
+        yield take()
+
+
+class BatchRunner:
+    """Solves a stream of ensembles and appends each result to a :code:`ResultsLog`.
+
+    With `resume` enabled, ensembles whose fingerprints are already present in the log are
+    skipped, so an interrupted search continues where it stopped when it is restarted with the
+    same stream.
+    """
+
+    def __init__(
+        self,
+        problem: str,
+        *args: Any,
+        log_path: str,
+        resume: bool = True,
+        save_measurements: bool = False,
+        num_workers: int = 1,
+        **kwargs: Any,
+    ) -> None:
+        """Initializes a batch runner.
+
+        Args:
+            problem: Either "dist" for :code:`OptDist` or "exclude" for :code:`OptExclude`.
+            args: The positional arguments of the problem following the ensemble, e.g.
+                `("ppt", "min-error")` for "dist".
+            log_path: The path of the results log.
+            resume: Whether to skip the ensembles already present in the log. The log is
+                appended to in either case.
+            save_measurements: Whether to store the optimal measurements in `.npz` sidecars.
+            num_workers: The number of worker processes, ensembles are solved in-process if 1.
+            kwargs: The keyword arguments of the problem, e.g. `solver` or `eps`.
+
+        Raises:
+            ValueError:
+                * If `problem` is not supported.
+        """
+        if problem not in PROBLEMS:
+            raise ValueError(
+                f"Problem {problem} not supported. Choose from {tuple(PROBLEMS)}."
+            )
+        self._problem = problem
+        self._args = args
+        self._kwargs = kwargs
+        self._log_path = log_path
+        self._resume = resume
+        self._save_measurements = save_measurements
+        self._num_workers = num_workers
+
+        self._sources: Optional[list[str]] = None
+
+        self.num_solved = 0
+        self.num_skipped = 0
+
+    def run(
+        self,
+        ensembles: Iterable[Ensemble],
+        sources: Optional[list[str]] = None,
+    ) -> int:
+        """Solves every ensemble of the stream not yet in the log and returns the number solved.
+
+        Args:
+            ensembles: The stream of ensembles.
+            sources: An optional name of each ensemble, e.g. the file it was read from, that is
+                recorded with its result.
+        """
+        self._sources = sources
+        with ResultsLog(self._log_path, resume=self._resume) as log:
+            items = self._pending(ensembles, log)
+            if self._num_workers == 1:
+                results = map(_solve_item, items)
+                self._write(results, log)
+            else:
+                # Each worker has a second item queued so that it never waits for the stream.
+                with multiprocessing.Pool(self._num_workers) as pool:
+                    results = imap_bounded(
+                        pool, _solve_item, items, 2 * self._num_workers
+                    )
+                    self._write(results, log)
+        return self.num_solved
+
+    def _pending(self, ensembles: Iterable[Ensemble], log: ResultsLog):
+        """Yields the work items of the ensembles that are not yet in the log."""
+        for index, ensemble in enumerate(ensembles):
+            if ensemble.fingerprint in log:
+                self.num_skipped += 1
+                continue
+            yield (
+                self._problem,
+                self._args,
+                self._kwargs,
+                index,
+                ensemble,
+                self._save_measurements,
+            )
+
+    def _write(self, results, log: ResultsLog) -> None:
+        for record, arrays in results:
+            if self._sources is not None:
+                record["source"] = self._sources[record["index"]]
+            log.write(record, arrays)
+            self.num_solved += 1
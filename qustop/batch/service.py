@@ -0,0 +1,614 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""A long-lived local service solving ensembles on warm worker processes.
+
+Solving a small ensemble takes milliseconds, whereas a fresh process first spends seconds
+importing `cvxpy` and `toqito` and compiling the problem. The service keeps a pool of worker
+processes alive, and each worker keeps a cache of compiled problem templates in which only the
+states are parameters, so that a repeated solve of the same shape skips the compilation.
+
+The messages between clients and the service are pickled, so the service must only be exposed
+to trusted clients on the local machine. It therefore only listens on a Unix socket, or on the
+loopback interface with an `authkey`. The default socket lives in a directory only accessible to
+the user, the socket itself is only accessible to the user, and a Unix socket without an
+`authkey` gets a random one, written to a file next to the socket that only the user can read
+and from which the clients read it.
+"""
+from __future__ import annotations
+
+import ipaddress
+import itertools
+import multiprocessing
+import os
+import socket
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Optional, Union
+
+import cvxpy
+import numpy as np
+
+from qustop.batch.runner import measurement_arrays, solve_ensemble
+from qustop.core import Ensemble, Measurement
+from qustop.core.sdp import partial_transpose, stack_measurements
+from qustop.core.stats import SolveStats, solve_problem
+
+
+def runtime_dir() -> str:
+    """Returns the directory of the default socket, which is private to the user.
+
+    It is a `qustop` directory in `$XDG_RUNTIME_DIR` if it is set, and a directory named after the
+    user id in the temporary directory otherwise.
+    """
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], "qustop")
+    return os.path.join(tempfile.gettempdir(), f"qustop-{os.getuid()}")
+
+
+DEFAULT_ADDRESS = os.path.join(runtime_dir(), "qustop.sock")
+
+# The keyword arguments of :code:`OptDist` that a template can honour.
+TEMPLATE_KWARGS = ("solver", "eps", "verbose", "return_optimal_meas")
+
+Address = Union[str, tuple[str, int]]
+
+
+def parse_address(address: str) -> Address:
+    """Returns a `host:port` string as a TCP address and any other string as a socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host or "localhost", int(port)
+    return address
+
+
+def _is_loopback(host: str) -> bool:
+    """Returns whether every address of `host` is on the loopback interface."""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        return False
+    return all(ipaddress.ip_address(info[4][0]).is_loopback for info in infos)
+
+
+def authkey_path(address: str) -> str:
+    """Returns the path of the file holding the key of the service listening on the socket
+    `address`."""
+    return f"{address}.key"
+
+
+def read_authkey(address: Address) -> Optional[bytes]:
+    """Returns the key written by the service listening on the socket `address`, or `None` if
+    there is none, e.g. for a TCP address."""
+    if not isinstance(address, str) or not os.path.exists(
+        authkey_path(address)
+    ):
+        return None
+    with open(authkey_path(address), "rb") as src:
+        return src.read()
+
+
+def _make_private_dir(path: str) -> None:
+    """Creates the directory `path` accessible to the user only.
+
+    Raises:
+        ValueError:
+            * If `path` exists and is owned by another user or accessible to other users.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise ValueError(
+            f"The directory {path} is not supported, as it is accessible to other users."
+        )
+
+
+def _write_private(path: str, data: bytes) -> None:
+    """Writes `data` to a new file at `path` that only the user can read."""
+    if os.path.lexists(path):
+        os.unlink(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as out:
+        out.write(data)
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Removes the socket at `path` left behind by a service that was killed.
+
+    Raises:
+        ValueError:
+            * If `path` is a file other than a socket.
+            * If a service is listening on the socket.
+    """
+    if not os.path.lexists(path):
+        return
+    if not stat.S_ISSOCK(os.lstat(path).st_mode):
+        raise ValueError(
+            f"The address {path} is not supported, as it is an existing file "
+            f"other than a socket."
+        )
+    with socket.socket(socket.AF_UNIX) as sock:
+        try:
+            sock.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise ValueError(f"A service is already listening on {path}.")
+
+
+class DistTemplate:
+    """The min-error distinguishability SDP with positive or PPT measurements, compiled once for
+    ensembles of a given shape.
+
+    The probabilities and states only enter the objective, which is written as
+    :code:`Re(c)^T Re(vec(M)) + Im(c)^T Im(vec(M))` for the stacked measurements `vec(M)` and the
+    parameter :code:`c = (p_1 vec(ρ_1), ..., p_n vec(ρ_n))`. The problem is therefore DPP, and
+    `cvxpy` reuses its canonicalization when it is solved for another ensemble.
+    """
+
+    def __init__(
+        self,
+        dist_measurement: str,
+        num_states: int,
+        dims: list[int],
+        sys: list[int],
+        solver: str = "SCS",
+        eps: float = 1e-8,
+        verbose: bool = False,
+    ) -> None:
+        """Builds the template.
+
+        Args:
+            dist_measurement: Either "pos" or "ppt".
+            num_states: The number of states of the ensembles.
+            dims: The dimensions of the subsystems.
+            sys: The (1-indexed) subsystems transposed by the PPT constraints.
+            solver: The SDP solver to use.
+            eps: Convergence tolerance.
+            verbose: Overrides the default of hiding the solver output.
+
+        Raises:
+            ValueError:
+                * If `dist_measurement` is not supported.
+        """
+        if dist_measurement not in ("pos", "ppt"):
+            raise ValueError(
+                f"Measurement type {dist_measurement} not supported by templates."
+            )
+        self._solver = solver
+        self._eps = eps
+        self._verbose = verbose
+
+        dim = int(np.prod(dims))
+        self._meas = [
+            cvxpy.Variable((dim, dim), hermitian=True)
+            for _ in range(num_states)
+        ]
+        constraints = [meas >> 0 for meas in self._meas]
+        constraints.append(cvxpy.sum(self._meas) == np.identity(dim))
+        if dist_measurement == "ppt":
+            constraints += [
+                partial_transpose(meas, sys, dims) >> 0 for meas in self._meas
+            ]
+
+        meas_vec = stack_measurements(self._meas)
+        self._coeffs_real = cvxpy.Parameter(num_states * dim**2)
+        self._coeffs_imag = cvxpy.Parameter(num_states * dim**2)
+        objective = cvxpy.Maximize(
+            self._coeffs_real @ cvxpy.real(meas_vec)
+            + self._coeffs_imag @ cvxpy.imag(meas_vec)
+        )
+        self._problem = cvxpy.Problem(objective, constraints)
+
+    @staticmethod
+    def key(dist_measurement: str, ensemble: Ensemble, **kwargs: Any) -> tuple:
+        """Returns the key of the template able to solve the ensemble."""
+        return (
+            dist_measurement,
+            len(ensemble),
+            tuple(ensemble.dims),
+            tuple(ensemble[0].alice_positions),
+            kwargs.get("solver", "SCS"),
+            kwargs.get("eps", 1e-8),
+            kwargs.get("verbose", False),
+        )
+
+    def solve(
+        self, ensemble: Ensemble
+    ) -> tuple[float, list[np.ndarray], SolveStats]:
+        """Solves the template for an ensemble and returns the optimal value, measurements and
+        the statistics of the solve."""
+        build_start = time.perf_counter()
+        coeffs = np.concatenate(
+            [
+                prob * np.asarray(state).flatten(order="F")
+                for prob, state in zip(
+                    ensemble.probs, ensemble.density_matrices
+                )
+            ]
+        )
+        self._coeffs_real.value = coeffs.real
+        self._coeffs_imag.value = coeffs.imag
+
+        opt_val, stats = solve_problem(
+            self._problem,
+            build_start,
+            solver=self._solver,
+            verbose=self._verbose,
+            eps=self._eps,
+        )
+        return opt_val, [meas.value for meas in self._meas], stats
+
+
+# The compiled templates of the current (worker) process.
+_TEMPLATES: dict[tuple, DistTemplate] = {}
+
+
+def template_for(
+    problem: str, args: tuple, kwargs: dict[str, Any], ensemble: Ensemble
+) -> Optional[DistTemplate]:
+    """Returns the cached template of the current process able to solve the request, or `None`
+    if the problem is not covered by a template."""
+    if (
+        problem != "dist"
+        or len(args) != 2
+        or args[0] not in ("pos", "ppt")
+        or args[1] != "min-error"
+        or any(key not in TEMPLATE_KWARGS for key in kwargs)
+    ):
+        return None
+
+    key = DistTemplate.key(args[0], ensemble, **kwargs)
+    if key not in _TEMPLATES:
+        _TEMPLATES[key] = DistTemplate(
+            args[0],
+            len(ensemble),
+            ensemble.dims,
+            ensemble[0].alice_positions,
+            solver=key[4],
+            eps=key[5],
+            verbose=key[6],
+        )
+    return _TEMPLATES[key]
+
+
+def solve_request(
+    problem: str,
+    args: tuple,
+    kwargs: dict[str, Any],
+    index: int,
+    ensemble: Ensemble,
+    save_measurements: bool,
+) -> tuple[dict[str, Any], Optional[dict[str, np.ndarray]]]:
+    """Solves a request with a cached template if there is one, and as :code:`solve_ensemble`
+    does otherwise."""
+    template = template_for(problem, args, kwargs, ensemble)
+    if template is None:
+        return solve_ensemble(
+            problem, args, kwargs, index, ensemble, save_measurements
+        )
+
+    value, measurements, stats = template.solve(ensemble)
+    record = {
+        "fingerprint": ensemble.fingerprint,
+        "index": index,
+        "value": value,
+        "stats": stats.to_dict(),
+    }
+    arrays = None
+    if save_measurements and kwargs.get("return_optimal_meas", True):
+        arrays = measurement_arrays(Measurement.from_operators(measurements))
+    return record, arrays
+
+
+def _init_worker(warmup: bool) -> None:
+    """Loads the solver libraries of a worker by solving a two-qubit template once."""
+    if warmup:
+        from toqito.states import bell
+
+        from qustop.core import State
+
+        solve_request(
+            "dist",
+            ("ppt", "min-error"),
+            {},
+            0,
+            Ensemble([State(bell(i), [2, 2]) for i in range(2)]),
+            False,
+        )
+
+
+class SolveService:
+    """A local service accepting ensemble solve requests and solving them on warm workers.
+
+    Each client connection is served by its own thread, which hands the requests to the worker
+    pool as they arrive and sends each result back as soon as it is available, so that the
+    results of a connection may arrive in any order.
+    """
+
+    def __init__(
+        self,
+        address: Optional[Address] = None,
+        num_workers: int = 1,
+        authkey: Optional[bytes] = None,
+        warmup: bool = True,
+    ) -> None:
+        """Initializes a service. It listens for clients once it is started.
+
+        Args:
+            address: Either the path of a Unix socket or a `(host, port)` pair of the loopback
+                interface. Defaults to :code:`DEFAULT_ADDRESS`.
+            num_workers: The number of worker processes.
+            authkey: A key the clients have to present when connecting, required on TCP. On a
+                Unix socket, a random key is generated if it is `None`.
+            warmup: Whether each worker solves a small problem on start-up to load the solvers.
+
+        Raises:
+            ValueError:
+                * If the host of a TCP address is not on the loopback interface.
+                * If a TCP address is given without an `authkey`.
+        """
+        self._address = address if address is not None else DEFAULT_ADDRESS
+        if not isinstance(self._address, str):
+            # Requests are unpickled, so any client that can connect can run code on the machine.
+            if not _is_loopback(self._address[0]):
+                raise ValueError(
+                    f"The host {self._address[0]} is not supported, the service only "
+                    f"listens on the loopback interface."
+                )
+            if authkey is None:
+                raise ValueError(
+                    "An `authkey` is required to listen on TCP, as every local user can "
+                    "connect to the port."
+                )
+        self._num_workers = num_workers
+        self._authkey = authkey
+        self._authkey_path: Optional[str] = None
+        self._warmup = warmup
+
+        self._pool: Optional[multiprocessing.pool.Pool] = None
+        self._listener: Optional[Listener] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    def __enter__(self) -> SolveService:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def address(self) -> Address:
+        return (
+            self._listener.address
+            if self._listener is not None
+            else self._address
+        )
+
+    def start(self) -> None:
+        """Starts the workers and accepts clients on a background thread.
+
+        Raises:
+            ValueError:
+                * If the socket path is an existing file or the socket of a live service.
+                * If the directory of the default socket is accessible to other users.
+        """
+        if isinstance(self._address, str):
+            if self._address == DEFAULT_ADDRESS:
+                _make_private_dir(os.path.dirname(self._address))
+            _remove_stale_socket(self._address)
+            if self._authkey is None:
+                self._authkey = os.urandom(32)
+                self._authkey_path = authkey_path(self._address)
+                _write_private(self._authkey_path, self._authkey)
+        self._pool = multiprocessing.Pool(
+            self._num_workers,
+            initializer=_init_worker,
+            initargs=(self._warmup,),
+        )
+        self._listener = Listener(self._address, authkey=self._authkey)
+        if isinstance(self._address, str):
+            os.chmod(self._address, 0o600)
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    def serve_forever(self) -> None:
+        """Starts the service and blocks until it is closed."""
+        if self._thread is None:
+            self.start()
+        try:
+            self._closed.wait()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Stops accepting clients and terminates the workers."""
+        if self._listener is None:
+            return
+        self._closed.set()
+        # Connect once so that a blocking `accept` notices the service is closing. The connection
+        # does not wait for the challenge of the key, which is never sent if the accepting thread
+        # already stopped after a failed authentication.
+        try:
+            Client(self._listener.address).close()
+        except OSError:
+            pass
+        self._thread.join()
+        self._listener.close()
+        self._listener = None
+        self._pool.terminate()
+        self._pool.join()
+        if self._authkey_path is not None:
+            os.unlink(self._authkey_path)
+            self._authkey, self._authkey_path = None, None
+
+    def _accept(self) -> None:
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except (EOFError, OSError, multiprocessing.AuthenticationError):
+                continue
+            if self._closed.is_set():
+                conn.close()
+                break
+            threading.Thread(
+                target=self._serve, args=(conn,), daemon=True
+            ).start()
+
+    def _serve(self, conn: Connection) -> None:
+        """Hands the requests of a client to the workers until the client disconnects."""
+        lock = threading.Lock()
+
+        def send(message: tuple) -> None:
+            with lock:
+                try:
+                    conn.send(message)
+                except OSError:
+                    # The client disconnected before its results were ready.
+                    pass
+
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            if message is None:
+                break
+            request_id, request = message
+            self._pool.apply_async(
+                solve_request,
+                request,
+                callback=lambda res, rid=request_id: send((rid, res, None)),
+                error_callback=lambda err, rid=request_id: send(
+                    (rid, None, err)
+                ),
+            )
+        conn.close()
+
+
+class ServiceClient:
+    """A client of a :code:`SolveService`.
+
+    Requests are sent as soon as they are submitted, and their results are returned as
+    :code:`concurrent.futures.Future` objects resolved by a background thread.
+    """
+
+    def __init__(
+        self,
+        address: Optional[Address] = None,
+        authkey: Optional[bytes] = None,
+    ) -> None:
+        """Connects to a service.
+
+        Args:
+            address: The address of the service. Defaults to :code:`DEFAULT_ADDRESS`.
+            authkey: The key of the service. Defaults to the key the service wrote next to its
+                Unix socket.
+        """
+        address = address if address is not None else DEFAULT_ADDRESS
+        self._conn = Client(
+            address,
+            authkey=authkey if authkey is not None else read_authkey(address),
+        )
+        self._ids = itertools.count()
+        self._futures: dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def __enter__(self) -> ServiceClient:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def submit(
+        self,
+        problem: str,
+        ensemble: Ensemble,
+        *args: Any,
+        save_measurements: bool = False,
+        **kwargs: Any,
+    ) -> Future:
+        """Sends a solve request and returns a future of its record and matrices.
+
+        The future resolves to the same `(record, arrays)` pair as :code:`solve_ensemble`, with
+        the `index` of the record being the number of the request on this client.
+
+        Args:
+            problem: Either "dist" for :code:`OptDist` or "exclude" for :code:`OptExclude`.
+            ensemble: The ensemble to solve.
+            args: The positional arguments of the problem following the ensemble.
+            save_measurements: Whether the optimal measurements are returned.
+            kwargs: The keyword arguments of the problem, e.g. `solver` or `eps`.
+        """
+        future: Future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._futures[request_id] = future
+            self._conn.send(
+                (
+                    request_id,
+                    (
+                        problem,
+                        args,
+                        kwargs,
+                        request_id,
+                        ensemble,
+                        save_measurements,
+                    ),
+                )
+            )
+        return future
+
+    def solve(
+        self, problem: str, ensemble: Ensemble, *args: Any, **kwargs: Any
+    ) -> dict[str, Any]:
+        """Solves an ensemble and returns its record, blocking until it is available."""
+        return self.submit(problem, ensemble, *args, **kwargs).result()[0]
+
+    def close(self) -> None:
+        """Waits for the pending results and disconnects from the service."""
+        with self._lock:
+            pending = list(self._futures.values())
+        for future in pending:
+            future.exception()
+        self._conn.send(None)
+        self._reader.join()
+        self._conn.close()
+
+    def _read(self) -> None:
+        while True:
+            try:
+                request_id, result, error = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._futures.pop(request_id)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        with self._lock:
+            pending, self._futures = list(self._futures.values()), {}
+        for future in pending:
+            future.set_exception(
+                ConnectionError("The connection to the service was closed.")
+            )
@@ -0,0 +1,86 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+
+import numpy as np
+from toqito.states import bell
+
+from qustop import Ensemble, State
+from qustop.batch.cli import ensemble_paths, main
+from qustop.io import ResultsLog, write_ensemble
+
+
+def write_shards(directory):
+    """Writes three ensemble files of Bell states to `directory`."""
+    for num_states in [2, 3, 4]:
+        ensemble = Ensemble(
+            [State(bell(i), [2, 2]) for i in range(num_states)]
+        )
+        write_ensemble(str(directory / f"bell_{num_states}.qens"), ensemble)
+
+
+def test_cli_dist_directory(tmp_path):
+    """Every shard of a directory is solved and a second run uses the cache."""
+    write_shards(tmp_path)
+    log = str(tmp_path / "results.jsonl")
+    summary = str(tmp_path / "summary.json")
+
+    args = ["dist", "--measurement", "ppt", "-o", log, str(tmp_path)]
+    assert main(args + ["--summary", summary]) == 0
+    with open(summary) as src:
+        results = json.load(src)["results"]
+    values = {
+        rec["source"].rsplit("_", 1)[-1]: rec["value"] for rec in results
+    }
+    np.testing.assert_allclose(
+        [values["2.qens"], values["3.qens"], values["4.qens"]],
+        [1, 2 / 3, 1 / 2],
+        atol=1e-6,
+    )
+
+    assert main(args + ["--summary", summary]) == 0
+    with open(summary) as src:
+        summary_doc = json.load(src)
+    assert summary_doc["num_solved"] == 0
+    assert summary_doc["num_skipped"] == 3
+    assert len(list(ResultsLog.read(log))) == 3
+
+    # Solving again without resume keeps the earlier records in the log.
+    assert main(args + ["--no-resume", "--summary", summary]) == 0
+    with open(summary) as src:
+        summary_doc = json.load(src)
+    assert summary_doc["num_solved"] == 3
+    assert len(summary_doc["results"]) == 3
+    assert len(list(ResultsLog.read(log))) == 6
+
+
+def test_cli_exclude_jobs(tmp_path):
+    """Exclusion problems can be solved by several worker processes."""
+    write_shards(tmp_path)
+    log = str(tmp_path / "exclude.jsonl")
+    pattern = str(tmp_path / "bell_*.qens")
+
+    assert main(["exclude", "--jobs", "2", "-o", log, pattern]) == 0
+    values = [rec["value"] for rec in ResultsLog.read(log)]
+    np.testing.assert_allclose(values, [0, 0, 0], atol=1e-6)
+
+
+def test_ensemble_paths(tmp_path):
+    """Directories and glob patterns are expanded into ensemble files."""
+    write_shards(tmp_path)
+    assert len(ensemble_paths([str(tmp_path)])) == 3
+    assert len(ensemble_paths([str(tmp_path / "bell_[23].qens")])) == 2
+    assert main(["dist", str(tmp_path / "missing_*.qens")]) == 1
@@ -0,0 +1,111 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from toqito.states import bell
+
+from qustop import Ensemble, State
+from qustop.batch import BatchRunner
+from qustop.batch.runner import imap_bounded
+from qustop.io import ResultsLog
+from qustop.random import EnsembleSampler
+
+
+def test_batch_runner_resume(tmp_path):
+    """A resumed run only solves the ensembles missing from the log."""
+    path = str(tmp_path / "results.jsonl")
+    sampler = EnsembleSampler("pure", 2, [2], num_ensembles=4, seed=3)
+
+    runner = BatchRunner("dist", "pos", "min-error", log_path=path)
+    assert runner.run(list(sampler)[:2]) == 2
+
+    runner = BatchRunner("dist", "pos", "min-error", log_path=path)
+    assert runner.run(sampler) == 2
+    assert runner.num_skipped == 2
+
+    records = list(ResultsLog.read(path))
+    assert len({rec["fingerprint"] for rec in records}) == 4
+    for rec in records:
+        assert rec["stats"]["status"] == "optimal"
+
+
+def test_batch_runner_saves_measurements(tmp_path):
+    """The optimal measurements are stored next to the log."""
+    path = str(tmp_path / "results.jsonl")
+    ensemble = Ensemble([State(bell(i), [2, 2]) for i in range(4)])
+
+    runner = BatchRunner(
+        "exclude", "min-error", log_path=path, save_measurements=True
+    )
+    runner.run([ensemble])
+
+    with ResultsLog(path) as log:
+        arrays = log.arrays(ensemble.fingerprint)
+    np.testing.assert_allclose(sum(arrays.values()), np.identity(4), atol=1e-6)
+
+
+def test_batch_runner_limit_without_measurements(tmp_path):
+    """A solve stopped before producing a measurement is logged without a sidecar."""
+    path = str(tmp_path / "results.jsonl")
+    ensemble = Ensemble([State(bell(i), [2, 2]) for i in range(2)])
+
+    runner = BatchRunner(
+        "dist",
+        "ppt",
+        "min-error",
+        log_path=path,
+        save_measurements=True,
+        solver="CVXOPT",
+        max_iters=1,
+    )
+    runner.run([ensemble])
+
+    (record,) = ResultsLog.read(path)
+    assert record["value"] is None
+    assert record["measurements"] is None
+    assert "arrays" not in record
+    assert not os.path.exists(f"{path}.arrays")
+
+
+def test_batch_runner_workers(tmp_path):
+    """Ensembles can be solved by a pool of worker processes."""
+    path = str(tmp_path / "results.jsonl")
+    sampler = EnsembleSampler("pure", 2, [2], num_ensembles=3, seed=4)
+
+    runner = BatchRunner(
+        "dist", "pos", "min-error", log_path=path, num_workers=2
+    )
+    assert runner.run(sampler) == 3
+    assert sorted(rec["index"] for rec in ResultsLog.read(path)) == [0, 1, 2]
+
+
+def test_imap_bounded():
+    """Only a bounded number of items of the stream is read ahead of the results."""
+    produced = []
+
+    def stream():
+        for _ in range(12):
+            produced.append(None)
+            yield 0.02
+
+    with multiprocessing.Pool(2) as pool:
+        results = imap_bounded(pool, time.sleep, stream(), 4)
+        next(results)
+        assert len(produced) <= 5
+        assert len(list(results)) == 11
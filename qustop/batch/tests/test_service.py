@@ -0,0 +1,171 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import multiprocessing
+import os
+import socket
+import stat
+
+import numpy as np
+from toqito.states import bell
+
+from qustop import Ensemble, Measurement, OptDist, State
+from qustop.batch import service
+from qustop.batch.service import (
+    DistTemplate,
+    ServiceClient,
+    SolveService,
+    parse_address,
+    runtime_dir,
+    solve_request,
+)
+
+
+def bell_ensemble(num_states, probs=None):
+    return Ensemble([State(bell(i), [2, 2]) for i in range(num_states)], probs)
+
+
+def test_dist_template_matches_opt_dist():
+    """A template solved for several ensembles agrees with `OptDist` on each of them."""
+    template = DistTemplate("ppt", 3, [2, 2], [1])
+    for probs in [None, [1 / 2, 1 / 4, 1 / 4], [0.6, 0.3, 0.1]]:
+        ensemble = bell_ensemble(3, probs)
+        value, meas, stats = template.solve(ensemble)
+
+        res = OptDist(ensemble, "ppt", "min-error")
+        res.solve()
+        np.testing.assert_allclose(value, res.value, atol=1e-6)
+        np.testing.assert_allclose(sum(meas), np.identity(4), atol=1e-6)
+        assert stats.status == "optimal"
+
+    np.testing.assert_raises(ValueError, DistTemplate, "sep", 3, [2, 2], [1])
+
+
+def test_solve_request_caches_templates():
+    """Requests of the same shape share a template, other problems are solved directly."""
+    service._TEMPLATES.clear()
+    for num_states in [2, 2, 3]:
+        record, arrays = solve_request(
+            "dist",
+            ("pos", "min-error"),
+            {"eps": 1e-7},
+            0,
+            bell_ensemble(num_states),
+            True,
+        )
+        np.testing.assert_allclose(record["value"], 1, atol=1e-5)
+        assert len(Measurement.from_arrays(arrays)) == num_states
+    assert len(service._TEMPLATES) == 2
+
+    record, _ = solve_request(
+        "dist", ("ppt", "unambiguous"), {}, 0, bell_ensemble(4), False
+    )
+    np.testing.assert_allclose(record["value"], 0, atol=1e-6)
+    assert len(service._TEMPLATES) == 2
+
+
+def test_service_round_trip(tmp_path):
+    """Results of the requests of a client are returned by the service."""
+    address = str(tmp_path / "qustop.sock")
+    with SolveService(address, num_workers=2, warmup=False) as server:
+        with ServiceClient(server.address) as client:
+            futures = [
+                client.submit(
+                    "dist", bell_ensemble(num_states), "ppt", "min-error"
+                )
+                for num_states in [2, 3, 4]
+            ]
+            values = [future.result()[0]["value"] for future in futures]
+            np.testing.assert_allclose(values, [1, 2 / 3, 1 / 2], atol=1e-6)
+
+            record = client.solve("exclude", bell_ensemble(2), "min-error")
+            np.testing.assert_allclose(record["value"], 0, atol=1e-6)
+
+            failed = client.submit(
+                "dist", bell_ensemble(2), "bad", "min-error"
+            )
+            np.testing.assert_raises(ValueError, failed.result)
+
+
+def test_parse_address():
+    assert parse_address("localhost:6000") == ("localhost", 6000)
+    assert parse_address(":6000") == ("localhost", 6000)
+    assert parse_address("/tmp/qustop.sock") == "/tmp/qustop.sock"
+
+
+def test_service_tcp_requires_loopback_and_authkey():
+    """Requests are unpickled, so TCP is restricted to the loopback interface with a key."""
+    np.testing.assert_raises(ValueError, SolveService, ("localhost", 0))
+    np.testing.assert_raises(
+        ValueError, SolveService, ("8.8.8.8", 6000), authkey=b"key"
+    )
+    with SolveService(
+        ("127.0.0.1", 0), authkey=b"key", warmup=False
+    ) as server:
+        with ServiceClient(server.address, authkey=b"key") as client:
+            record = client.solve("dist", bell_ensemble(2), "pos", "min-error")
+            np.testing.assert_allclose(record["value"], 1, atol=1e-6)
+
+
+def test_service_socket_path(tmp_path):
+    """Only a stale socket is removed from the address, other files are kept."""
+    address = str(tmp_path / "qustop.sock")
+    with open(address, "w") as out:
+        out.write("data")
+    np.testing.assert_raises(
+        ValueError, SolveService(address, warmup=False).start
+    )
+    with open(address) as src:
+        assert src.read() == "data"
+
+    # A socket bound by a process that was killed is left behind unused.
+    (tmp_path / "qustop.sock").unlink()
+    sock = socket.socket(socket.AF_UNIX)
+    sock.bind(address)
+    sock.close()
+    with SolveService(address, warmup=False) as server:
+        np.testing.assert_raises(
+            ValueError, SolveService(address, warmup=False).start
+        )
+        with ServiceClient(server.address) as client:
+            record = client.solve("dist", bell_ensemble(2), "pos", "min-error")
+            np.testing.assert_allclose(record["value"], 1, atol=1e-6)
+
+
+def test_service_socket_permissions(tmp_path, monkeypatch):
+    """The default socket is created in a private directory, and the socket and its generated
+    key are only accessible to the user."""
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert runtime_dir() == str(tmp_path / "qustop")
+    address = os.path.join(runtime_dir(), "qustop.sock")
+    monkeypatch.setattr(service, "DEFAULT_ADDRESS", address)
+
+    with SolveService(warmup=False) as server:
+        assert server.address == address
+        assert stat.S_IMODE(os.stat(runtime_dir()).st_mode) == 0o700
+        assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+        assert stat.S_IMODE(os.stat(f"{address}.key").st_mode) == 0o600
+
+        with ServiceClient() as client:
+            record = client.solve("dist", bell_ensemble(2), "pos", "min-error")
+            np.testing.assert_allclose(record["value"], 1, atol=1e-6)
+        np.testing.assert_raises(
+            multiprocessing.AuthenticationError,
+            ServiceClient,
+            authkey=b"wrong",
+        )
+    assert not os.path.exists(f"{address}.key")
+
+    os.chmod(runtime_dir(), 0o777)
+    np.testing.assert_raises(ValueError, SolveService(warmup=False).start)
@@ -15,4 +15,7 @@
 
 """Core functionality"""
 from qustop.core.ensemble import Ensemble
+from qustop.core.measurement import Measurement
+from qustop.core.product_state import ProductState, gram_matrix
 from qustop.core.state import State
+from qustop.core.stats import SolveStats
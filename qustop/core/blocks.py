@@ -0,0 +1,107 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Common block-diagonal structure of the density matrices of an ensemble."""
+import multiprocessing
+from typing import Any, Callable, Optional, Sequence
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from qustop.core.ensemble import Ensemble
+from qustop.core.state import State
+
+
+def change_basis(
+    matrices: np.ndarray, basis: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Returns the matrices :code:`U^* M U` in the basis of the columns of the unitary `U`, or
+    the matrices themselves if no basis is given."""
+    matrices = np.asarray(matrices)
+    if basis is None:
+        return matrices
+    return basis.conj().T @ matrices @ basis
+
+
+def block_decomposition(
+    matrices: np.ndarray,
+    basis: Optional[np.ndarray] = None,
+    tol: float = 1e-12,
+) -> list[np.ndarray]:
+    """Returns the indices of the finest common diagonal blocks of the matrices.
+
+    The blocks are the connected components of the graph whose adjacency matrix is the union of
+    the sparsity patterns of the matrices, after the change of basis to the columns of `basis`.
+    Each block is a sorted array of indices, and a single block holds all indices if the
+    matrices have no common block structure.
+
+    Args:
+        matrices: An array of shape `(n, d, d)`.
+        basis: An optional unitary of shape `(d, d)` whose columns are the new basis.
+        tol: Entries below `tol` times the largest absolute entry are treated as zero.
+    """
+    magnitudes = np.abs(change_basis(matrices, basis))
+    pattern = np.any(magnitudes > tol * np.max(magnitudes), axis=0)
+    num_blocks, labels = connected_components(
+        csr_matrix(pattern), directed=False
+    )
+    return [np.flatnonzero(labels == block) for block in range(num_blocks)]
+
+
+def restrict_ensemble(
+    ensemble: Ensemble,
+    block: np.ndarray,
+    basis: Optional[np.ndarray] = None,
+) -> Ensemble:
+    """Returns the ensemble of the diagonal blocks of the states with the given indices.
+
+    The blocks are not normalized, so that the weighted traces of the blocks of a decomposition
+    sum to the ones of the states.
+    """
+    states = change_basis(ensemble.density_matrices, basis)[
+        :, block[:, None], block
+    ]
+    return Ensemble.trusted(
+        [State.trusted(state, [len(block)]) for state in states],
+        ensemble.probs,
+    )
+
+
+def embed_blocks(
+    blocks: Sequence[np.ndarray],
+    indices: Sequence[np.ndarray],
+    basis: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Returns the block-diagonal matrix with the given blocks at the given indices, in the
+    original basis if a basis is given."""
+    dim = sum(len(block_indices) for block_indices in indices)
+    dtype = np.result_type(*blocks, complex if basis is not None else float)
+    mat = np.zeros((dim, dim), dtype=dtype)
+    for block, block_indices in zip(blocks, indices):
+        mat[block_indices[:, None], block_indices] = block
+    if basis is None:
+        return mat
+    return basis @ mat @ basis.conj().T
+
+
+def solve_blocks(
+    solve_block: Callable[[Any], Any], items: list[Any], num_workers: int = 1
+) -> list[Any]:
+    """Returns `solve_block` applied to each item, in worker processes if `num_workers` is
+    larger than 1, in which case `solve_block` and the items must be picklable."""
+    if num_workers == 1 or len(items) == 1:
+        return [solve_block(item) for item in items]
+    with multiprocessing.Pool(min(num_workers, len(items))) as pool:
+        return pool.map(solve_block, items)
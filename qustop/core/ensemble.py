@@ -14,11 +14,16 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 """Ensemble of quantum states."""
-from typing import Optional
+from __future__ import annotations
+
+import hashlib
+from typing import Optional, Sequence
 
 import numpy as np
 from toqito.matrix_ops import vec
 
+from qustop.core.partial import partial_trace_batch, partial_transpose_batch
+from qustop.core.product_state import ProductState, gram_matrix
 from qustop.core.state import State
 
 
@@ -46,6 +51,38 @@ class Ensemble:
         self._states = self._prepare_states(states)
         self._probs = self._prepare_probs(probs)
 
+    @classmethod
+    def trusted(
+        cls, states: Sequence[State], probs: Optional[list[float]] = None
+    ) -> Ensemble:
+        """Creates an ensemble from states that are known to be valid, without validation.
+
+        The states may be any sequence of :code:`State` objects, including one creating them
+        lazily such as the states of an ensemble file.
+
+        Args:
+            states: A sequence of State objects of equal dimension.
+            probs: A vector of associated probabilities, uniform by default.
+        """
+        obj = cls.__new__(cls)
+        obj._states = states
+        obj._probs = (
+            list(probs)
+            if probs is not None
+            else [1 / len(states)] * len(states)
+        )
+        return obj
+
+    @classmethod
+    def from_file(cls, path: str) -> Ensemble:
+        """Opens an ensemble file written by :code:`qustop.io.write_ensemble`.
+
+        The states are memory-mapped and only read from disk when they are accessed.
+        """
+        from qustop.io.ensemble_file import read_ensemble
+
+        return read_ensemble(path)
+
     def __len__(self) -> int:
         return len(self._states)
 
@@ -96,9 +133,31 @@ class Ensemble:
     def density_matrices(self) -> list[np.ndarray]:
         return [state.value for state in self._states]
 
+    @property
+    def fingerprint(self) -> str:
+        """A SHA-256 digest identifying the ensemble by its dimensions, probabilities and states.
+
+        Identical ensembles have the same fingerprint across processes and sessions, which is used
+        to skip ensembles that have already been solved when a search is resumed.
+        """
+        digest = hashlib.sha256()
+        digest.update(np.asarray(self.dims, dtype=np.int64).tobytes())
+        digest.update(np.asarray(self._probs, dtype=np.float64).tobytes())
+        for state in self.density_matrices:
+            digest.update(
+                np.ascontiguousarray(state, dtype=np.complex128).tobytes()
+            )
+        return digest.hexdigest()
+
     @property
     def is_mutually_orthogonal(self) -> bool:
-        """Determines if all states in the ensemble are mutually orthogonal with each other."""
+        """Determines if all states in the ensemble are mutually orthogonal with each other.
+
+        For product states, this is read off the Gram matrix of the local vectors.
+        """
+        if self._is_product:
+            gram = gram_matrix(self._states)
+            return np.allclose(gram - np.diag(np.diag(gram)), 0)
         for i, vec_1 in enumerate(self._states):
             for j, vec_2 in enumerate(self._states):
                 if i != j:
@@ -110,13 +169,94 @@ class Ensemble:
 
     @property
     def is_linearly_independent(self) -> bool:
-        """Determine if all of the states in the ensemble are linearly independent."""
+        """Determine if all of the states in the ensemble are linearly independent.
+
+        For product states, the rank is the one of the matrix :code:`|<ψ_i|ψ_j>|^2` of the inner
+        products :code:`tr(ρ_i ρ_j)`, computed from the local vectors.
+        """
+        if self._is_product:
+            gram = np.abs(gram_matrix(self._states)) ** 2
+            return np.linalg.matrix_rank(gram) == len(self)
         vecs = tuple([vec(state.value) for state in self._states])
         mat = np.array(vecs).T
         if np.alltrue(np.linalg.matrix_rank(mat) == len(vecs)):
             return True
         return False
 
+    @property
+    def _is_product(self) -> bool:
+        return all(isinstance(state, ProductState) for state in self._states)
+
+    def copies(self, num_copies: int) -> Ensemble:
+        """Returns the ensemble of the tensor powers of `num_copies` copies of each state, in the
+        party-grouped order of :code:`State.copies`, with the same probabilities.
+
+        Args:
+            num_copies: The number of copies.
+        """
+        return Ensemble.trusted(
+            [state.copies(num_copies) for state in self._states], self._probs
+        )
+
+    def partial_trace(self, sys: list[int]) -> Ensemble:
+        """Returns the ensemble of the reduced states on the subsystems not in `sys`, with the same
+        probabilities.
+
+        The density matrices are traced out together as one stacked array, and product states are
+        reduced from their local vectors.
+
+        Args:
+            sys: The labels of the subsystems to trace out.
+
+        Raises:
+            ValueError:
+                * If an element of `sys` is not a label of the subsystems.
+        """
+        if self._is_product:
+            return Ensemble.trusted(
+                [state.partial_trace(sys) for state in self._states],
+                self._probs,
+            )
+        positions = self._states[0]._positions(sys)
+        mats = partial_trace_batch(
+            np.array(self.density_matrices), positions, self.dims
+        )
+        kept = [k for k in range(len(self.dims)) if k + 1 not in positions]
+        dims = [self.dims[k] for k in kept]
+        systems = [self.systems[k] for k in kept]
+        return Ensemble.trusted(
+            [State.trusted(mat, dims, systems) for mat in mats], self._probs
+        )
+
+    def partial_transpose(self, sys: list[int]) -> Ensemble:
+        """Returns the ensemble of the partial transposes on the subsystems with the given labels,
+        with the same probabilities.
+
+        The density matrices are transposed together as one stacked array, and product states are
+        transposed from their local vectors. The results are not validated.
+
+        Args:
+            sys: The labels of the transposed subsystems.
+
+        Raises:
+            ValueError:
+                * If an element of `sys` is not a label of the subsystems.
+        """
+        if self._is_product:
+            return Ensemble.trusted(
+                [state.partial_transpose(sys) for state in self._states],
+                self._probs,
+            )
+        mats = partial_transpose_batch(
+            np.array(self.density_matrices),
+            self._states[0]._positions(sys),
+            self.dims,
+        )
+        return Ensemble.trusted(
+            [State.trusted(mat, self.dims, self.systems) for mat in mats],
+            self._probs,
+        )
+
     def swap(self, sub_sys_swap: list[int]) -> None:
         """Performs a swap between two subsystems of each state in the ensemble.
 
@@ -142,7 +282,10 @@ class Ensemble:
                 f"of these values exceed the number of systems in the ensemble."
             )
 
-        # Perform the swap operation on each state in the ensemble.
+        # Perform the swap operation on each state in the ensemble. Lazily created states, such as
+        # those of an ensemble file, are materialized first so that the swap is retained.
+        if not isinstance(self._states, list):
+            self._states = list(self._states)
         [state.swap(sub_sys_swap) for state in self._states]
 
     @staticmethod
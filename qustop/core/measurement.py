@@ -0,0 +1,227 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Measurement object."""
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Optional, Union
+
+import numpy as np
+
+
+class Measurement(Sequence):
+    """A :code:`Measurement` object storing the operators of a POVM compactly.
+
+    The operators are stored either as a single `(M, d, d)` array or, when they are numerically
+    of low rank, as factors `V_i` with :code:`E_i = V_i V_i^*`. The columns of all factors are
+    stored side by side in one `(d, R)` array, so a POVM of `M` rank-one operators takes `M * d`
+    instead of `M * d^2` entries.
+
+    A measurement behaves as a sequence of dense `(d, d)` operators, which are materialized
+    when they are accessed.
+    """
+
+    def __init__(
+        self,
+        operators: Optional[np.ndarray] = None,
+        factors: Optional[np.ndarray] = None,
+        offsets: Optional[np.ndarray] = None,
+    ) -> None:
+        """Initializes a measurement from either its dense operators or its factors.
+
+        Use :code:`from_operators` to choose the representation from the operators.
+
+        Args:
+            operators: The operators as an array of shape `(M, d, d)`.
+            factors: The columns of the factors of all operators as an array of shape `(d, R)`.
+            offsets: The `M + 1` indices delimiting the columns of each factor in `factors`.
+
+        Raises:
+            ValueError:
+                * If neither or both of `operators` and `factors` are given.
+        """
+        if (operators is None) == (factors is None):
+            raise ValueError(
+                "Either the operators or the factors of a measurement must be given."
+            )
+        if factors is not None and offsets is None:
+            raise ValueError(
+                "The offsets of the factors of a measurement must be given."
+            )
+        self._operators = operators
+        self._factors = factors
+        self._offsets = np.asarray(offsets) if offsets is not None else None
+
+    @classmethod
+    def from_operators(
+        cls,
+        operators: Union[np.ndarray, list[np.ndarray]],
+        tol: Optional[float] = 1e-7,
+    ) -> Measurement:
+        """Creates a measurement from its operators, factored if that saves space.
+
+        Eigenvalues below `tol` times the largest eigenvalue of all operators, including the small
+        negative eigenvalues left by a numerical solver, are discarded. Each operator then changes
+        by at most that amount in operator norm.
+
+        Args:
+            operators: The Hermitian operators of the measurement.
+            tol: The relative eigenvalue truncation threshold, the operators are stored densely
+                if `None`.
+        """
+        operators = np.asarray(operators)
+        if tol is None:
+            return cls(operators=operators)
+
+        herm = (operators + operators.conj().swapaxes(1, 2)) / 2
+        eigs, vecs = np.linalg.eigh(herm)
+        keep = eigs > tol * max(np.max(eigs), 0)
+
+        num, dim = operators.shape[:2]
+        if 2 * np.count_nonzero(keep) > num * dim:
+            return cls(operators=operators)
+
+        factors = [
+            vecs[i][:, keep[i]] * np.sqrt(eigs[i][keep[i]]) for i in range(num)
+        ]
+        offsets = np.concatenate([[0], np.cumsum(keep.sum(axis=1))])
+        return cls(factors=np.hstack(factors), offsets=offsets)
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> Measurement:
+        """Creates a measurement from the arrays returned by :code:`arrays`."""
+        if "operators" in arrays:
+            return cls(operators=arrays["operators"])
+        return cls(factors=arrays["factors"], offsets=arrays["offsets"])
+
+    @classmethod
+    def load(cls, path: str) -> Measurement:
+        """Reads a measurement written by :code:`save`."""
+        with np.load(path) as data:
+            return cls.from_arrays(dict(data))
+
+    def __len__(self) -> int:
+        if self._operators is not None:
+            return self._operators.shape[0]
+        return len(self._offsets) - 1
+
+    def __getitem__(self, key: int) -> np.ndarray:
+        if self._operators is not None:
+            return self._operators[key]
+        if isinstance(key, slice):
+            return [self[i] for i in range(len(self))[key]]
+        key = range(len(self))[key]
+        factor = self._factors[:, self._offsets[key] : self._offsets[key + 1]]
+        return factor @ factor.conj().T
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return np.asarray(self.to_array(), dtype=dtype)
+
+    def __str__(self) -> str:
+        kind = "low-rank" if self.is_low_rank else "dense"
+        return (
+            f"Measurement: \n "
+            f"num_outcomes = {len(self)}, \n "
+            f"dim = {self.dim}, \n "
+            f"storage = {kind}, \n "
+            f"nbytes = {self.nbytes}, \n"
+        )
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    @property
+    def dim(self) -> int:
+        if self._operators is not None:
+            return self._operators.shape[1]
+        return self._factors.shape[0]
+
+    @property
+    def is_low_rank(self) -> bool:
+        return self._factors is not None
+
+    @property
+    def ranks(self) -> np.ndarray:
+        """The number of columns of the factor of each operator, or the dimension if dense."""
+        if self._operators is not None:
+            return np.full(len(self), self.dim)
+        return np.diff(self._offsets)
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes of the stored arrays."""
+        if self._operators is not None:
+            return self._operators.nbytes
+        return self._factors.nbytes + self._offsets.nbytes
+
+    def to_array(self) -> np.ndarray:
+        """Returns the operators as a dense array of shape `(M, d, d)`."""
+        if self._operators is not None:
+            return self._operators
+        return np.array([self[i] for i in range(len(self))])
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """Returns the arrays storing the measurement, e.g. for a results log."""
+        if self._operators is not None:
+            return {"operators": self._operators}
+        return {"factors": self._factors, "offsets": self._offsets}
+
+    def save(self, path: str) -> None:
+        """Writes the measurement to an `.npz` file."""
+        np.savez(path, **self.arrays())
+
+    def probabilities(self, states: np.ndarray) -> np.ndarray:
+        """Returns the probability of each outcome for each state.
+
+        Args:
+            states: Either a single ket of shape `(d,)`, kets of shape `(N, d)` or density
+                matrices of shape `(N, d, d)`.
+
+        Returns:
+            An array of shape `(N, M)`, or `(M,)` for a single ket.
+        """
+        states = np.asarray(states)
+        single = states.ndim == 1
+        if single:
+            states = states[None]
+        is_ket = states.ndim == 2
+
+        if self._operators is not None:
+            if is_ket:
+                probs = np.einsum(
+                    "ni,mij,nj->nm", states.conj(), self._operators, states
+                )
+            else:
+                probs = np.einsum("nij,mji->nm", states, self._operators)
+        else:
+            # tr(ρ V V^*) is the sum over the columns v of V of <v|ρ|v>.
+            if is_ket:
+                columns = np.abs(states.conj() @ self._factors) ** 2
+            else:
+                columns = np.einsum(
+                    "ik,nij,jk->nk",
+                    self._factors.conj(),
+                    states,
+                    self._factors,
+                )
+            probs = np.zeros((states.shape[0], len(self)), dtype=columns.dtype)
+            nonempty = np.diff(self._offsets) > 0
+            if np.any(nonempty):
+                probs[:, nonempty] = np.add.reduceat(
+                    columns, self._offsets[:-1][nonempty], axis=1
+                )
+
+        probs = np.real(probs)
+        return probs[0] if single else probs
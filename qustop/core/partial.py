@@ -0,0 +1,70 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Batched partial traces and partial transposes of stacked matrices."""
+from string import ascii_letters
+from typing import Sequence
+
+import numpy as np
+
+
+def partial_transpose_batch(
+    mats: np.ndarray, sys: Sequence[int], dims: Sequence[int]
+) -> np.ndarray:
+    """Returns the partial transpose of each matrix of a stack of shape `(n, d, d)`.
+
+    The row and column axes of the transposed subsystems are exchanged by a single transpose of
+    the reshaped stack.
+
+    Args:
+        mats: The stacked matrices.
+        sys: The (1-indexed) subsystems to transpose.
+        dims: The dimensions of the subsystems.
+    """
+    num, num_sys = mats.shape[0], len(dims)
+    tensor = mats.reshape([num] + list(dims) * 2)
+    axes = list(range(2 * num_sys + 1))
+    for k in sys:
+        axes[k], axes[num_sys + k] = axes[num_sys + k], axes[k]
+    return tensor.transpose(axes).reshape(mats.shape)
+
+
+def partial_trace_batch(
+    mats: np.ndarray, sys: Sequence[int], dims: Sequence[int]
+) -> np.ndarray:
+    """Returns the partial trace of each matrix of a stack of shape `(n, d, d)`.
+
+    The row and column axes of the traced subsystems are contracted by a single `np.einsum` of
+    the reshaped stack.
+
+    Args:
+        mats: The stacked matrices.
+        sys: The (1-indexed) subsystems to trace out.
+        dims: The dimensions of the subsystems.
+    """
+    num, num_sys = mats.shape[0], len(dims)
+    rows = ascii_letters[:num_sys]
+    cols = "".join(
+        row if k + 1 in sys else ascii_letters[num_sys + k]
+        for k, row in enumerate(rows)
+    )
+    kept = [k for k in range(num_sys) if k + 1 not in sys]
+    subscripts = (
+        f"Z{rows}{cols}->Z"
+        + "".join(rows[k] for k in kept)
+        + "".join(cols[k] for k in kept)
+    )
+    dim = int(np.prod([dims[k] for k in kept]))
+    tensor = mats.reshape([num] + list(dims) * 2)
+    return np.einsum(subscripts, tensor).reshape(num, dim, dim)
@@ -0,0 +1,225 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Pure product states stored as their local vectors."""
+from __future__ import annotations
+
+from functools import reduce
+from typing import Optional, Sequence
+
+import numpy as np
+
+from qustop.core.state import State
+
+
+class ProductState(State):
+    """A :code:`ProductState` object representing a pure product state.
+
+    Only the local vectors :code:`|v_k>` of the state :code:`|v_1> ⊗ ... ⊗ |v_m>` are stored.
+    Overlaps, Gram matrices, partial traces and partial transposes are computed from the local
+    vectors in time linear in the number of subsystems, and the global density matrix is only
+    formed when it is accessed, e.g. by an SDP.
+    """
+
+    def __init__(
+        self,
+        vectors: Sequence[np.ndarray],
+        systems: Optional[list[int]] = None,
+    ) -> None:
+        """Initializes a pure product state.
+
+        Args:
+            vectors: The local vector of each subsystem. The local vectors need not be normalized
+                individually, only their tensor product.
+            systems: The labels of the subsystems, `[1, ..., len(vectors)]` by default.
+
+        Raises:
+            ValueError:
+                * If the tensor product of the local vectors is not normalized.
+        """
+        self._vectors = [np.asarray(vector).reshape(-1) for vector in vectors]
+        norm = np.prod([np.linalg.norm(vector) for vector in self._vectors])
+        if not np.isclose(norm, 1):
+            raise ValueError(
+                "The tensor product of the local vectors must be normalized."
+            )
+        self._dims = [len(vector) for vector in self._vectors]
+        self._systems = (
+            list(systems)
+            if systems is not None
+            else list(range(1, len(self._dims) + 1))
+        )
+        self._state: Optional[np.ndarray] = None
+
+    @property
+    def vectors(self) -> list[np.ndarray]:
+        """The local vectors of the subsystems, in the order of :code:`systems`."""
+        return self._vectors
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        dim = int(np.prod(self._dims))
+        return dim, dim
+
+    @property
+    def ket(self) -> np.ndarray:
+        """The global vector of the state as a column vector."""
+        return reduce(np.kron, self._vectors).reshape(-1, 1)
+
+    @property
+    def value(self) -> np.ndarray:
+        """The density matrix of the state, which is formed on first access."""
+        if self._state is None:
+            ket = self.ket
+            self._state = ket @ ket.conj().T
+        return self._state
+
+    @property
+    def is_pure(self) -> bool:
+        return True
+
+    def overlap(self, other: ProductState) -> complex:
+        """Returns the inner product :code:`<self|other>` as the product of the local ones.
+
+        Args:
+            other: A product state with the same dimensions of its subsystems.
+        """
+        return np.prod(
+            [
+                np.vdot(vector, other_vector)
+                for vector, other_vector in zip(self._vectors, other.vectors)
+            ]
+        )
+
+    def partial_trace(self, sys: list[int]) -> State:
+        """Returns the reduced state on the subsystems not in `sys`, which keep their labels.
+
+        The reduced state of a pure product state is the pure product state of the remaining
+        local vectors, scaled by the norms of the traced ones.
+
+        Args:
+            sys: The labels of the subsystems to trace out.
+
+        Raises:
+            ValueError:
+                * If an element of `sys` is not a label of the subsystems.
+        """
+        self._positions(sys)
+        if all(label in sys for label in self._systems):
+            return super().partial_trace(sys)
+        scale = np.prod(
+            [
+                np.linalg.norm(vector)
+                for vector, label in zip(self._vectors, self._systems)
+                if label in sys
+            ]
+        )
+        kept = [k for k, label in enumerate(self._systems) if label not in sys]
+        return ProductState(
+            [self._vectors[k] * (scale if k == kept[0] else 1) for k in kept],
+            [self._systems[k] for k in kept],
+        )
+
+    def partial_transpose(self, sys: list[int]) -> ProductState:
+        """Returns the partial transpose on the subsystems with the given labels.
+
+        The transpose of :code:`|v><v|` is :code:`|v̄><v̄|`, so the partial transpose of a pure
+        product state is the pure product state with the conjugated local vectors.
+
+        Args:
+            sys: The labels of the transposed subsystems.
+
+        Raises:
+            ValueError:
+                * If an element of `sys` is not a label of the subsystems.
+        """
+        self._positions(sys)
+        return ProductState(
+            [
+                vector.conj() if label in sys else vector
+                for vector, label in zip(self._vectors, self._systems)
+            ],
+            self._systems,
+        )
+
+    def kron(self, r_state: State) -> State:
+        """Performs the Kronecker (tensor) product between two states, which is a product state
+        if both are.
+
+        Args:
+            r_state: The state on the right-side of the tensor product.
+        """
+        if isinstance(r_state, ProductState):
+            return ProductState(self._vectors + r_state.vectors)
+        return super().kron(r_state)
+
+    def copies(self, num_copies: int) -> ProductState:
+        """Returns the tensor power of `num_copies` copies of the state in the party-grouped
+        order of :code:`State.copies`, as a product state.
+
+        Args:
+            num_copies: The number of copies.
+        """
+        order, _, systems = self._grouped_copies(num_copies)
+        num_sys = len(self._dims)
+        return ProductState(
+            [self._vectors[axis % num_sys] for axis in order], systems
+        )
+
+    def swap(self, sub_sys_swap: list[int]) -> None:
+        """Performs a swap between two subsystems of the state by exchanging their local vectors.
+
+        Args:
+            sub_sys_swap: A list containing two elements representing the spaces to swap.
+
+        Raises:
+            ValueError:
+                * If length of `sub_sys_swap` is not equal to 2.
+                * If either element of `sub_sys_swap` is not a label of the subsystems.
+        """
+        if len(sub_sys_swap) != 2:
+            raise ValueError(
+                f"The length of the swap vector is {len(sub_sys_swap)}, but must be "
+                f"of length 2."
+            )
+        if any(sys not in self._systems for sys in sub_sys_swap):
+            raise ValueError(
+                f"Cannot swap {sub_sys_swap[0]} with {sub_sys_swap[1]} as one or both "
+                f"of these values exceed the number of systems in the ensemble."
+            )
+        idx_1 = self._systems.index(sub_sys_swap[0])
+        idx_2 = self._systems.index(sub_sys_swap[1])
+        for values in (self._vectors, self._dims, self._systems):
+            values[idx_1], values[idx_2] = values[idx_2], values[idx_1]
+        self._state = None
+
+    def _ket(self, tol: float = 1e-10) -> np.ndarray:
+        return self.ket.reshape(-1)
+
+
+def gram_matrix(states: Sequence[ProductState]) -> np.ndarray:
+    """Returns the Gram matrix :code:`G_ij = <ψ_i|ψ_j>` of pure product states as the entrywise
+    product of the Gram matrices of the local vectors.
+
+    This takes :code:`O(n^2 ∑_k d_k)` operations for `n` states with subsystems of dimensions
+    `d_k`, instead of :code:`O(n^2 ∏_k d_k)` for the global vectors.
+
+    Args:
+        states: Product states with the same dimensions of their subsystems.
+    """
+    gram = np.ones((len(states), len(states)), dtype=complex)
+    for k in range(len(states[0].dims)):
+        local = np.array([state.vectors[k] for state in states])
+        gram *= local.conj() @ local.T
+    return gram
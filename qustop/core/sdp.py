@@ -0,0 +1,313 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Vectorized construction of the affine maps appearing in the state optimization SDPs."""
+import functools
+from typing import Optional, Union
+
+import cvxpy
+import numpy as np
+from scipy import sparse
+from toqito.perms import symmetric_projection
+
+
+def vectorize(matrices: list[np.ndarray]) -> np.ndarray:
+    """Returns the column-major vectorization of each matrix stacked as the rows of an array.
+
+    Args:
+        matrices: A list of square matrices of equal dimension.
+    """
+    return np.array(
+        [np.asarray(matrix).flatten(order="F") for matrix in matrices]
+    )
+
+
+def stack_measurements(meas: list[cvxpy.Expression]) -> cvxpy.Expression:
+    """Stacks the column-major vectorization of each measurement operator into a single vector.
+
+    Args:
+        meas: A list of square measurement operators of equal dimension.
+    """
+    return cvxpy.hstack([cvxpy.vec(m) for m in meas])
+
+
+def inner_product_operator(
+    states: list[np.ndarray],
+    pairs: list[tuple[int, int]],
+    num_measurements: int,
+    weights: Optional[list[float]] = None,
+) -> sparse.csr_matrix:
+    """Returns the linear map taking stacked measurements to a set of trace inner products.
+
+    Row `k` of the operator applied to the output of :code:`stack_measurements` yields
+    :code:`weights[k] * tr(states[j]^* @ meas[i])` where :code:`(j, i) = pairs[k]`.
+
+    Args:
+        states: A list of density matrices.
+        pairs: A list of tuples `(j, i)` pairing the state `j` with the measurement operator `i`.
+        num_measurements: The total number of stacked measurement operators.
+        weights: An optional scaling of each inner product.
+    """
+    vec_states = vectorize(states).conj()
+    dim_sq = vec_states.shape[1]
+    if weights is None:
+        weights = [1] * len(pairs)
+
+    rows, cols, data = [], [], []
+    for k, (j, i) in enumerate(pairs):
+        rows.append(np.full(dim_sq, k))
+        cols.append(np.arange(i * dim_sq, (i + 1) * dim_sq))
+        data.append(weights[k] * vec_states[j])
+
+    if not pairs:
+        return sparse.csr_matrix((0, num_measurements * dim_sq))
+    return sparse.csr_matrix(
+        (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(len(pairs), num_measurements * dim_sq),
+    )
+
+
+def weighted_inner_product(
+    states: list[np.ndarray],
+    weights: list[float],
+    meas_vec: cvxpy.Expression,
+    num_measurements: int,
+    pairs: Optional[list[tuple[int, int]]] = None,
+) -> cvxpy.Expression:
+    """Returns the real part of a weighted sum of trace inner products between states and
+    measurements as a single affine expression.
+
+    By default, this is :code:`∑_i weights[i] * tr(states[i]^* @ meas[i])`. If `pairs` is
+    provided, the sum runs over :code:`weights[k] * tr(states[j]^* @ meas[i])` where
+    :code:`(j, i) = pairs[k]`.
+
+    Args:
+        states: A list of density matrices.
+        weights: The weight of each inner product in the sum.
+        meas_vec: The measurement operators stacked by :code:`stack_measurements`.
+        num_measurements: The total number of stacked measurement operators.
+        pairs: An optional list of tuples `(j, i)` pairing the state `j` with the measurement `i`.
+    """
+    if pairs is None:
+        pairs = [(i, i) for i, _ in enumerate(states)]
+
+    coeffs = inner_product_operator(states, pairs, num_measurements, weights)
+    coeffs = np.asarray(coeffs.sum(axis=0)).ravel()
+    return cvxpy.real(coeffs @ meas_vec)
+
+
+def orthogonality_constraint(
+    states: list[np.ndarray],
+    meas_vec: cvxpy.Expression,
+    num_measurements: int,
+    pairs: Optional[list[tuple[int, int]]] = None,
+) -> list[cvxpy.Constraint]:
+    """Returns the single constraint :code:`tr(states[j]^* @ meas[i]) = 0` over all pairs.
+
+    The returned list is empty if there are no pairs to constrain.
+
+    By default, the pairs consist of each state `j` and each measurement operator `i` associated
+    with a different state, as required for unambiguous discrimination.
+
+    Args:
+        states: A list of density matrices.
+        meas_vec: The measurement operators stacked by :code:`stack_measurements`.
+        num_measurements: The total number of stacked measurement operators.
+        pairs: An optional list of tuples `(j, i)` of states and measurements to be orthogonal.
+    """
+    if pairs is None:
+        pairs = [
+            (j, i)
+            for i, _ in enumerate(states)
+            for j, _ in enumerate(states)
+            if i != j
+        ]
+    if not pairs:
+        return []
+    operator = inner_product_operator(states, pairs, num_measurements)
+
+    # Both the states and the measurement operators are Hermitian, so the imaginary part of each
+    # inner product vanishes identically.
+    return [cvxpy.real(operator @ meas_vec) == 0]
+
+
+@functools.lru_cache(maxsize=None)
+def partial_transpose_operator(
+    dims: tuple[int, ...], sys: tuple[int, ...]
+) -> sparse.csr_matrix:
+    """Returns the permutation matrix `P` such that :code:`vec(X^{T_sys}) = P @ vec(X)`.
+
+    The partial transpose only permutes the entries of a matrix, so the operator is cached and
+    shared between all of the constraints taking the partial transpose over the same systems.
+
+    Args:
+        dims: The dimensions of the subsystems.
+        sys: The (1-indexed) subsystems to transpose.
+    """
+    num_sys, dim = len(dims), int(np.prod(dims))
+
+    # Row-major index of each entry of the matrix, with the row and column
+    # indices of the transposed subsystems exchanged.
+    idx = np.arange(dim * dim).reshape(list(dims) * 2)
+    for k in sys:
+        idx = np.swapaxes(idx, k - 1, num_sys + k - 1)
+    idx = idx.reshape(dim, dim)
+
+    # Convert the row-major source indices to the column-major order of `vec`.
+    src = (idx // dim + (idx % dim) * dim).flatten(order="F")
+    return sparse.csr_matrix(
+        (np.ones(dim * dim), (np.arange(dim * dim), src)),
+        shape=(dim * dim, dim * dim),
+    )
+
+
+def partial_transpose(
+    expr: cvxpy.Expression,
+    sys: Union[int, list[int]],
+    dims: list[int],
+) -> cvxpy.Expression:
+    """Returns the partial transpose of a square `cvxpy` expression as a single affine map.
+
+    Args:
+        expr: A square `cvxpy` expression acting on the subsystems given by `dims`.
+        sys: The (1-indexed) subsystem or subsystems to transpose.
+        dims: The dimensions of the subsystems.
+    """
+    sys = [sys] if isinstance(sys, int) else sys
+    operator = partial_transpose_operator(
+        tuple(int(d) for d in dims), tuple(sorted(set(sys)))
+    )
+    return cvxpy.reshape(operator @ cvxpy.vec(expr), expr.shape, order="F")
+
+
+def common_kernel(states: list[np.ndarray], tol: float = 1e-8) -> np.ndarray:
+    """Returns an orthonormal basis of the intersection of the kernels of the states.
+
+    For positive semidefinite matrices, this is the kernel of their sum.
+
+    Args:
+        states: A list of density matrices of equal dimension.
+        tol: Eigenvalues of the sum below `tol` times the largest are considered to be zero.
+    """
+    total = sum(states)
+    eigs, vecs = np.linalg.eigh(total)
+    return vecs[:, eigs <= tol * max(np.max(eigs), 1)]
+
+
+def kernel_measurements(
+    states: list[np.ndarray], tol: float = 1e-8
+) -> tuple[list[cvxpy.Expression], list[cvxpy.Constraint]]:
+    """Returns measurement operators supported on the kernels of all but one of the states.
+
+    The measurement operator `i` is parametrized as :code:`V_i @ X_i @ V_i^*` where the columns of
+    `V_i` span the common kernel of all states other than `i` and `X_i` is a (smaller) positive
+    semidefinite variable. The operators are orthogonal to all but the `i`-th state by
+    construction, as required for unambiguous discrimination.
+
+    Args:
+        states: A list of density matrices of equal dimension.
+        tol: Tolerance used to determine the kernels of the states.
+    """
+    dim = states[0].shape[0]
+    meas, constraints = [], []
+    for i, _ in enumerate(states):
+        others = [state for j, state in enumerate(states) if j != i]
+        basis = common_kernel(others, tol) if others else np.identity(dim)
+        if basis.shape[1] == 0:
+            meas.append(cvxpy.Constant(np.zeros((dim, dim))))
+            continue
+
+        x_var = cvxpy.Variable((basis.shape[1],) * 2, hermitian=True)
+        constraints.append(x_var >> 0)
+        meas.append(basis @ x_var @ basis.conj().T)
+    return meas, constraints
+
+
+def measurement_variables(
+    states: list[np.ndarray],
+    num_measurements: int,
+    kernel_parametrization: bool = False,
+    tol: float = 1e-8,
+) -> tuple[list[cvxpy.Expression], cvxpy.Expression, list[cvxpy.Constraint]]:
+    """Returns positive semidefinite measurement operators, their stacked vector, and the
+    constraints making them positive semidefinite.
+
+    The operators are stacked into a single vector by :code:`stack_measurements` so that the
+    objective and the unambiguous constraints are each a single affine map of the measurements.
+
+    For unambiguous discrimination, each measurement operator associated with a state must vanish
+    on all other states. With `kernel_parametrization`, the operator of each state is
+    parametrized on the common kernel of the other states by :code:`kernel_measurements`, which
+    enforces this by construction and shrinks the PSD variables. The operators beyond the states,
+    e.g. the inconclusive outcome, are not restricted.
+
+    Args:
+        states: A list of density matrices of equal dimension.
+        num_measurements: The number of measurement operators.
+        kernel_parametrization: Whether the operators of the states are parametrized on the
+            common kernels of the other states.
+        tol: Tolerance used to determine the kernels of the states.
+    """
+    shape = states[0].shape
+    if kernel_parametrization:
+        meas, constraints = kernel_measurements(states, tol)
+    else:
+        meas, constraints = [], []
+    while len(meas) < num_measurements:
+        meas.append(cvxpy.Variable(shape, hermitian=True))
+        constraints.append(meas[-1] >> 0)
+    return meas, stack_measurements(meas), constraints
+
+
+def symmetric_extension(
+    meas: cvxpy.Expression, dims: list[int], level: int
+) -> tuple[cvxpy.Variable, list[cvxpy.Constraint]]:
+    """Returns a PPT symmetric extension of a bipartite operator and the constraints defining it.
+
+    The extension `X` acts on :code:`X_1 ⊗ Y_1 ⊗ ... ⊗ Y_level`, is invariant under the symmetric
+    projection on the copies of `Y` and reduces to `meas` on :code:`X_1 ⊗ Y_1`. This is the
+    relaxation of separability used by the symmetric extension hierarchy.
+
+    Args:
+        meas: A square `cvxpy` expression acting on two subsystems.
+        dims: The dimensions of the two subsystems.
+        level: The number of copies of the second subsystem.
+    """
+    dim_x, dim_y = (int(d) for d in dims)
+    dim_list = [dim_x] + [dim_y] * level
+    dim_ext = int(np.prod(dim_list))
+
+    sym = np.kron(np.identity(dim_x), symmetric_projection(dim_y, level))
+    x_var = cvxpy.Variable((dim_ext, dim_ext), hermitian=True)
+
+    # Tr_{Y_2 ⊗ ... ⊗ Y_level}(X) = meas:
+    reduced = (
+        cvxpy.partial_trace(
+            x_var, [dim_x * dim_y, dim_y ** (level - 1)], axis=1
+        )
+        if level > 1
+        else x_var
+    )
+    constraints = [
+        reduced == meas,
+        # (I_X ⊗ Pi) X (I_X ⊗ Pi) = X where "Pi" is the symmetric projection on
+        # Y_1 ∨ Y_2 ∨ ... ∨ Y_level.
+        sym @ x_var @ sym == x_var,
+        partial_transpose(x_var, 1, dim_list) >> 0,
+        x_var >> 0,
+    ]
+    for sys in range(3, level + 2):
+        constraints.append(partial_transpose(x_var, sys, dim_list) >> 0)
+    return x_var, constraints
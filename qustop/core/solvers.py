@@ -0,0 +1,129 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Selection of SDP solvers and the translation of a common tolerance into their options."""
+import warnings
+from typing import Any, Optional
+
+import cvxpy
+
+AUTO = "auto"
+
+# Interior-point solvers converge in a few dozen iterations to high accuracy, but each
+# iteration factorizes a dense system whose cost grows quickly with the number of variables.
+# The first-order SCS needs many cheap iterations and scales to much larger problems.
+INTERIOR_POINT_SOLVERS = ("MOSEK", "CLARABEL", "CVXOPT")
+FIRST_ORDER_SOLVERS = ("SCS",)
+
+# Problems with at most this many scalar variables are solved by interior-point solvers first.
+# For the PPT min-error SDP, CLARABEL is faster than SCS for two qutrits (324 variables) but
+# several times slower for two ququarts (1024 variables).
+INTERIOR_POINT_MAX_VARIABLES = 500
+
+# Statuses for which the solution is accepted without trying the next solver of the chain.
+ACCEPTED_STATUSES = (cvxpy.OPTIMAL, cvxpy.INFEASIBLE, cvxpy.UNBOUNDED)
+
+# Statuses of solvers stopped by a time or iteration limit with a solution.
+LIMIT_STATUSES = (cvxpy.OPTIMAL_INACCURATE, cvxpy.USER_LIMIT)
+
+
+def solver_options(
+    solver: str,
+    eps: Optional[float],
+    time_limit: Optional[float] = None,
+    max_iters: Optional[int] = None,
+) -> dict[str, Any]:
+    """Returns the options setting the convergence tolerance and the limits of a solver.
+
+    The solvers differ both in the names and in the meaning of their options. The duality gap
+    and the feasibility tolerances are all set to `eps` for the interior-point solvers. A time
+    limit is ignored by solvers without one, such as CVXOPT. The tolerance and limits cannot be
+    translated for other solvers, or for `None`, which leaves the choice to `cvxpy`, so they are
+    ignored with a warning.
+
+    Args:
+        solver: The name of the solver as registered in `cvxpy`.
+        eps: The convergence tolerance, the defaults of the solver are used if `None`.
+        time_limit: The maximal number of seconds spent by the solver.
+        max_iters: The maximal number of iterations of the solver.
+    """
+    solver = solver.upper() if solver is not None else None
+    options: dict[str, Any] = {}
+    if solver == "SCS":
+        options.update(
+            {"eps": eps, "time_limit_secs": time_limit, "max_iters": max_iters}
+        )
+    elif solver == "CLARABEL":
+        options.update(
+            {
+                "tol_gap_abs": eps,
+                "tol_gap_rel": eps,
+                "tol_feas": eps,
+                "time_limit": time_limit,
+                "max_iter": max_iters,
+            }
+        )
+    elif solver == "CVXOPT":
+        options.update(
+            {
+                "abstol": eps,
+                "reltol": eps,
+                "feastol": eps,
+                "maxiters": max_iters,
+            }
+        )
+    elif solver == "MOSEK":
+        params = {
+            "MSK_DPAR_INTPNT_CO_TOL_REL_GAP": eps,
+            "MSK_DPAR_INTPNT_CO_TOL_PFEAS": eps,
+            "MSK_DPAR_INTPNT_CO_TOL_DFEAS": eps,
+            "MSK_DPAR_OPTIMIZER_MAX_TIME": time_limit,
+            "MSK_IPAR_INTPNT_MAX_ITERATIONS": max_iters,
+        }
+        params = {key: val for key, val in params.items() if val is not None}
+        if params:
+            options["mosek_params"] = params
+    elif any(val is not None for val in (eps, time_limit, max_iters)):
+        warnings.warn(
+            f"Solver {solver} not supported by `solver_options`, the tolerance eps={eps}, "
+            f"time_limit={time_limit} and max_iters={max_iters} are ignored. Choose from "
+            f"{INTERIOR_POINT_SOLVERS + FIRST_ORDER_SOLVERS} to set them."
+        )
+    return {key: val for key, val in options.items() if val is not None}
+
+
+def solver_chain(problem: cvxpy.Problem, solver: Optional[str]) -> list[str]:
+    """Returns the solvers to try in turn for a problem.
+
+    A named solver is used on its own. With :code:`solver="auto"`, the installed solvers able to
+    handle semidefinite constraints are ordered by the size of the problem: interior-point
+    solvers first for small problems and SCS first for large ones. The remaining solvers serve
+    as fallbacks when a solver fails or only reaches an inaccurate solution.
+
+    Args:
+        problem: The `cvxpy` problem to solve.
+        solver: The name of a solver, "auto", or `None` for the default of `cvxpy`.
+    """
+    if solver is None or solver.lower() != AUTO:
+        return [solver]
+
+    installed = cvxpy.installed_solvers()
+    interior_point = [s for s in INTERIOR_POINT_SOLVERS if s in installed]
+    first_order = [s for s in FIRST_ORDER_SOLVERS if s in installed]
+    if (
+        problem.size_metrics.num_scalar_variables
+        <= INTERIOR_POINT_MAX_VARIABLES
+    ):
+        return interior_point + first_order
+    return first_order + interior_point
@@ -22,6 +22,8 @@ import numpy as np
 from toqito.matrix_props import is_density
 from toqito.perms import swap
 
+from qustop.core.partial import partial_trace_batch, partial_transpose_batch
+
 
 class State:
     """A :code:`State` object representing a quantum state."""
@@ -37,6 +39,33 @@ class State:
         self._dims = self._prepare_dims(dims)
         self._systems = list(range(1, len(self._dims) + 1))
 
+    @classmethod
+    def trusted(
+        cls,
+        state: np.ndarray,
+        dims: list[int],
+        systems: Optional[list[int]] = None,
+    ) -> State:
+        """Creates a state from a density matrix that is known to be valid, without validation.
+
+        This avoids the eigendecomposition of the validation when the states are read from a
+        trusted source such as an ensemble file. The matrix is used as is, without a copy.
+
+        Args:
+            state: A density matrix.
+            dims: A list of integers representing the dimensions of the subsystems of the state.
+            systems: The labels of the subsystems, `[1, ..., len(dims)]` by default.
+        """
+        obj = cls.__new__(cls)
+        obj._state = state
+        obj._dims = list(dims)
+        obj._systems = (
+            list(systems)
+            if systems is not None
+            else list(range(1, len(dims) + 1))
+        )
+        return obj
+
     def __eq__(self, other: State) -> bool:
         if isinstance(other, State):
             return (
@@ -84,10 +113,31 @@ class State:
     def alice_systems(self) -> list[int]:
         return [i for i in self._systems if i % 2 != 0]
 
+    @property
+    def alice_positions(self) -> list[int]:
+        """The (1-indexed) positions of Alice's subsystems, e.g. for the partial transpose across
+        the cut between Alice and Bob, which differ from their labels once subsystems are
+        reordered by :code:`swap` or :code:`copies`."""
+        return self._positions(self.alice_systems)
+
     @property
     def bob_systems(self) -> list[int]:
         return [i for i in self._systems if i % 2 == 0]
 
+    @property
+    def bipartite_dims(self) -> list[int]:
+        """The dimensions of Alice's and Bob's spaces, assuming Alice's subsystems come first."""
+        dim_alice = int(
+            np.prod(
+                [
+                    dim
+                    for dim, sys in zip(self._dims, self._systems)
+                    if sys % 2 != 0
+                ]
+            )
+        )
+        return [dim_alice, self.shape[0] // dim_alice]
+
     @property
     def value(self) -> np.ndarray:
         return self._state
@@ -146,6 +196,142 @@ class State:
         new_dims = self._dims + r_state.dims
         return State(new_state, new_dims)
 
+    def copies(self, num_copies: int) -> State:
+        """Returns the tensor power of `num_copies` copies of the state in party-grouped order.
+
+        The subsystems of Alice of all copies come first, followed by the ones of Bob, i.e. the
+        order is `A_1 A_2 ... B_1 B_2 ...` for a bipartite state. The labels of the subsystems of
+        the `j`-th copy are shifted by `j` times the number of subsystems, rounded up to an even
+        number so that the parties of the labels are retained. The permutation is applied as a
+        single transpose of the tensor product. For pure states, the tensor product of the kets
+        is permuted instead and the density matrix is only formed at the end.
+
+        Args:
+            num_copies: The number of copies.
+
+        Raises:
+            ValueError:
+                * If `num_copies` is smaller than 1.
+        """
+        order, dims, systems = self._grouped_copies(num_copies)
+        num_sys = len(self._dims)
+        dim = int(np.prod(dims))
+
+        ket = self._ket()
+        if ket is not None:
+            tensor = ket.reshape(self._dims)
+            for _ in range(num_copies - 1):
+                tensor = np.multiply.outer(tensor, ket.reshape(self._dims))
+            power = tensor.transpose(order).reshape(dim, 1)
+            return State.trusted(power @ power.conj().T, dims, systems)
+
+        # The row and column axes of each copy are interleaved in the tensor product.
+        tensor = self._state.reshape(self._dims * 2)
+        for _ in range(num_copies - 1):
+            tensor = np.multiply.outer(
+                tensor, self._state.reshape(self._dims * 2)
+            )
+        rows = [axis // num_sys * num_sys + axis for axis in order]
+        cols = [row + num_sys for row in rows]
+        power = tensor.transpose(rows + cols).reshape(dim, dim)
+        return State.trusted(power, dims, systems)
+
+    def partial_trace(self, sys: list[int]) -> State:
+        """Returns the reduced state on the subsystems not in `sys`, which keep their labels.
+
+        Args:
+            sys: The labels of the subsystems to trace out.
+
+        Raises:
+            ValueError:
+                * If an element of `sys` is not a label of the subsystems.
+        """
+        positions = self._positions(sys)
+        reduced = partial_trace_batch(
+            self.value[np.newaxis], positions, self._dims
+        )[0]
+        kept = [k for k in range(len(self._dims)) if k + 1 not in positions]
+        return State.trusted(
+            reduced,
+            [self._dims[k] for k in kept],
+            [self._systems[k] for k in kept],
+        )
+
+    def partial_transpose(self, sys: list[int]) -> State:
+        """Returns the partial transpose on the subsystems with the given labels.
+
+        The result is not validated, and is only a state if the original state is PPT.
+
+        Args:
+            sys: The labels of the transposed subsystems.
+
+        Raises:
+            ValueError:
+                * If an element of `sys` is not a label of the subsystems.
+        """
+        return State.trusted(
+            partial_transpose_batch(
+                self.value[np.newaxis], self._positions(sys), self._dims
+            )[0],
+            self._dims,
+            self._systems,
+        )
+
+    def _positions(self, sys: list[int]) -> list[int]:
+        """Returns the (1-indexed) positions of the subsystems with the given labels, which differ
+        from the labels once subsystems are swapped."""
+        if any(label not in self._systems for label in sys):
+            raise ValueError(
+                f"The subsystems {sys} are not supported for a state on the "
+                f"subsystems {self._systems}."
+            )
+        return [self._systems.index(label) + 1 for label in sys]
+
+    def _grouped_copies(
+        self, num_copies: int
+    ) -> tuple[list[int], list[int], list[int]]:
+        """Returns the party-grouped order of the subsystems of `num_copies` copies, as indices
+        into the subsystems of the copies ordered by copy, and their dimensions and labels.
+
+        Raises:
+            ValueError:
+                * If `num_copies` is smaller than 1.
+        """
+        if num_copies < 1:
+            raise ValueError(
+                f"The number of copies is {num_copies}, but must be at least 1."
+            )
+        num_sys = len(self._dims)
+        shift = num_sys + num_sys % 2
+        parties = [sys % 2 == 0 for sys in self._systems]
+
+        order = [
+            copy * num_sys + i
+            for party in (False, True)
+            for copy in range(num_copies)
+            for i in range(num_sys)
+            if parties[i] == party
+        ]
+        dims = [self._dims[axis % num_sys] for axis in order]
+        systems = [
+            self._systems[axis % num_sys] + axis // num_sys * shift
+            for axis in order
+        ]
+        return order, dims, systems
+
+    def _ket(self, tol: float = 1e-10) -> Optional[np.ndarray]:
+        """Returns a vector `ψ` with :code:`ρ = ψ ψ^*` if the state is pure, or `None` otherwise.
+
+        The purity :code:`tr(ρ^2) = tr(ρ)^2` is checked in :code:`O(d^2)`, and `ψ` is read off the
+        column of the largest diagonal entry without an eigendecomposition.
+        """
+        trace = np.real(np.trace(self._state))
+        purity = np.real(np.vdot(self._state, self._state))
+        if abs(purity - trace**2) > tol * max(trace**2, 1):
+            return None
+        col = int(np.argmax(np.real(np.diag(self._state))))
+        return self._state[:, col] / np.sqrt(np.real(self._state[col, col]))
+
     def swap(self, sub_sys_swap: list[int]) -> None:
         """Performs a swap between two subsystems of the state.
 
@@ -0,0 +1,367 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Timing and size statistics recorded for each solved optimization problem."""
+from __future__ import annotations
+
+import time
+import tracemalloc
+from typing import Any, Optional
+
+import cvxpy
+import numpy as np
+
+from qustop.core.solvers import (
+    ACCEPTED_STATUSES,
+    LIMIT_STATUSES,
+    solver_chain,
+    solver_options,
+)
+
+
+class SolveStats:
+    """A :code:`SolveStats` object recording where the time of a single solve went."""
+
+    def __init__(
+        self,
+        build_time: float = 0.0,
+        compile_time: float = 0.0,
+        solver_time: float = 0.0,
+        iterations: Optional[int] = None,
+        status: Optional[str] = None,
+        solver: Optional[str] = None,
+        num_variables: int = 0,
+        num_constraints: int = 0,
+        peak_memory: Optional[int] = None,
+        attempts: Optional[list[str]] = None,
+        primal_bound: Optional[float] = None,
+        dual_bound: Optional[float] = None,
+        last_primal_objective: Optional[float] = None,
+        last_dual_objective: Optional[float] = None,
+    ) -> None:
+        """Initializes the statistics of a solve.
+
+        Args:
+            build_time: Seconds spent constructing the problem expressions.
+            compile_time: Seconds spent canonicalizing the problem for the solver.
+            solver_time: Seconds spent inside the numerical solver.
+            iterations: Number of iterations reported by the solver.
+            status: Status of the problem as reported by the modelling layer.
+            solver: Name of the solver that produced the solution.
+            num_variables: Number of scalar optimization variables.
+            num_constraints: Number of (scalar) constraints.
+            peak_memory: Peak memory of the solve in bytes, as measured by :code:`MemoryTracker`.
+            attempts: The solvers tried by :code:`solver="auto"` and the outcome of each.
+            primal_bound: A certified bound on the optimal value from the side of the primal
+                objective, i.e. a lower bound of a maximization problem, if one is known.
+            dual_bound: A certified bound on the optimal value from the side of the dual
+                objective, i.e. an upper bound of a maximization problem, if one is known.
+            last_primal_objective: Objective value of the last primal iterate of the solver. It is
+                not a bound on the optimal value if the solver was stopped by a limit.
+            last_dual_objective: Objective value of the last dual iterate of the solver, if
+                reported. It is not a bound on the optimal value if the solver was stopped by a
+                limit.
+        """
+        self.build_time = build_time
+        self.compile_time = compile_time
+        self.solver_time = solver_time
+        self.iterations = iterations
+        self.status = status
+        self.solver = solver
+        self.num_variables = num_variables
+        self.num_constraints = num_constraints
+        self.peak_memory = peak_memory
+        self.attempts = attempts
+        self.primal_bound = primal_bound
+        self.dual_bound = dual_bound
+        self.last_primal_objective = last_primal_objective
+        self.last_dual_objective = last_dual_objective
+
+    def __str__(self) -> str:
+        out_s = (
+            f"SolveStats: \n "
+            f"status = {self.status}, \n "
+            f"solver = {self.solver}, \n "
+            f"build_time = {self.build_time:.4f}s, \n "
+            f"compile_time = {self.compile_time:.4f}s, \n "
+            f"solver_time = {self.solver_time:.4f}s, \n "
+            f"iterations = {self.iterations}, \n "
+            f"num_variables = {self.num_variables}, \n "
+            f"num_constraints = {self.num_constraints}, \n "
+            f"peak_memory = {self.peak_memory}, \n "
+            f"attempts = {self.attempts}, \n "
+            f"primal_bound = {self.primal_bound}, \n "
+            f"dual_bound = {self.dual_bound}, \n "
+            f"last_primal_objective = {self.last_primal_objective}, \n "
+            f"last_dual_objective = {self.last_dual_objective}, \n"
+        )
+        return out_s
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    @property
+    def total_time(self) -> float:
+        return self.build_time + self.compile_time + self.solver_time
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the statistics as a dictionary of plain Python values."""
+        return {
+            "build_time": self.build_time,
+            "compile_time": self.compile_time,
+            "solver_time": self.solver_time,
+            "total_time": self.total_time,
+            "iterations": self.iterations,
+            "status": self.status,
+            "solver": self.solver,
+            "num_variables": self.num_variables,
+            "num_constraints": self.num_constraints,
+            "peak_memory": self.peak_memory,
+            "attempts": self.attempts,
+            "primal_bound": self.primal_bound,
+            "dual_bound": self.dual_bound,
+            "last_primal_objective": self.last_primal_objective,
+            "last_dual_objective": self.last_dual_objective,
+        }
+
+
+class MemoryTracker:
+    """A context manager measuring the peak memory of the process while a block of code runs,
+    e.g. a single solve.
+
+    On Linux, the high-water mark of the resident memory is reset when the block is entered and
+    read when it is left, so the peak includes the memory allocated by the solvers and does not
+    carry over from earlier solves. Elsewhere, the peak of the memory allocated through Python is
+    traced with `tracemalloc`, which misses the allocations of the solvers themselves. Blocks run
+    concurrently by threads of one process share the measurement, and a tracker entered several
+    times, e.g. for each solver tried, reports the largest peak.
+    """
+
+    def __init__(self) -> None:
+        self.peak: Optional[int] = None
+        self._resident = False
+        self._tracing = False
+
+    def __enter__(self) -> MemoryTracker:
+        try:
+            # Writing 5 resets the peak resident memory of the process, see proc(5).
+            with open("/proc/self/clear_refs", "w") as out:
+                out.write("5")
+            self._resident = True
+        except OSError:
+            self._tracing = not tracemalloc.is_tracing()
+            if self._tracing:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        peak = None
+        if self._resident:
+            with open("/proc/self/status") as src:
+                for line in src:
+                    if line.startswith("VmHWM:"):
+                        peak = int(line.split()[1]) * 1024
+        else:
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._tracing:
+                tracemalloc.stop()
+        if peak is not None:
+            self.peak = peak if self.peak is None else max(self.peak, peak)
+
+
+def solve_problem(
+    problem: cvxpy.Problem,
+    build_start: float,
+    solver: Optional[str] = None,
+    eps: Optional[float] = None,
+    time_limit: Optional[float] = None,
+    max_iters: Optional[int] = None,
+    **solve_kwargs: Any,
+) -> tuple[Optional[float], SolveStats]:
+    """Solves a `cvxpy` problem and records the statistics of the solve.
+
+    With :code:`solver="auto"`, the solvers of :code:`solver_chain` are tried in turn until one
+    of them reaches an accurate solution, and the times of all attempts are accumulated.
+
+    If a time or iteration limit is given, a solver stopped by it is not followed by another one
+    and its last iterate is returned with a status such as "optimal_inaccurate" or "user_limit",
+    along with the last primal and dual objective values reported by the solver. These are not
+    bounds on the optimal value, so the `primal_bound` and `dual_bound` of the statistics are left
+    to the callers able to certify them. If no solver produced an iterate, the optimal value is
+    `None` and the status is "solver_error".
+
+    Args:
+        problem: The `cvxpy` problem to solve.
+        build_start: Value of `time.perf_counter()` when construction of the problem began.
+        solver: The name of the solver, "auto", or `None` for the default of `cvxpy`.
+        eps: The convergence tolerance, translated into the options of each solver.
+        time_limit: The number of seconds all solvers of the chain may spend in total.
+        max_iters: The maximal number of iterations of each solver.
+        solve_kwargs: Keyword arguments passed on to `problem.solve`.
+
+    Raises:
+        cvxpy.SolverError:
+            * If every solver of the chain fails and no limit was given.
+    """
+    build_time = time.perf_counter() - build_start
+    chain = solver_chain(problem, solver)
+    limited = time_limit is not None or max_iters is not None
+
+    attempts, compile_time, solver_time = [], 0.0, 0.0
+    opt_val, error = None, None
+    memory = MemoryTracker()
+    for name in chain:
+        remaining = (
+            time_limit - compile_time - solver_time
+            if time_limit is not None
+            else None
+        )
+        if remaining is not None and remaining <= 0:
+            break
+
+        solve_start = time.perf_counter()
+        try:
+            with memory:
+                opt_val = problem.solve(
+                    solver=name,
+                    **solver_options(name, eps, remaining, max_iters),
+                    **solve_kwargs,
+                )
+        except cvxpy.SolverError as err:
+            error = err
+            attempts.append(f"{name}: failed")
+            solver_time += time.perf_counter() - solve_start
+            continue
+        total_time = time.perf_counter() - solve_start
+
+        solver_stats = problem.solver_stats
+        compile_time += problem.compilation_time or 0.0
+        solver_time += (
+            solver_stats.solve_time
+            if solver_stats.solve_time is not None
+            else total_time - (problem.compilation_time or 0.0)
+        )
+        attempts.append(f"{solver_stats.solver_name}: {problem.status}")
+        if problem.status in ACCEPTED_STATUSES or (
+            limited and problem.status in LIMIT_STATUSES
+        ):
+            break
+
+    # An inaccurate solution of an earlier solver is preferred over no solution at all.
+    if error is not None and opt_val is None:
+        if not limited:
+            raise error
+        stats = SolveStats(
+            build_time=build_time,
+            solver_time=solver_time,
+            status=cvxpy.SOLVER_ERROR,
+            num_variables=problem.size_metrics.num_scalar_variables,
+            num_constraints=sum(
+                constraint.size for constraint in problem.constraints
+            ),
+            peak_memory=memory.peak,
+            attempts=attempts,
+        )
+        return None, stats
+
+    solver_stats = problem.solver_stats
+    last_primal, last_dual = last_objectives(problem)
+    stats = SolveStats(
+        build_time=build_time,
+        compile_time=compile_time,
+        solver_time=solver_time,
+        iterations=solver_stats.num_iters,
+        status=problem.status,
+        solver=solver_stats.solver_name,
+        num_variables=problem.size_metrics.num_scalar_variables,
+        num_constraints=sum(
+            constraint.size for constraint in problem.constraints
+        ),
+        peak_memory=memory.peak,
+        attempts=attempts if len(chain) > 1 else None,
+        last_primal_objective=last_primal,
+        last_dual_objective=last_dual,
+    )
+    return opt_val, stats
+
+
+def last_objectives(
+    problem: cvxpy.Problem,
+) -> tuple[Optional[float], Optional[float]]:
+    """Returns the objective values of the last primal and dual iterates of a solved problem.
+
+    The values are given in the sense of the objective of `problem`. They are only bounds on the
+    optimal value up to the residuals of the iterates, which vanish for an optimal solution but
+    not for a solver stopped by a limit. The dual value is only known for solvers reporting it,
+    i.e. SCS.
+
+    Args:
+        problem: A `cvxpy` problem after a call to `solve`.
+    """
+    primal = (
+        float(problem.value)
+        if problem.value is not None and np.isfinite(problem.value)
+        else None
+    )
+    # `cvxpy` passes the negated objective of a maximization problem to the solver.
+    sign = -1 if isinstance(problem.objective, cvxpy.Maximize) else 1
+    extra_stats = problem.solver_stats.extra_stats
+    info = extra_stats.get("info", {}) if isinstance(extra_stats, dict) else {}
+    dual = sign * info["dobj"] if "dobj" in info else None
+    if dual is not None and not np.isfinite(dual):
+        dual = None
+    return primal, dual
+
+
+def merge_stats(stats: list[SolveStats]) -> SolveStats:
+    """Returns the statistics of independent subproblems solved for a single problem, e.g. the
+    blocks of a block-diagonal problem.
+
+    Times, sizes, bounds and objective values are summed, since the values of the subproblems add
+    up, and the status is the first one that is not optimal, if any.
+    """
+
+    def total(values: list[Optional[float]]) -> Optional[float]:
+        return sum(values) if None not in values else None
+
+    statuses = [stat.status for stat in stats]
+    iterations = [stat.iterations for stat in stats]
+    memories = [stat.peak_memory for stat in stats]
+    return SolveStats(
+        build_time=sum(stat.build_time for stat in stats),
+        compile_time=sum(stat.compile_time for stat in stats),
+        solver_time=sum(stat.solver_time for stat in stats),
+        iterations=(max(iterations) if None not in iterations else None),
+        status=next(
+            (status for status in statuses if status != cvxpy.OPTIMAL),
+            cvxpy.OPTIMAL,
+        ),
+        solver=stats[0].solver,
+        num_variables=sum(stat.num_variables for stat in stats),
+        num_constraints=sum(stat.num_constraints for stat in stats),
+        peak_memory=max(memories) if None not in memories else None,
+        attempts=[attempt for stat in stats for attempt in stat.attempts or []]
+        or None,
+        primal_bound=total([stat.primal_bound for stat in stats]),
+        dual_bound=total([stat.dual_bound for stat in stats]),
+        last_primal_objective=total(
+            [stat.last_primal_objective for stat in stats]
+        ),
+        last_dual_objective=total(
+            [stat.last_dual_objective for stat in stats]
+        ),
+    )
@@ -0,0 +1,85 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import numpy as np
+from scipy.linalg import block_diag
+
+from qustop import Ensemble, State
+from qustop.core.blocks import (
+    block_decomposition,
+    embed_blocks,
+    restrict_ensemble,
+    solve_blocks,
+)
+from qustop.random.samplers import random_density_matrices
+
+
+def flagged_states(rng, num_states, dim, num_flags):
+    """Returns states `∑_k q_k σ_k ⊗ |k><k|` with random weights `q` and states `σ_k`."""
+    states = []
+    for _ in range(num_states):
+        weights = rng.dirichlet(np.ones(num_flags))
+        blocks = random_density_matrices(rng, num_flags, dim, dim)
+        states.append(
+            block_diag(*[w * block for w, block in zip(weights, blocks)])
+        )
+    return np.array(states)
+
+
+def test_block_decomposition():
+    """The blocks are found after a permutation of the indices and in a given basis."""
+    rng = np.random.default_rng(0)
+    states = flagged_states(rng, 3, 2, 3)
+    blocks = block_decomposition(states)
+    np.testing.assert_equal(blocks, [[0, 1], [2, 3], [4, 5]])
+
+    perm = rng.permutation(6)
+    blocks = block_decomposition(states[:, perm[:, None], perm])
+    np.testing.assert_equal(
+        sorted(sorted(perm[block]) for block in blocks),
+        [[0, 1], [2, 3], [4, 5]],
+    )
+
+    basis, _ = np.linalg.qr(rng.normal(size=(6, 6)))
+    rotated = basis @ states @ basis.T
+    assert len(block_decomposition(rotated)) == 1
+    assert len(block_decomposition(rotated, basis)) == 3
+
+
+def test_restrict_and_embed_blocks():
+    """Embedding the restricted blocks recovers the states in the original basis."""
+    rng = np.random.default_rng(1)
+    basis, _ = np.linalg.qr(
+        rng.normal(size=(6, 6)) + 1j * rng.normal(size=(6, 6))
+    )
+    states = basis @ flagged_states(rng, 2, 3, 2) @ basis.conj().T
+    ensemble = Ensemble([State(state, [6]) for state in states])
+
+    blocks = block_decomposition(states, basis)
+    restricted = [
+        restrict_ensemble(ensemble, block, basis).density_matrices
+        for block in blocks
+    ]
+    for i, state in enumerate(states):
+        np.testing.assert_allclose(
+            embed_blocks([block[i] for block in restricted], blocks, basis),
+            state,
+            atol=1e-12,
+        )
+
+
+def test_solve_blocks():
+    items = [np.identity(2), 2 * np.identity(3)]
+    assert solve_blocks(np.trace, items) == [2, 6]
+    assert solve_blocks(np.trace, items, num_workers=2) == [2, 6]
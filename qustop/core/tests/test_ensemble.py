@@ -65,6 +65,40 @@ def test_ensemble_systems():
     assert sys_2_ensemble.systems == [1, 2]
 
 
+def test_ensemble_copies():
+    """The copies of an ensemble keep its probabilities and group the systems of each party."""
+    states = [State(bell(0), [2, 2]), State(bell(1), [2, 2])]
+    ensemble = Ensemble(states, [0.25, 0.75])
+    copies = ensemble.copies(2)
+
+    np.testing.assert_equal(copies.probs, [0.25, 0.75])
+    np.testing.assert_equal(copies.systems, [1, 3, 2, 4])
+    np.testing.assert_equal(copies.dims, [2, 2, 2, 2])
+    np.testing.assert_allclose(copies[1].value, states[1].copies(2).value)
+
+
+def test_ensemble_partial_trace_transpose():
+    """The batched partial traces and transposes agree with those of each state."""
+    states = [State(bell(0), [2, 2]), State(bell(1), [2, 2])]
+    ensemble = Ensemble(states, [0.25, 0.75]).copies(2)
+
+    reduced = ensemble.partial_trace([2, 3])
+    np.testing.assert_equal(reduced.probs, [0.25, 0.75])
+    np.testing.assert_equal(reduced.systems, [1, 4])
+    transposed = ensemble.partial_transpose([2, 4])
+    np.testing.assert_equal(transposed.systems, [1, 3, 2, 4])
+    for i, state in enumerate(ensemble.states):
+        np.testing.assert_allclose(
+            reduced[i].value, state.partial_trace([2, 3]).value
+        )
+        np.testing.assert_allclose(
+            transposed[i].value, state.partial_transpose([2, 4]).value
+        )
+
+    with np.testing.assert_raises(ValueError):
+        ensemble.partial_trace([5])
+
+
 def test_is_linearly_independent():
     """Check if the states are linearly independent or not."""
     dims = [2]
@@ -122,3 +156,18 @@ def test_invalid_state_distinguishability_probs():
         rho2 = bell(1) * bell(1).conj().T
         dims = [2, 2]
         Ensemble([State(rho1, dims), State(rho2, dims)], [1, 2, 3])
+
+
+def test_ensemble_fingerprint():
+    """Fingerprints identify ensembles by their states and probabilities."""
+    states = [State(bell(0), [2, 2]), State(bell(1), [2, 2])]
+    assert (
+        Ensemble(states).fingerprint
+        == Ensemble(
+            [State(bell(0), [2, 2]), State(bell(1), [2, 2])]
+        ).fingerprint
+    )
+    assert (
+        Ensemble(states).fingerprint
+        != Ensemble(states, [0.2, 0.8]).fingerprint
+    )
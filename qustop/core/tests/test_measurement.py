@@ -0,0 +1,117 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import numpy as np
+from toqito.states import bell
+
+from qustop import Ensemble, Measurement, OptDist, State
+
+
+def random_unitary(dim, seed=0):
+    rng = np.random.default_rng(seed)
+    mat = rng.normal(size=(dim, dim)) + 1j * rng.normal(size=(dim, dim))
+    return np.linalg.qr(mat)[0]
+
+
+def projective_operators(dim, num_outcomes):
+    """The projections onto `num_outcomes` blocks of columns of a random unitary."""
+    unitary = random_unitary(dim)
+    blocks = np.split(unitary, num_outcomes, axis=1)
+    return np.array([block @ block.conj().T for block in blocks])
+
+
+def test_low_rank_storage():
+    """Low-rank operators are factored and reproduced by the factors."""
+    operators = projective_operators(64, 16)
+    meas = Measurement.from_operators(operators)
+    assert meas.is_low_rank
+    assert len(meas) == 16
+    assert meas.dim == 64
+    np.testing.assert_equal(meas.ranks, [4] * 16)
+    assert meas.nbytes < operators.nbytes / 10
+
+    np.testing.assert_allclose(meas.to_array(), operators, atol=1e-12)
+    np.testing.assert_allclose(np.asarray(meas), operators, atol=1e-12)
+    np.testing.assert_allclose(meas[-1], operators[-1], atol=1e-12)
+    np.testing.assert_allclose(sum(meas), np.identity(64), atol=1e-12)
+    assert len(meas[2:5]) == 3
+
+
+def test_dense_storage():
+    """Full-rank operators, and all operators without a tolerance, are stored densely."""
+    operators = np.array([np.identity(4) / 2] * 2)
+    meas = Measurement.from_operators(operators)
+    assert not meas.is_low_rank
+    np.testing.assert_equal(meas.ranks, [4, 4])
+
+    meas = Measurement.from_operators(projective_operators(8, 4), tol=None)
+    assert not meas.is_low_rank
+
+    np.testing.assert_raises(ValueError, Measurement)
+
+
+def test_truncation_and_empty_operators():
+    """Small and negative eigenvalues are discarded, possibly leaving an operator empty."""
+    operators = np.array(
+        [
+            np.diag([1, 1e-9, 0, 0]),
+            np.diag([0, 0, 1, -1e-10]),
+            np.zeros((4, 4)),
+        ]
+    )
+    meas = Measurement.from_operators(operators)
+    np.testing.assert_equal(meas.ranks, [1, 1, 0])
+    np.testing.assert_allclose(meas[2], np.zeros((4, 4)))
+    probs = meas.probabilities(np.identity(4))
+    np.testing.assert_allclose(probs[:, 2], 0)
+    np.testing.assert_allclose(probs[0], [1, 0, 0])
+
+
+def test_probabilities():
+    """Both representations give the outcome probabilities of kets and density matrices."""
+    operators = projective_operators(16, 4)
+    kets = random_unitary(16, seed=1)[:, :5].T
+    densities = np.einsum("ni,nj->nij", kets, kets.conj())
+    expected = np.real(np.einsum("nij,mji->nm", densities, operators))
+
+    for tol in [1e-7, None]:
+        meas = Measurement.from_operators(operators, tol=tol)
+        np.testing.assert_allclose(meas.probabilities(kets), expected)
+        np.testing.assert_allclose(meas.probabilities(densities), expected)
+        np.testing.assert_allclose(meas.probabilities(kets[0]), expected[0])
+
+
+def test_save_load(tmp_path):
+    for tol in [1e-7, None]:
+        meas = Measurement.from_operators(projective_operators(8, 4), tol)
+        path = str(tmp_path / "meas.npz")
+        meas.save(path)
+        loaded = Measurement.load(path)
+        assert loaded.is_low_rank == meas.is_low_rank
+        np.testing.assert_allclose(loaded.to_array(), meas.to_array())
+
+
+def test_opt_dist_measurements():
+    """Optimal min-error measurements are returned as a compact measurement."""
+    ensemble = Ensemble([State(bell(i), [2, 2]) for i in range(4)])
+    res = OptDist(ensemble, "pos", "min-error")
+    res.solve()
+    meas = res.measurements
+    assert isinstance(meas, Measurement)
+    assert meas.is_low_rank
+    np.testing.assert_allclose(
+        meas.probabilities(np.array(ensemble.density_matrices)),
+        np.identity(4),
+        atol=1e-6,
+    )
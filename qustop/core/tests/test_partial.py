@@ -0,0 +1,53 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import numpy as np
+from toqito.channels import partial_trace, partial_transpose
+
+from qustop.core.partial import partial_trace_batch, partial_transpose_batch
+
+
+def random_mats(num, dim):
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(num, dim, dim)) + 1j * rng.normal(
+        size=(num, dim, dim)
+    )
+
+
+def test_partial_trace_batch():
+    """The batched partial trace agrees with `toqito` on each matrix of the stack."""
+    dims = [2, 3, 4]
+    mats = random_mats(3, 24)
+    for sys in [[1], [2], [3], [1, 3], [2, 3], [1, 2, 3]]:
+        reduced = partial_trace_batch(mats, sys, dims)
+        for mat, red in zip(mats, reduced):
+            np.testing.assert_allclose(
+                red, partial_trace(mat, sys, dims), atol=1e-12
+            )
+
+
+def test_partial_transpose_batch():
+    """The batched partial transpose agrees with `toqito` on each matrix of the stack."""
+    dims = [2, 3, 4]
+    mats = random_mats(3, 24)
+    for sys in [[1], [2], [3], [1, 3], [2, 3]]:
+        transposed = partial_transpose_batch(mats, sys, dims)
+        for mat, trans in zip(mats, transposed):
+            np.testing.assert_allclose(
+                trans, partial_transpose(mat, sys, dims), atol=1e-12
+            )
+    np.testing.assert_allclose(
+        partial_transpose_batch(mats, [1, 2, 3], dims),
+        mats.transpose(0, 2, 1),
+    )
@@ -0,0 +1,152 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import numpy as np
+from toqito.channels import partial_transpose
+from toqito.states import basis, tile
+
+from qustop import Ensemble, OptDist, ProductState, State
+from qustop.core import gram_matrix
+
+
+def tiles_upb():
+    e_0, e_1, e_2 = (basis(3, i).ravel() for i in range(3))
+    return [
+        ProductState([e_0, (e_0 - e_1) / np.sqrt(2)]),
+        ProductState([(e_0 - e_1) / np.sqrt(2), e_2]),
+        ProductState([e_2, (e_1 - e_2) / np.sqrt(2)]),
+        ProductState([(e_1 - e_2) / np.sqrt(2), e_0]),
+        ProductState([(e_0 + e_1 + e_2) / np.sqrt(3)] * 2),
+    ]
+
+
+def random_product_states(rng, num_states, dims):
+    states = []
+    for _ in range(num_states):
+        vectors = [
+            rng.normal(size=dim) + 1j * rng.normal(size=dim) for dim in dims
+        ]
+        states.append(ProductState([v / np.linalg.norm(v) for v in vectors]))
+    return states
+
+
+def test_product_state_value():
+    """The density matrix is only formed when it is accessed."""
+    for i, state in enumerate(tiles_upb()):
+        assert state._state is None
+        assert state.shape == (9, 9)
+        np.testing.assert_allclose(state.value, tile(i) @ tile(i).conj().T)
+        assert state.dims == [3, 3]
+        assert state.is_pure
+
+
+def test_product_state_overlap_and_gram():
+    rng = np.random.default_rng(0)
+    states = random_product_states(rng, 4, [2, 3, 2])
+    kets = np.array([state.ket.ravel() for state in states])
+    np.testing.assert_allclose(gram_matrix(states), kets.conj() @ kets.T)
+    np.testing.assert_allclose(
+        states[0].overlap(states[1]), np.vdot(kets[0], kets[1])
+    )
+
+
+def test_product_state_partial_transpose():
+    rng = np.random.default_rng(1)
+    state = random_product_states(rng, 1, [2, 3])[0]
+    for sys in [[1], [2], [1, 2]]:
+        np.testing.assert_allclose(
+            state.partial_transpose(sys).value,
+            partial_transpose(state.value, sys, [2, 3]),
+            atol=1e-12,
+        )
+
+
+def test_product_state_kron_swap_copies():
+    """Products, swaps and copies act on the local vectors and agree with dense states."""
+    rng = np.random.default_rng(2)
+    state, other = random_product_states(rng, 2, [2, 3])
+
+    product = state.kron(other)
+    assert isinstance(product, ProductState)
+    np.testing.assert_allclose(
+        product.value, np.kron(state.value, other.value)
+    )
+
+    dense = State(product.value, [2, 3, 2, 3])
+    product.swap([2, 3])
+    dense.swap([2, 3])
+    np.testing.assert_allclose(product.value, dense.value, atol=1e-12)
+    assert product.dims == dense.dims
+    assert product.systems == dense.systems
+
+    copies = state.copies(2)
+    assert isinstance(copies, ProductState)
+    np.testing.assert_allclose(
+        copies.value,
+        State(state.value, [2, 3]).copies(2).value,
+        atol=1e-12,
+    )
+    assert copies.systems == [1, 3, 2, 4]
+
+
+def test_product_ensemble_properties():
+    """Orthogonality and independence of product ensembles agree with the dense checks."""
+    rng = np.random.default_rng(3)
+    for states in [tiles_upb(), random_product_states(rng, 3, [2, 2])]:
+        ensemble = Ensemble(states)
+        dense = Ensemble([State(state.value, state.dims) for state in states])
+        assert ensemble.is_mutually_orthogonal == dense.is_mutually_orthogonal
+        assert (
+            ensemble.is_linearly_independent == dense.is_linearly_independent
+        )
+
+
+def test_product_state_partial_trace():
+    """The reduced states of product states are the product states of the remaining vectors."""
+    vectors = [np.array([3, 4j]), np.array([1, 1, 0]) / 5 / np.sqrt(2)]
+    state = ProductState(vectors, [2, 1])
+    dense = State.trusted(state.value, state.dims, state.systems)
+    for sys in [[1], [2]]:
+        reduced = state.partial_trace(sys)
+        assert isinstance(reduced, ProductState)
+        np.testing.assert_allclose(
+            reduced.value, dense.partial_trace(sys).value, atol=1e-12
+        )
+    np.testing.assert_equal(state.partial_trace([1]).systems, [2])
+    np.testing.assert_allclose(state.partial_trace([1, 2]).value, [[1]])
+
+    ensemble = Ensemble(tiles_upb())
+    reduced = ensemble.partial_trace([1])
+    for product, state in zip(reduced.states, ensemble.states):
+        np.testing.assert_allclose(
+            product.value, State(state.value, [3, 3]).partial_trace([1]).value
+        )
+
+
+def test_product_state_sdp():
+    """Product states are materialized for the SDP and give the same value as dense states."""
+    states = tiles_upb()
+    res = OptDist(Ensemble(states), "ppt", "min-error")
+    res.solve()
+    np.testing.assert_allclose(res.value, 1, atol=1e-5)
+
+
+def test_invalid_product_state():
+    with np.testing.assert_raises(ValueError):
+        ProductState([np.ones(2), np.ones(2)])
+    state = tiles_upb()[0]
+    with np.testing.assert_raises(ValueError):
+        state.swap([1, 2, 3])
+    with np.testing.assert_raises(ValueError):
+        state.swap([1, 5])
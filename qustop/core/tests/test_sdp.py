@@ -0,0 +1,149 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import cvxpy
+import numpy as np
+from toqito.channels import partial_transpose as np_partial_transpose
+from toqito.states import basis, bell
+
+from qustop.core.sdp import (
+    common_kernel,
+    inner_product_operator,
+    kernel_measurements,
+    measurement_variables,
+    orthogonality_constraint,
+    partial_transpose,
+    stack_measurements,
+    symmetric_extension,
+    vectorize,
+    weighted_inner_product,
+)
+
+
+def test_vectorize_column_major():
+    """Each matrix is vectorized column by column."""
+    mat = np.array([[1, 2], [3, 4]])
+    np.testing.assert_array_equal(
+        vectorize([mat, mat.T]), [[1, 3, 2, 4], [1, 2, 3, 4]]
+    )
+
+
+def test_inner_product_operator():
+    """The operator applied to stacked measurements yields the trace inner products."""
+    states = [bell(i) * bell(i).conj().T for i in range(3)]
+    meas = [np.random.rand(4, 4) + 1j * np.random.rand(4, 4) for _ in range(2)]
+    pairs = [(0, 1), (2, 0), (1, 1)]
+    weights = [0.5, 2, 1]
+
+    operator = inner_product_operator(states, pairs, 2, weights)
+    res = operator @ vectorize(meas).ravel()
+
+    expected = [
+        weights[k] * np.trace(states[j].conj().T @ meas[i])
+        for k, (j, i) in enumerate(pairs)
+    ]
+    np.testing.assert_allclose(res, expected)
+
+
+def test_weighted_inner_product_and_orthogonality():
+    """The vectorized objective and constraints agree with the scalar traces."""
+    states = [bell(i) * bell(i).conj().T for i in range(2)]
+    meas = [
+        cvxpy.Variable((4, 4), hermitian=True),
+        cvxpy.Variable((4, 4), hermitian=True),
+    ]
+    meas_vec = stack_measurements(meas)
+    meas[0].value = states[0]
+    meas[1].value = np.identity(4) - states[0]
+
+    objective = weighted_inner_product(states, [1 / 2, 1 / 2], meas_vec, 2)
+    np.testing.assert_equal(np.isclose(objective.value, 1), True)
+
+    constraints = orthogonality_constraint(states, meas_vec, 2)
+    assert len(constraints) == 1
+    np.testing.assert_allclose(constraints[0].expr.value, 0, atol=1e-12)
+
+    assert orthogonality_constraint(states, meas_vec, 2, []) == []
+
+
+def test_partial_transpose_matches_toqito():
+    """The permutation based partial transpose agrees with `toqito`."""
+    for dims, sys in [([2, 2], 1), ([2, 3], [2]), ([2, 3, 2], [1, 3])]:
+        dim = int(np.prod(dims))
+        mat = np.random.rand(dim, dim) + 1j * np.random.rand(dim, dim)
+        x_var = cvxpy.Variable((dim, dim), complex=True)
+        x_var.value = mat
+        np.testing.assert_allclose(
+            partial_transpose(x_var, sys, dims).value,
+            np_partial_transpose(mat, sys, dims),
+        )
+
+
+def test_common_kernel():
+    """The common kernel of |0><0| and |1><1| in ℂ^3 is spanned by |2>."""
+    e_0, e_1, e_2 = basis(3, 0), basis(3, 1), basis(3, 2)
+    kernel = common_kernel([e_0 @ e_0.T, e_1 @ e_1.T])
+    assert kernel.shape == (3, 1)
+    np.testing.assert_allclose(np.abs(kernel), e_2)
+
+
+def test_kernel_measurements():
+    """Kernel parametrized measurements are orthogonal to all other states."""
+    states = [bell(i) * bell(i).conj().T for i in range(3)]
+    meas, constraints = kernel_measurements(states)
+    assert len(meas) == 3
+    assert len(constraints) == 3
+
+    # The common kernel of the two other Bell states is two-dimensional.
+    assert all(con.args[0].shape == (2, 2) for con in constraints)
+
+
+def test_measurement_variables():
+    """Measurement variables are full or kernel parametrized, with the inconclusive outcome
+    unrestricted."""
+    states = [bell(i) * bell(i).conj().T for i in range(3)]
+    meas, meas_vec, constraints = measurement_variables(states, 3)
+    assert len(meas) == 3 and len(constraints) == 3
+    assert meas_vec.shape == (3 * 16,)
+
+    meas, meas_vec, constraints = measurement_variables(states, 4, True)
+    assert len(meas) == 4 and len(constraints) == 4
+    assert [con.args[0].shape for con in constraints] == [(2, 2)] * 3 + [
+        (4, 4)
+    ]
+    assert meas_vec.shape == (4 * 16,)
+
+
+def test_symmetric_extension():
+    """Product operators admit a PPT symmetric extension while entangled ones do not."""
+    e_0, e_1 = basis(2, 0), basis(2, 1)
+    product = np.kron(e_0 * e_0.conj().T, e_1 * e_1.conj().T)
+    entangled = bell(0) * bell(0).conj().T
+
+    for level in [1, 2]:
+        x_var, constraints = symmetric_extension(
+            cvxpy.Constant(product), [2, 2], level
+        )
+        assert x_var.shape == (2 ** (level + 1),) * 2
+        problem = cvxpy.Problem(cvxpy.Minimize(0), constraints)
+        problem.solve(solver="SCS")
+        assert problem.status == "optimal"
+
+        _, constraints = symmetric_extension(
+            cvxpy.Constant(entangled), [2, 2], level
+        )
+        problem = cvxpy.Problem(cvxpy.Minimize(0), constraints)
+        problem.solve(solver="SCS")
+        assert problem.status == "infeasible"
@@ -0,0 +1,117 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import cvxpy
+import numpy as np
+import pytest
+
+from qustop.core import stats
+from qustop.core.solvers import (
+    INTERIOR_POINT_MAX_VARIABLES,
+    solver_chain,
+    solver_options,
+)
+from qustop.core.stats import solve_problem
+
+
+def psd_problem(dim):
+    x_var = cvxpy.Variable((dim, dim), hermitian=True)
+    return cvxpy.Problem(
+        cvxpy.Maximize(cvxpy.real(x_var[0, 0])),
+        [x_var >> 0, cvxpy.real(cvxpy.trace(x_var)) == 1],
+    )
+
+
+def test_solver_options():
+    """The tolerance is translated into the options of each solver."""
+    assert solver_options("SCS", 1e-6) == {"eps": 1e-6}
+    assert solver_options("clarabel", 1e-6)["tol_gap_rel"] == 1e-6
+    assert solver_options("CVXOPT", 1e-6)["feastol"] == 1e-6
+    assert solver_options("SCS", None) == {}
+    assert solver_options("ECOS", None) == {}
+
+
+def test_solver_options_unsupported():
+    """A tolerance that cannot be translated for a solver is ignored with a warning."""
+    with pytest.warns(UserWarning, match="ECOS"):
+        assert solver_options("ECOS", 1e-6) == {}
+    with pytest.warns(UserWarning, match="eps=1e-06"):
+        assert solver_options(None, 1e-6) == {}
+    with pytest.warns(UserWarning, match="max_iters=5"):
+        assert solver_options("ECOS", None, max_iters=5) == {}
+
+
+def test_solver_chain():
+    """Small problems try interior-point solvers first and large ones SCS."""
+    assert solver_chain(psd_problem(2), "SCS") == ["SCS"]
+    assert solver_chain(psd_problem(2), None) == [None]
+
+    small = solver_chain(psd_problem(2), "auto")
+    large_dim = int(np.sqrt(INTERIOR_POINT_MAX_VARIABLES)) + 1
+    large = solver_chain(psd_problem(large_dim), "AUTO")
+    assert sorted(small) == sorted(large)
+    if "CLARABEL" in cvxpy.installed_solvers():
+        assert small[0] == "CLARABEL"
+    assert large[0] == "SCS"
+
+
+def test_solve_problem_auto():
+    """The solver used by "auto" is recorded along with the attempts."""
+    opt_val, solve_stats = solve_problem(
+        psd_problem(2), 0.0, solver="auto", eps=1e-7
+    )
+    np.testing.assert_allclose(opt_val, 1, atol=1e-6)
+    assert solve_stats.solver == solver_chain(psd_problem(2), "auto")[0]
+    assert solve_stats.attempts == [f"{solve_stats.solver}: optimal"]
+
+    # A tolerance is passed to every solver under its own name.
+    opt_val, solve_stats = solve_problem(
+        psd_problem(2), 0.0, solver="CLARABEL", eps=1e-7
+    )
+    np.testing.assert_allclose(opt_val, 1, atol=1e-6)
+    assert solve_stats.attempts is None
+
+
+def test_solve_problem_fallback(monkeypatch):
+    """A solver failing on the problem is followed by the next one of the chain."""
+    monkeypatch.setattr(
+        stats, "solver_chain", lambda problem, solver: ["ECOS", "SCS"]
+    )
+    opt_val, solve_stats = solve_problem(psd_problem(2), 0.0, solver="auto")
+    np.testing.assert_allclose(opt_val, 1, atol=1e-4)
+    assert solve_stats.solver == "SCS"
+    assert solve_stats.attempts == ["ECOS: failed", "SCS: optimal"]
+
+    monkeypatch.setattr(
+        stats, "solver_chain", lambda problem, solver: ["ECOS"]
+    )
+    np.testing.assert_raises(
+        cvxpy.SolverError, solve_problem, psd_problem(2), 0.0, solver="auto"
+    )
+
+
+def test_solver_options_limits():
+    """Time and iteration limits are mapped onto the native options of each solver."""
+    assert solver_options("SCS", None, 2.0, 10) == {
+        "time_limit_secs": 2.0,
+        "max_iters": 10,
+    }
+    assert solver_options("CLARABEL", None, 2.0, 10) == {
+        "time_limit": 2.0,
+        "max_iter": 10,
+    }
+    assert solver_options("CVXOPT", None, 2.0, 10) == {"maxiters": 10}
+    assert solver_options("MOSEK", None, 2.0)["mosek_params"] == {
+        "MSK_DPAR_OPTIMIZER_MAX_TIME": 2.0
+    }
@@ -14,6 +14,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import numpy as np
+from toqito.channels import partial_trace, partial_transpose
 from toqito.states import basis, bell
 
 from qustop import State
@@ -43,6 +44,13 @@ def test_state_shape():
     np.testing.assert_equal(state_matrix.shape, (4, 4))
 
 
+def test_state_bipartite_dims():
+    """Alice's and Bob's dimensions once Alice's subsystems are grouped first."""
+    state = State(np.identity(120) / 120, [2, 3, 4, 5])
+    state.swap([2, 3])
+    np.testing.assert_equal(state.bipartite_dims, [8, 15])
+
+
 def test_state_kron():
     """Test kronecker product."""
     dims = [2, 2]
@@ -65,6 +73,67 @@ def test_state_kron():
     )
 
 
+def test_state_copies():
+    """The copies agree with the Kronecker product followed by swaps that group Alice's systems."""
+    rng = np.random.default_rng(0)
+    mat = rng.normal(size=(6, 6)) + 1j * rng.normal(size=(6, 6))
+    mat = mat @ mat.conj().T
+    for value in [bell(1), mat / np.trace(mat)]:
+        state = State(value, [2, 3] if value.shape[0] == 6 else [2, 2])
+        expected = state.kron(state)
+        expected.swap([2, 3])
+
+        copies = state.copies(2)
+        np.testing.assert_allclose(copies.value, expected.value, atol=1e-12)
+        np.testing.assert_equal(copies.dims, expected.dims)
+        np.testing.assert_equal(copies.systems, [1, 3, 2, 4])
+        np.testing.assert_equal(copies.alice_systems, [1, 3])
+        np.testing.assert_equal(copies.alice_positions, [1, 2])
+
+    three = State(bell(0), [2, 2]).copies(3)
+    np.testing.assert_equal(three.systems, [1, 3, 5, 2, 4, 6])
+    np.testing.assert_equal(three.bipartite_dims, [8, 8])
+    np.testing.assert_allclose(np.trace(three.value), 1)
+
+    with np.testing.assert_raises(ValueError):
+        state.copies(0)
+
+
+def test_state_partial_trace_transpose():
+    """Partial traces and transposes act on the subsystems with the given labels, also after the
+    subsystems are reordered."""
+    rng = np.random.default_rng(0)
+    mat = rng.normal(size=(6, 6)) + 1j * rng.normal(size=(6, 6))
+    mat = mat @ mat.conj().T
+    state = State(mat / np.trace(mat), [2, 3])
+
+    reduced = state.partial_trace([2])
+    np.testing.assert_allclose(
+        reduced.value, partial_trace(state.value, [2], [2, 3]), atol=1e-12
+    )
+    np.testing.assert_equal(reduced.dims, [2])
+    np.testing.assert_equal(reduced.systems, [1])
+    np.testing.assert_allclose(
+        state.partial_transpose([1]).value,
+        partial_transpose(state.value, [1], [2, 3]),
+        atol=1e-12,
+    )
+
+    # The copies are ordered as the systems [1, 3, 2, 4], so label 3 is in position 2.
+    copies = state.copies(2)
+    reduced = copies.partial_trace([3, 4])
+    np.testing.assert_allclose(reduced.value, state.value, atol=1e-12)
+    np.testing.assert_equal(reduced.systems, [1, 2])
+    np.testing.assert_allclose(
+        copies.partial_transpose([3]).value,
+        partial_transpose(copies.value, [2], copies.dims),
+        atol=1e-12,
+    )
+
+    with np.testing.assert_raises(ValueError):
+        state.partial_trace([3])
+
+
 def test_state_purity():
     """Ensure pure states are flagged as pure and non-pure are flagged as mixed states."""
     # Define single-qubit |0> and |1> basis states.
@@ -0,0 +1,125 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import cvxpy
+import numpy as np
+
+from qustop import SolveStats
+from qustop.core.stats import MemoryTracker, merge_stats, solve_problem
+
+
+def test_solve_stats_str_repr():
+    """Test overloaded __str__ method for `SolveStats`."""
+    stats = SolveStats(build_time=1.0, compile_time=2.0, solver_time=3.0)
+    assert isinstance(str(stats), str) is True
+    np.testing.assert_equal(np.isclose(stats.total_time, 6.0), True)
+
+
+def test_solve_stats_to_dict():
+    """Check that `to_dict` contains all of the recorded statistics."""
+    stats = SolveStats(iterations=10, status="optimal", num_variables=4)
+    stats_dict = stats.to_dict()
+    assert stats_dict["iterations"] == 10
+    assert stats_dict["status"] == "optimal"
+    assert stats_dict["num_variables"] == 4
+    assert "total_time" in stats_dict
+
+
+def test_solve_problem_records_stats():
+    """Solving a small SDP should record timings, sizes, and status."""
+    build_start = 0.0
+    x_var = cvxpy.Variable((2, 2), hermitian=True)
+    problem = cvxpy.Problem(
+        cvxpy.Maximize(cvxpy.real(x_var[0, 0])),
+        [x_var >> 0, cvxpy.real(cvxpy.trace(x_var)) == 1],
+    )
+    opt_val, stats = solve_problem(problem, build_start, solver="SCS")
+
+    np.testing.assert_equal(np.isclose(opt_val, 1, atol=1e-4), True)
+    assert stats.status == "optimal"
+    assert stats.solver == "SCS"
+    assert stats.iterations > 0
+    assert stats.num_variables == 4
+    assert stats.num_constraints > 0
+    assert stats.build_time > 0
+    assert stats.compile_time >= 0
+    assert stats.solver_time >= 0
+
+
+def test_solve_problem_limits():
+    """A solver stopped by a limit returns its last iterate and objectives instead of raising."""
+    x_var = cvxpy.Variable((4, 4), hermitian=True)
+    problem = cvxpy.Problem(
+        cvxpy.Maximize(cvxpy.real(cvxpy.trace(x_var @ np.diag([1, 2, 3, 4])))),
+        [x_var >> 0, cvxpy.real(cvxpy.trace(x_var)) == 1],
+    )
+    opt_val, stats = solve_problem(
+        problem, 0.0, solver="SCS", eps=1e-12, max_iters=3
+    )
+    assert stats.status == cvxpy.OPTIMAL_INACCURATE
+    assert stats.iterations == 3
+    assert opt_val == stats.last_primal_objective
+    assert stats.last_dual_objective is not None
+    assert stats.primal_bound is None and stats.dual_bound is None
+
+    opt_val, stats = solve_problem(problem, 0.0, solver="SCS", eps=1e-8)
+    np.testing.assert_allclose(stats.last_primal_objective, 4, atol=1e-6)
+    np.testing.assert_allclose(stats.last_dual_objective, 4, atol=1e-6)
+
+    opt_val, stats = solve_problem(problem, 0.0, solver="CVXOPT", max_iters=1)
+    assert opt_val is None
+    assert stats.status == cvxpy.SOLVER_ERROR
+    np.testing.assert_raises(
+        cvxpy.SolverError,
+        solve_problem,
+        problem,
+        0.0,
+        solver="CVXOPT",
+        maxiters=1,
+    )
+
+
+def test_merge_stats():
+    """The statistics of independent blocks add up and keep the worst status."""
+    stats = merge_stats(
+        [
+            SolveStats(solver_time=1.0, status="optimal", primal_bound=0.5),
+            SolveStats(
+                solver_time=2.0,
+                status="optimal_inaccurate",
+                primal_bound=0.25,
+                num_variables=3,
+            ),
+        ]
+    )
+    assert stats.solver_time == 3.0
+    assert stats.status == "optimal_inaccurate"
+    assert stats.primal_bound == 0.75
+    assert stats.dual_bound is None
+    assert stats.num_variables == 3
+
+
+def test_peak_memory_per_solve():
+    """The peak memory of a solve does not carry over the peak of earlier work."""
+    x_var = cvxpy.Variable(2)
+    problem = cvxpy.Problem(cvxpy.Maximize(cvxpy.sum(x_var)), [x_var <= 1])
+
+    with MemoryTracker() as large:
+        # Touch every page so the allocation is resident.
+        data = np.ones(25_000_000)
+        del data
+    _, stats = solve_problem(problem, 0.0, solver="SCS")
+    assert stats.peak_memory > 0
+    assert stats.peak_memory < large.peak - 100_000_000
@@ -0,0 +1,190 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Binary ensemble files that are memory-mapped instead of loaded.
+
+An ensemble file consists of:
+
+    * the magic bytes :code:`b"QUSTOPEN"`,
+    * the length of the header as a little-endian unsigned 64-bit integer,
+    * a UTF-8 JSON header with the number of states, their dimension, whether they are stored as
+      kets or density matrices, the dimensions and labels of the subsystems and the
+      probabilities of the states,
+    * padding up to a multiple of 64 bytes,
+    * the states as one contiguous little-endian complex128 array of shape `(N, d)` for kets or
+      `(N, d, d)` for density matrices.
+
+The body is opened with :code:`np.memmap`, so the states are paged in by the operating system
+only when they are accessed and the pages are shared between all processes reading the file.
+"""
+from __future__ import annotations
+
+import json
+import struct
+from collections.abc import Sequence
+from typing import Optional, Union
+
+import numpy as np
+
+from qustop.core import Ensemble, State
+
+MAGIC = b"QUSTOPEN"
+VERSION = 1
+ALIGNMENT = 64
+DTYPE = np.dtype("<c16")
+
+
+def write_ensemble(
+    path: str,
+    states: Union[Ensemble, np.ndarray],
+    dims: Optional[list[int]] = None,
+    probs: Optional[list[float]] = None,
+    systems: Optional[list[int]] = None,
+) -> None:
+    """Writes an ensemble file.
+
+    Args:
+        path: The path of the file.
+        states: Either an :code:`Ensemble` or an array of kets of shape `(N, d)` or of density
+            matrices of shape `(N, d, d)`. Arrays, including memory-mapped ones, are written
+            without creating any :code:`State` objects.
+        dims: The dimensions of the subsystems, required if `states` is an array.
+        probs: The probabilities of the states, uniform by default.
+        systems: The labels of the subsystems, `[1, ..., len(dims)]` by default.
+
+    Raises:
+        ValueError:
+            * If `dims` is missing or does not match the dimension of the states.
+            * If `states` is neither an array of kets nor of density matrices.
+    """
+    if isinstance(states, Ensemble):
+        dims = states.dims if dims is None else dims
+        probs = states.probs if probs is None else probs
+        systems = states.systems if systems is None else systems
+        states = np.array(states.density_matrices)
+
+    if dims is None:
+        raise ValueError("The dimensions of the subsystems must be provided.")
+    if states.ndim not in (2, 3) or (
+        states.ndim == 3 and states.shape[1] != states.shape[2]
+    ):
+        raise ValueError(
+            "The states must be an array of kets `(N, d)` or density matrices `(N, d, d)`."
+        )
+    num_states, dim = states.shape[0], states.shape[1]
+    if int(np.prod(dims)) != dim:
+        raise ValueError(
+            f"The product of `dims` should be equal to the dimension {dim} of the states."
+        )
+
+    header = {
+        "version": VERSION,
+        "num_states": num_states,
+        "dim": dim,
+        "kind": "ket" if states.ndim == 2 else "density",
+        "dtype": DTYPE.str,
+        "dims": [int(d) for d in dims],
+        "systems": [int(s) for s in systems]
+        if systems is not None
+        else list(range(1, len(dims) + 1)),
+        "probs": [float(p) for p in probs]
+        if probs is not None
+        else [1 / num_states] * num_states,
+    }
+    header_bytes = json.dumps(header).encode()
+    offset = len(MAGIC) + 8 + len(header_bytes)
+    padding = -offset % ALIGNMENT
+
+    with open(path, "wb") as out:
+        out.write(MAGIC)
+        out.write(struct.pack("<Q", len(header_bytes) + padding))
+        out.write(header_bytes + b" " * padding)
+        # Write the states one at a time so that memory-mapped inputs are never fully loaded.
+        for state in states:
+            out.write(np.ascontiguousarray(state, dtype=DTYPE).tobytes())
+
+
+def read_header(path: str) -> tuple[dict, int]:
+    """Returns the header of an ensemble file and the offset of its body.
+
+    Raises:
+        ValueError:
+            * If the file is not an ensemble file.
+    """
+    with open(path, "rb") as src:
+        if src.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a qustop ensemble file.")
+        (header_len,) = struct.unpack("<Q", src.read(8))
+        header = json.loads(src.read(header_len).decode())
+    return header, len(MAGIC) + 8 + header_len
+
+
+def read_ensemble(path: str) -> Ensemble:
+    """Opens an ensemble file as an :code:`Ensemble` whose states are read lazily."""
+    states = MappedStates(path)
+    return Ensemble.trusted(states, states.header["probs"])
+
+
+class MappedStates(Sequence):
+    """The states of an ensemble file as a lazy sequence of :code:`State` objects.
+
+    The file is memory-mapped on first access, and each :code:`State` is created when it is
+    indexed. Pickling only transfers the path, so worker processes map the same file instead of
+    receiving copies of the states.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self.header, self._offset = read_header(path)
+        self._array: Optional[np.memmap] = None
+
+    def __len__(self) -> int:
+        return self.header["num_states"]
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[State, list[State]]:
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        if not -len(self) <= key < len(self):
+            raise IndexError(f"State {key} is out of range.")
+
+        state = self.array[key]
+        if self.header["kind"] == "ket":
+            state = np.outer(state, state.conj())
+        return State.trusted(
+            state, self.header["dims"], self.header["systems"]
+        )
+
+    def __getstate__(self) -> dict:
+        return {**self.__dict__, "_array": None}
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def array(self) -> np.memmap:
+        """The read-only memory-mapped array of kets or density matrices."""
+        if self._array is None:
+            dim = self.header["dim"]
+            shape = (len(self), dim) + (
+                (dim,) if self.header["kind"] == "density" else ()
+            )
+            self._array = np.memmap(
+                self._path,
+                dtype=np.dtype(self.header["dtype"]),
+                mode="r",
+                offset=self._offset,
+                shape=shape,
+            )
+        return self._array
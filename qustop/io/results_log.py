@@ -0,0 +1,145 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Append-only log of results for long-running searches."""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+
+class ResultsLog:
+    """An append-only JSONL log of results, with matrices stored in `.npz` sidecar files.
+
+    Each record is a JSON object holding at least the `fingerprint` of the ensemble it belongs to.
+    Records are flushed and synced to disk as soon as they are written, so at most the record
+    being written is lost if the process is killed. A truncated last line left behind by such an
+    interruption is discarded when the log is reopened.
+    """
+
+    def __init__(self, path: str, resume: bool = True) -> None:
+        """Opens a results log.
+
+        Args:
+            path: The path of the JSONL file. The sidecar files are stored in the directory
+                `path + ".arrays"`.
+            resume: Whether to recover the fingerprints of an existing log, so that the ensembles
+                already solved are skipped. Otherwise, the log starts without fingerprints. New
+                records are appended in either case, and existing records are never removed.
+        """
+        self._path = path
+        self._array_dir = path + ".arrays"
+        self._fingerprints: set[str] = set()
+
+        if os.path.exists(path):
+            self._recover(resume)
+        self._file = open(path, "a")
+
+    def __enter__(self) -> ResultsLog:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return fingerprint in self._fingerprints
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def fingerprints(self) -> set[str]:
+        return self._fingerprints
+
+    def write(
+        self,
+        record: dict[str, Any],
+        arrays: Optional[dict[str, np.ndarray]] = None,
+    ) -> None:
+        """Appends a record to the log.
+
+        Args:
+            record: A JSON serializable record with a `fingerprint` entry.
+            arrays: Matrices belonging to the record, e.g. the optimal measurements. They are
+                written to `<fingerprint>.npz` before the record itself, so every record in the
+                log refers to a complete sidecar file.
+        """
+        fingerprint = record["fingerprint"]
+        if arrays:
+            os.makedirs(self._array_dir, exist_ok=True)
+            sidecar = os.path.join(self._array_dir, f"{fingerprint}.npz")
+            tmp_path = sidecar + ".tmp"
+            with open(tmp_path, "wb") as tmp:
+                np.savez(tmp, **arrays)
+            os.replace(tmp_path, sidecar)
+            record = {**record, "arrays": os.path.basename(sidecar)}
+
+        self._file.write(json.dumps(record, default=_to_json) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._fingerprints.add(fingerprint)
+
+    def arrays(self, fingerprint: str) -> dict[str, np.ndarray]:
+        """Returns the matrices stored alongside the record of `fingerprint`."""
+        path = os.path.join(self._array_dir, f"{fingerprint}.npz")
+        with np.load(path) as data:
+            return dict(data)
+
+    def close(self) -> None:
+        self._file.close()
+
+    @staticmethod
+    def read(path: str) -> Iterator[dict[str, Any]]:
+        """Yields the complete records of the log at `path`."""
+        with open(path) as log:
+            for line in log:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+
+    def _recover(self, load_fingerprints: bool) -> None:
+        """Drops a truncated last line of an existing log and optionally loads its fingerprints."""
+        valid_size = 0
+        with open(self._path, "rb") as log:
+            for line in log:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    fingerprint = json.loads(line)["fingerprint"]
+                except (ValueError, KeyError):
+                    break
+                if load_fingerprints:
+                    self._fingerprints.add(fingerprint)
+                valid_size += len(line)
+
+        if valid_size != os.path.getsize(self._path):
+            with open(self._path, "r+b") as log:
+                log.truncate(valid_size)
+
+
+def _to_json(obj: Any) -> Any:
+    """Converts the NumPy scalars and arrays appearing in records to JSON types."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(
+        f"Object of type {type(obj).__name__} is not JSON serializable."
+    )
@@ -0,0 +1,90 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pickle
+
+import numpy as np
+from toqito.states import bell
+
+from qustop import Ensemble, OptDist, State
+from qustop.io import read_ensemble, write_ensemble
+from qustop.io.ensemble_file import ALIGNMENT, read_header
+
+
+def test_ensemble_file_round_trip(tmp_path):
+    """An ensemble written to a file is read back with the same states and probabilities."""
+    path = str(tmp_path / "bell.qens")
+    ensemble = Ensemble(
+        [State(bell(i), [2, 2]) for i in range(3)], [0.2, 0.3, 0.5]
+    )
+    write_ensemble(path, ensemble)
+
+    mapped = Ensemble.from_file(path)
+    assert len(mapped) == 3
+    assert mapped.dims == [2, 2]
+    assert mapped.probs == [0.2, 0.3, 0.5]
+    assert mapped.fingerprint == ensemble.fingerprint
+    assert isinstance(mapped.density_matrices[0], np.memmap)
+
+    res = OptDist(mapped, "pos", "min-error")
+    res.solve()
+    np.testing.assert_equal(np.isclose(res.value, 1), True)
+
+
+def test_ensemble_file_kets(tmp_path):
+    """Kets are stored as an `(N, d)` array and expanded when a state is accessed."""
+    path = str(tmp_path / "kets.qens")
+    kets = np.array([bell(i).ravel() for i in range(4)])
+    write_ensemble(path, kets, [2, 2])
+
+    header, offset = read_header(path)
+    assert header["kind"] == "ket"
+    assert offset % ALIGNMENT == 0
+
+    ensemble = read_ensemble(path)
+    for i in range(4):
+        np.testing.assert_allclose(
+            ensemble[i].value, bell(i) * bell(i).conj().T
+        )
+    assert len(ensemble.states[1:3]) == 2
+
+
+def test_ensemble_file_pickles_path_only(tmp_path):
+    """Pickled file-backed ensembles refer to the file instead of copying the states."""
+    path = str(tmp_path / "kets.qens")
+    kets = np.tile(bell(0).ravel(), (1000, 1))
+    write_ensemble(path, kets, [2, 2])
+
+    ensemble = read_ensemble(path)
+    ensemble[0]
+    payload = pickle.dumps(ensemble)
+    assert len(payload) < kets.nbytes
+    np.testing.assert_allclose(
+        pickle.loads(payload)[999].value, bell(0) * bell(0).conj().T
+    )
+
+
+def test_invalid_ensemble_file(tmp_path):
+    """Files without the magic bytes and inconsistent dimensions are rejected."""
+    path = str(tmp_path / "invalid.qens")
+    with open(path, "wb") as out:
+        out.write(b"not an ensemble")
+    with np.testing.assert_raises(ValueError):
+        read_ensemble(path)
+
+    with np.testing.assert_raises(ValueError):
+        write_ensemble(path, np.ones((2, 4)), [2, 3])
+    with np.testing.assert_raises(ValueError):
+        write_ensemble(path, np.ones((2, 4)))
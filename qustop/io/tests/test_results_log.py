@@ -0,0 +1,65 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+
+import numpy as np
+
+from qustop.io import ResultsLog
+
+
+def test_results_log_write_and_read(tmp_path):
+    """Records are appended and their matrices are stored in sidecars."""
+    path = str(tmp_path / "results.jsonl")
+    with ResultsLog(path) as log:
+        log.write({"fingerprint": "a", "value": np.float64(0.5)})
+        log.write(
+            {"fingerprint": "b", "value": 1.0},
+            arrays={"measurement_0": np.identity(2)},
+        )
+        assert "a" in log and "b" in log
+        np.testing.assert_equal(
+            log.arrays("b")["measurement_0"], np.identity(2)
+        )
+
+    records = list(ResultsLog.read(path))
+    assert [rec["fingerprint"] for rec in records] == ["a", "b"]
+    assert records[0]["value"] == 0.5
+    assert records[1]["arrays"] == "b.npz"
+
+
+def test_results_log_resume_drops_truncated_line(tmp_path):
+    """Reopening a log recovers its fingerprints and discards a partial record."""
+    path = str(tmp_path / "results.jsonl")
+    with open(path, "w") as out:
+        out.write(json.dumps({"fingerprint": "a"}) + "\n")
+        out.write('{"fingerprint": "b", "val')
+
+    with ResultsLog(path) as log:
+        assert log.fingerprints == {"a"}
+        log.write({"fingerprint": "c"})
+
+    assert [rec["fingerprint"] for rec in ResultsLog.read(path)] == ["a", "c"]
+
+
+def test_results_log_without_resume(tmp_path):
+    """Without resume, the earlier records are kept but their fingerprints are not skipped."""
+    path = str(tmp_path / "results.jsonl")
+    with ResultsLog(path) as log:
+        log.write({"fingerprint": "a"})
+    with ResultsLog(path, resume=False) as log:
+        assert len(log) == 0 and "a" not in log
+        log.write({"fingerprint": "a", "value": 1.0})
+    assert [rec["fingerprint"] for rec in ResultsLog.read(path)] == ["a", "a"]
@@ -13,16 +13,33 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Any
+import time
+from typing import Any, Callable, Optional
 
 import cvxpy
 import numpy as np
-from toqito.matrix_ops import tensor
 
 from qustop.core import Ensemble
+from qustop.core.stats import SolveStats, solve_problem
 
 
 class OptClone:
+    r"""Optimal probability of counterfeiting states drawn from an ensemble.
+
+    For ``num_reps`` parallel repetitions the primal problem maximizes
+    :math:`\langle W Q^{\otimes n} W^*, X \rangle` over :math:`X \geq 0` with
+    :math:`\text{Tr}_{\mathcal{Y}^{\otimes n} \otimes \mathcal{Z}^{\otimes n}}(X) = \mathbb{I}`,
+    where :math:`Q = \sum_k p_k \rho_k \otimes \rho_k \otimes \overline{\rho_k}` and :math:`W`
+    reorders the spaces into :math:`\mathcal{Y}^{\otimes n} \otimes \mathcal{Z}^{\otimes n}
+    \otimes \mathcal{X}^{\otimes n}`. The dual minimizes :math:`\text{Tr}(Y)` subject to
+    :math:`\mathbb{I} \otimes Y \geq W Q^{\otimes n} W^*` (arXiv:1202.4010).
+
+    Both problems are invariant under permutations of the repetitions and the
+    value is multiplicative, so passing ``use_symmetry=True`` solves a single
+    repetition and returns the tensor power of its solution. This keeps the SDP
+    at size :math:`d^3` for any ``num_reps``.
+    """
+
     def __init__(
         self,
         ensemble: Ensemble,
@@ -36,23 +53,43 @@ class OptClone:
         self._solver = kwargs.get("solver", "SCS")
         self._verbose = kwargs.get("verbose", False)
         self._eps = kwargs.get("eps", 1e-8)
+        self._time_limit = kwargs.get("time_limit", None)
+        self._max_iters = kwargs.get("max_iters", None)
+        self._use_symmetry = kwargs.get("use_symmetry", False)
+        self._callback: Optional[Callable[[SolveStats], None]] = kwargs.get(
+            "callback", None
+        )
 
         self._optimal_value = None
         self._optimal_measurements: list[np.ndarray] = []
+        self._stats: Optional[SolveStats] = None
 
         self._states = self._ensemble.density_matrices
         self._probs = self._ensemble.probs
 
+        self._dim = self._ensemble.shape[0]
+
     @property
     def value(self) -> float:
         return self._optimal_value
 
+    @property
+    def stats(self) -> Optional[SolveStats]:
+        return self._stats
+
     @property
     def measurements(self) -> list[np.ndarray]:
-        if isinstance(self._optimal_measurements[0], cvxpy.Variable):
+        if isinstance(self._optimal_measurements[0], cvxpy.Expression):
             self._optimal_measurements = self.convert_measurements(
                 self._optimal_measurements
             )
+            if self._use_symmetry and self._num_reps > 1:
+                self._optimal_measurements = [
+                    self.repeated_operator(choi, self._dim, self._num_reps)
+                    if choi is not None
+                    else None
+                    for choi in self._optimal_measurements
+                ]
         return self._optimal_measurements
 
     @staticmethod
@@ -60,41 +97,125 @@ class OptClone:
         return [measurements[i].value for i in range(len(measurements))]
 
     def solve(self) -> None:
-        """Depending on the measurement method selected, solve the appropriate optimization problem."""
-        dim = len(self._states[0]) ** 3
+        """Solve either the primal or dual problem for the cloning SDP."""
+        # Q is positive semidefinite, so the tensor powers of optimal single-copy
+        # primal and dual solutions are feasible for the n-fold problem and
+        # certify that its optimal value is the n-th power of the single-copy one.
+        num_reps = 1 if self._use_symmetry else self._num_reps
+
+        # Return the optimal value and the optimal cloning channel.
+        if self._return_optimal_meas:
+            self.primal_problem(num_reps)
+
+        # Otherwise, the dual problem has a variable of much smaller dimension.
+        else:
+            self.dual_problem(num_reps)
 
-        # Construct the following operator:
+        if self._use_symmetry and self._optimal_value is not None:
+            self._optimal_value = self._optimal_value**self._num_reps
+
+        if self._callback is not None and self._stats is not None:
+            self._callback(self._stats)
+
+    def cloning_operator(self, num_reps: Optional[int] = None) -> np.ndarray:
+        r"""Returns the operator :math:`W Q^{\otimes n} W^*` of the objective function."""
+        dim = self._dim
+
+        # Construct the following operator over Y ⊗ Z ⊗ X:
         #                                ___               ___
         # Q = ∑_{k=1}^N p_k |ψ_k ⊗ ψ_k ⊗ ψ_k> <ψ_k ⊗ ψ_k ⊗ ψ_k|
-        q_a = np.zeros((dim, dim))
-        for k, state in enumerate(self._states):
-            q_a += (
-                self._probs[k]
-                * tensor(state, state, state.conj())
-                * tensor(state, state, state.conj()).conj().T
-            )
+        q_a = sum(
+            self._probs[k]
+            * np.einsum("ad,be,cf->abcdef", state, state, state.conj())
+            for k, state in enumerate(self._states)
+        ).reshape(dim**3, dim**3)
+        return self.repeated_operator(
+            q_a, dim, self._num_reps if num_reps is None else num_reps
+        )
 
-        # The system is over:
-        # Y_1 ⊗ Z_1 ⊗ X_1, ... , Y_n ⊗ Z_n ⊗ X_n.
-        num_spaces = 3
-
-        # In the event of more than a single repetition, one needs to apply a
-        # permutation operator to the variables in the SDP to properly align
-        # the spaces.
-        if num_reps == 1:
-            pperm = np.array([1])
-        else:
-            # The permutation vector `perm` contains elements of the
-            # sequence from: https://oeis.org/A023123
-            q_a = tensor(q_a, num_reps)
-            perm = []
-            for i in range(1, num_spaces + 1):
-                perm.append(i)
-                var = i
-                for j in range(1, num_reps):
-                    perm.append(var + num_spaces * j)
-            pperm = permutation_operator(2, perm)
-
-        if strategy:
-            return primal_problem(q_a, pperm, num_reps)
-        return dual_problem(q_a, pperm, num_reps)
+    @staticmethod
+    def repeated_operator(
+        op: np.ndarray, dim: int, num_reps: int
+    ) -> np.ndarray:
+        r"""Returns :math:`W A^{\otimes n} W^*` for an operator :math:`A` on :math:`Y \otimes Z \otimes X`.
+
+        The reordering :math:`W` is applied as a permutation of the tensor indices of
+        :math:`A^{\otimes n}`, so no permutation matrix is ever constructed.
+        """
+        op_a = op.reshape([dim] * 6)
+
+        # The n-fold tensor product has its axes ordered as
+        # (y_1, z_1, x_1, ..., y_n, z_n, x_n, y'_1, z'_1, x'_1, ..., y'_n, z'_n, x'_n).
+        op_n = op_a
+        for rep in range(1, num_reps):
+            op_n = np.multiply.outer(op_n, op_a)
+            axes = list(range(op_n.ndim))
+            # Move the row indices of the new repetition in front of the
+            # column indices of the previous repetitions.
+            rows = axes[: 3 * rep] + axes[6 * rep : 6 * rep + 3]
+            cols = axes[3 * rep : 6 * rep] + axes[6 * rep + 3 :]
+            op_n = op_n.transpose(rows + cols)
+
+        # Reorder (Y_1 ⊗ Z_1 ⊗ X_1) ⊗ ... ⊗ (Y_n ⊗ Z_n ⊗ X_n) into
+        # (Y_1 ⊗ ... ⊗ Y_n) ⊗ (Z_1 ⊗ ... ⊗ Z_n) ⊗ (X_1 ⊗ ... ⊗ X_n).
+        perm = [
+            3 * rep + space for space in range(3) for rep in range(num_reps)
+        ]
+        perm += [3 * num_reps + idx for idx in perm]
+        total_dim = dim ** (3 * num_reps)
+        return op_n.transpose(perm).reshape(total_dim, total_dim)
+
+    def primal_problem(self, num_reps: Optional[int] = None) -> None:
+        """Calculate primal problem for the cloning SDP."""
+        build_start = time.perf_counter()
+        num_reps = self._num_reps if num_reps is None else num_reps
+        dim_yz = self._dim ** (2 * num_reps)
+        dim_x = self._dim**num_reps
+        q_a = self.cloning_operator(num_reps)
+
+        x_var = cvxpy.Variable(q_a.shape, hermitian=True)
+        objective = cvxpy.Maximize(
+            cvxpy.real(cvxpy.sum(cvxpy.multiply(q_a.conj(), x_var)))
+        )
+        constraints = [
+            cvxpy.partial_trace(x_var, [dim_yz, dim_x], axis=0)
+            == np.identity(dim_x),
+            x_var >> 0,
+        ]
+
+        problem = cvxpy.Problem(objective, constraints)
+        opt_val, self._stats = solve_problem(
+            problem,
+            build_start,
+            solver=self._solver,
+            verbose=self._verbose,
+            eps=self._eps,
+            time_limit=self._time_limit,
+            max_iters=self._max_iters,
+        )
+        self._optimal_value = opt_val
+        self._optimal_measurements = [x_var]
+
+    def dual_problem(self, num_reps: Optional[int] = None) -> None:
+        """Calculate dual problem for the cloning SDP."""
+        build_start = time.perf_counter()
+        num_reps = self._num_reps if num_reps is None else num_reps
+        dim_yz = self._dim ** (2 * num_reps)
+        dim_x = self._dim**num_reps
+        q_a = self.cloning_operator(num_reps)
+
+        y_var = cvxpy.Variable((dim_x, dim_x), hermitian=True)
+        objective = cvxpy.Minimize(cvxpy.real(cvxpy.trace(y_var)))
+        constraints = [cvxpy.kron(np.identity(dim_yz), y_var) >> q_a]
+
+        problem = cvxpy.Problem(objective, constraints)
+        opt_val, self._stats = solve_problem(
+            problem,
+            build_start,
+            solver=self._solver,
+            verbose=self._verbose,
+            eps=self._eps,
+            time_limit=self._time_limit,
+            max_iters=self._max_iters,
+        )
+        self._optimal_value = opt_val
@@ -0,0 +1,124 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import numpy as np
+import pytest
+from toqito.states import basis
+
+from qustop import Ensemble, State
+from qustop.opt_clone import OptClone
+
+
+def wiesner_ensemble() -> Ensemble:
+    """The BB84 states used in Wiesner's quantum money scheme."""
+    e_0, e_1 = basis(2, 0), basis(2, 1)
+    e_p, e_m = (e_0 + e_1) / np.sqrt(2), (e_0 - e_1) / np.sqrt(2)
+    return Ensemble(
+        [State(vec * vec.conj().T, [2]) for vec in [e_0, e_1, e_p, e_m]],
+        [1 / 4, 1 / 4, 1 / 4, 1 / 4],
+    )
+
+
+@pytest.mark.parametrize("num_reps", [1, 2])
+@pytest.mark.parametrize("return_optimal_meas", [True, False])
+def test_wiesner_counterfeit(num_reps, return_optimal_meas):
+    """Counterfeiting Wiesner's money succeeds with probability (3/4)^n."""
+    res = OptClone(
+        wiesner_ensemble(), num_reps, return_optimal_meas=return_optimal_meas
+    )
+    res.solve()
+    np.testing.assert_allclose(res.value, (3 / 4) ** num_reps, atol=1e-5)
+    assert res.stats.status == "optimal"
+
+
+def test_cloning_operator_reorders_spaces():
+    """The cloning operator agrees with an explicit permutation of Q ⊗ Q."""
+    ensemble = wiesner_ensemble()
+    res = OptClone(ensemble, 2)
+
+    q_a = sum(
+        prob * np.kron(np.kron(rho, rho), rho.conj())
+        for prob, rho in zip(ensemble.probs, ensemble.density_matrices)
+    )
+    # Map (y_1, z_1, x_1, y_2, z_2, x_2) to (y_1, y_2, z_1, z_2, x_1, x_2).
+    dim = 2**6
+    perm = np.zeros((dim, dim))
+    for old in range(dim):
+        digits = np.unravel_index(old, [2] * 6)
+        new = np.ravel_multi_index(
+            [digits[i] for i in [0, 3, 1, 4, 2, 5]], [2] * 6
+        )
+        perm[new, old] = 1
+
+    np.testing.assert_allclose(
+        res.cloning_operator(), perm @ np.kron(q_a, q_a) @ perm.T, atol=1e-12
+    )
+
+
+def test_cloning_measurements():
+    """The primal returns a cloning channel with the required partial trace."""
+    res = OptClone(wiesner_ensemble(), 1)
+    res.solve()
+    choi = res.measurements[0]
+    np.testing.assert_allclose(
+        np.trace(choi.reshape(4, 2, 4, 2), axis1=0, axis2=2),
+        np.identity(2),
+        atol=1e-5,
+    )
+
+
+@pytest.mark.parametrize("return_optimal_meas", [True, False])
+def test_symmetric_matches_full_problem(return_optimal_meas):
+    """The symmetry reduction agrees with the full two-fold problem."""
+    rng = np.random.default_rng(0)
+    states = []
+    for _ in range(3):
+        mat = rng.normal(size=(2, 2)) + 1j * rng.normal(size=(2, 2))
+        rho = mat @ mat.conj().T
+        states.append(State(rho / np.trace(rho), [2]))
+    ensemble = Ensemble(states, [0.2, 0.3, 0.5])
+    full = OptClone(ensemble, 2, return_optimal_meas=return_optimal_meas)
+    full.solve()
+    sym = OptClone(
+        ensemble, 2, return_optimal_meas=return_optimal_meas, use_symmetry=True
+    )
+    sym.solve()
+    np.testing.assert_allclose(sym.value, full.value, atol=1e-5)
+
+
+def test_symmetric_wiesner_three_reps():
+    """The symmetry reduction reaches n = 3 and returns the repeated channel."""
+    res = OptClone(wiesner_ensemble(), 3, use_symmetry=True)
+    res.solve()
+    np.testing.assert_allclose(res.value, (3 / 4) ** 3, atol=1e-5)
+
+    choi = res.measurements[0]
+    np.testing.assert_equal(choi.shape, (2**9, 2**9))
+    q_a = res.cloning_operator()
+    np.testing.assert_allclose(
+        np.real(np.trace(q_a.conj().T @ choi)), (3 / 4) ** 3, atol=1e-5
+    )
+
+
+def test_solver_failure_with_limit():
+    """A solver failing within its iteration limit reports its status instead of raising."""
+    res = OptClone(
+        wiesner_ensemble(), 2, use_symmetry=True, solver="CVXOPT", max_iters=1
+    )
+    res.solve()
+    assert res.value is None
+    assert res.stats.status == "solver_error"
+    assert res.measurements == [None]
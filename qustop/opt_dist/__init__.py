@@ -17,4 +17,6 @@
 from qustop.opt_dist.positive import Positive
 from qustop.opt_dist.ppt import PPT
 from qustop.opt_dist.separable import Separable
+from qustop.opt_dist.low_rank import LowRank
 from qustop.opt_dist.opt_dist import OptDist
+from qustop.opt_dist.verify import DualCertificate, verify_dual
@@ -0,0 +1,359 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Low-rank (Burer–Monteiro) solver for positive min-error distinguishability."""
+import time
+from typing import Optional
+
+import numpy as np
+from scipy import optimize
+
+from qustop.core import Ensemble, Measurement, State
+from qustop.core.stats import MemoryTracker, SolveStats
+from qustop.opt_dist.verify import DualCertificate, verify_dual
+
+
+class LowRank:
+    """Positive min-error distinguishability with factorized measurement operators.
+
+    The problem is first restricted to the joint support of the states, spanned by the columns
+    of `B`: a measurement of the compressed states :code:`B^* ρ_i B` is lifted to the whole space
+    by assigning the orthogonal complement to the first outcome. For `n` pure states, this
+    reduces the dimension from `d` to at most `n`.
+
+    Each compressed measurement operator is parametrized as :code:`M_i = V_i V_i^*` with a
+    `(k, r)` factor `V_i`, which removes the semidefinite constraints. The completeness
+    constraint :code:`∑_i M_i = I` is enforced by an augmented Lagrangian
+
+        L(V, Λ) = -∑_i p_i tr(ρ_i M_i) + tr(Λ (∑_i M_i - I)) + σ/2 ||∑_i M_i - I||_F^2,
+
+    minimized over the factors with L-BFGS for a fixed multiplier `Λ`, which is then updated by
+    :code:`Λ ← Λ + σ (∑_i M_i - I)`. An iteration costs :code:`O(k^2 n r)` operations instead of
+    the factorization of a system with :code:`n k^2` variables of an interior-point solver.
+
+    The solution is certified from both sides. Normalizing the factors by :code:`S^{-1/2}` with
+    :code:`S = ∑_i M_i` gives a feasible measurement and hence a lower bound. At a stationary
+    point, `Λ` satisfies :code:`(Λ - p_i ρ_i) V_i = 0` and is a candidate for the dual variable
+    `Y` of the dual of equation-21 from arXiv:1707.02571. So is :code:`∑_i p_i ρ_i M_i` of the
+    feasible measurement, which is optimal if the measurement is. The tighter of the rigorous
+    upper bounds that :code:`verify_dual` derives from both candidates is used. If the bounds are further apart than the tolerance, either the dual
+    candidate is inaccurate, in which case the tolerance of the augmented Lagrangian is
+    tightened, or the factorization is stuck at a spurious point, where the gap stays large.
+    In that case, the rank is doubled and the new columns point along the eigenvectors of the
+    negative eigenvalues of :code:`Y - p_i ρ_i`, in which the augmented Lagrangian decreases.
+    """
+
+    def __init__(
+        self,
+        ensemble: Ensemble,
+        dist_method: str,
+        return_optimal_meas: bool,
+        eps: float = 1e-6,
+        rank: Optional[int] = None,
+        max_iters: Optional[int] = None,
+        seed: Optional[int] = None,
+        time_limit: Optional[float] = None,
+    ) -> None:
+        """Initializes the low-rank solver.
+
+        Args:
+            ensemble:
+            dist_method: Only "min-error" is supported.
+            return_optimal_meas: Whether the optimal measurements are to be returned.
+            eps: Tolerance on the certified gap between the lower and upper bound.
+            rank: The initial number of columns of each factor, at least the smallest rank for
+                which the factors can span the joint support of the states, which is the
+                default.
+            max_iters: The maximal number of L-BFGS iterations in total.
+            seed: Seed of the random initial factors.
+            time_limit: The maximal time of a solve in seconds. A solve stopped by it returns
+                the bounds certified for the last iterate.
+
+        Raises:
+            ValueError:
+                * If `dist_method` is not "min-error".
+        """
+        if dist_method != "min-error":
+            raise ValueError(
+                f"Distinguishability method {dist_method} not supported by the low-rank "
+                f"solver, which only solves min-error problems."
+            )
+        self._return_optimal_meas = return_optimal_meas
+        self._eps = eps
+        self._max_iters = max_iters if max_iters is not None else 20000
+        self._time_limit = time_limit
+        self._rng = np.random.default_rng(seed)
+
+        states = np.array(ensemble.density_matrices, dtype=complex)
+        self._probs = np.asarray(ensemble.probs, dtype=float)
+        self._num = states.shape[0]
+
+        # The joint support of the states is the support of their sum.
+        eigs, vecs = np.linalg.eigh(np.sum(states, axis=0))
+        support = eigs > 1e-12 * np.max(eigs)
+        self._support, self._complement = vecs[:, support], vecs[:, ~support]
+        self._states = self._support.conj().T @ states @ self._support
+        self._weighted = self._probs[:, None, None] * self._states
+
+        # Any measurement M of the whole space satisfies
+        # |tr(ρ M) - tr(B^* ρ B B^* M B)| <= 2 sqrt(δ) + δ, where δ = tr(ρ (I - B B^*)) is the
+        # weight of ρ outside of the support, which bounds the error of the compression.
+        leaks = np.maximum(
+            np.real(np.trace(states, axis1=1, axis2=2))
+            - np.real(np.trace(self._states, axis1=1, axis2=2)),
+            0,
+        )
+        self._leak = float(np.sum(self._probs * (2 * np.sqrt(leaks) + leaks)))
+
+        self._compressed = Ensemble.trusted(
+            [State.trusted(state, [state.shape[0]]) for state in self._states],
+            list(self._probs),
+        )
+        # The factors can only sum to the identity if they have enough columns in total.
+        min_rank = max(-(-self.support_dim // self._num), 1)
+        self._rank = max(rank, min_rank) if rank is not None else min_rank
+
+        self._stats: Optional[SolveStats] = None
+        self._certificate: Optional[DualCertificate] = None
+
+    @property
+    def stats(self) -> Optional[SolveStats]:
+        return self._stats
+
+    @property
+    def certificate(self) -> Optional[DualCertificate]:
+        """The verified dual certificate of the compressed problem of the last solve."""
+        return self._certificate
+
+    @property
+    def rank(self) -> int:
+        """The number of columns of each factor reached by the last solve."""
+        return self._rank
+
+    @property
+    def support_dim(self) -> int:
+        """The dimension of the joint support of the states."""
+        return self._support.shape[1]
+
+    def solve(self):
+        """Returns the certified lower bound on the optimal value, and the optimal measurements
+        as a :code:`Measurement` if requested."""
+        build_start = time.perf_counter()
+        deadline = (
+            build_start + self._time_limit
+            if self._time_limit is not None
+            else np.inf
+        )
+        support_dim = self.support_dim
+        shape = (self._num, support_dim, self._rank)
+        factors = self._normalize(
+            self._rng.normal(size=shape) + 1j * self._rng.normal(size=shape)
+        )
+        multiplier = np.zeros((support_dim, support_dim), dtype=complex)
+        build_time = time.perf_counter() - build_start
+
+        solve_start = time.perf_counter()
+        with MemoryTracker() as memory:
+            iterations, tol = 0, self._eps / 10
+            while True:
+                factors, multiplier, num_iters = self._augmented_lagrangian(
+                    factors,
+                    multiplier,
+                    tol,
+                    self._max_iters - iterations,
+                    deadline,
+                )
+                iterations += num_iters
+
+                feasible = self._normalize(factors)
+                lower = self._value(feasible)
+                candidates = [multiplier, self._dual_from(feasible)]
+                certificates = [
+                    verify_dual(self._compressed, candidate)
+                    for candidate in candidates
+                ]
+                best = int(
+                    np.argmin(
+                        [
+                            certificate.upper_bound
+                            for certificate in certificates
+                        ]
+                    )
+                )
+                self._certificate = certificates[best]
+                upper = self._certificate.upper_bound + self._leak
+                if (
+                    upper - lower <= self._eps
+                    or iterations >= self._max_iters
+                    or time.perf_counter() >= deadline
+                ):
+                    break
+
+                # Inaccurate dual candidates violate the dual constraints by about the tolerance of
+                # the augmented Lagrangian, whereas at a spurious point the violation persists.
+                spurious = upper - lower > np.sqrt(self._eps)
+                if spurious and self._rank < support_dim:
+                    factors = self._escape(
+                        factors,
+                        candidates[best],
+                        min(2 * self._rank, support_dim),
+                    )
+                elif tol > 1e-13:
+                    tol /= 10
+                else:
+                    break
+
+        self._stats = SolveStats(
+            build_time=build_time,
+            solver_time=time.perf_counter() - solve_start,
+            iterations=iterations,
+            status=(
+                "optimal"
+                if upper - lower <= self._eps
+                else "optimal_inaccurate"
+            ),
+            solver="BURER-MONTEIRO",
+            num_variables=2 * self._num * support_dim * self._rank,
+            num_constraints=support_dim**2,
+            peak_memory=memory.peak,
+            primal_bound=lower,
+            dual_bound=upper,
+        )
+
+        if self._return_optimal_meas:
+            return lower, self._lift(feasible)
+        return lower
+
+    def _augmented_lagrangian(
+        self,
+        factors: np.ndarray,
+        multiplier: np.ndarray,
+        tol: float,
+        max_iters: int,
+        deadline: float = np.inf,
+    ) -> tuple[np.ndarray, np.ndarray, int]:
+        """Runs the augmented Lagrangian method until the completeness residual is below `tol`,
+        or until the `deadline` of :code:`time.perf_counter()`, and returns the factors, the
+        multiplier and the number of L-BFGS iterations."""
+        shape = factors.shape
+        identity = np.identity(shape[1])
+        penalty, last_residual, iterations = 10.0, np.inf, 0
+
+        def unpack(x: np.ndarray) -> np.ndarray:
+            half = x.size // 2
+            return x[:half].reshape(shape) + 1j * x[half:].reshape(shape)
+
+        def lagrangian(x: np.ndarray) -> tuple[float, np.ndarray]:
+            factors = unpack(x)
+            residual = self._completeness(factors) - identity
+            weighted_factors = self._weighted @ factors
+
+            value = (
+                -np.real(np.vdot(factors, weighted_factors))
+                + np.real(np.vdot(multiplier, residual))
+                + penalty / 2 * np.real(np.vdot(residual, residual))
+            )
+            # The gradient with respect to the real and imaginary parts of V_i is twice the
+            # real and imaginary parts of the Wirtinger derivative (Λ + σ R - p_i ρ_i) V_i.
+            grad = 2 * (
+                (multiplier + penalty * residual) @ factors - weighted_factors
+            )
+            return value, np.concatenate(
+                [grad.real.ravel(), grad.imag.ravel()]
+            )
+
+        def stop_at_deadline(intermediate_result: optimize.OptimizeResult):
+            # L-BFGS returns its current iterate if the callback raises `StopIteration`.
+            if time.perf_counter() >= deadline:
+                raise StopIteration
+
+        while iterations < max_iters and time.perf_counter() < deadline:
+            result = optimize.minimize(
+                lagrangian,
+                np.concatenate([factors.real.ravel(), factors.imag.ravel()]),
+                jac=True,
+                method="L-BFGS-B",
+                callback=stop_at_deadline,
+                options={
+                    "maxiter": max_iters - iterations,
+                    "gtol": tol,
+                    "ftol": 0,
+                },
+            )
+            iterations += max(result.nit, 1)
+            factors = unpack(result.x)
+            if result.nit == 0:
+                # The line search makes no progress at the precision of the objective.
+                break
+
+            residual = self._completeness(factors) - identity
+            multiplier = multiplier + penalty * residual
+            multiplier = (multiplier + multiplier.conj().T) / 2
+
+            residual_norm = np.linalg.norm(residual)
+            if residual_norm <= tol:
+                break
+            if residual_norm > last_residual / 4:
+                penalty = min(4 * penalty, 1e6)
+            last_residual = residual_norm
+        return factors, multiplier, iterations
+
+    def _escape(
+        self, factors: np.ndarray, dual: np.ndarray, new_rank: int
+    ) -> np.ndarray:
+        """Returns the factors padded to `new_rank` columns along the eigenvectors of the most
+        negative eigenvalues of :code:`Y - p_i ρ_i`, which are directions of descent out of the
+        spurious point."""
+        eigs, vecs = np.linalg.eigh(dual[None] - self._weighted)
+        num_new = new_rank - factors.shape[2]
+        steps = np.sqrt(np.maximum(-eigs[:, :num_new], 0))
+        self._rank = new_rank
+        return np.concatenate(
+            [factors, vecs[:, :, :num_new] * steps[:, None, :]], axis=2
+        )
+
+    def _dual_from(self, factors: np.ndarray) -> np.ndarray:
+        """Returns the dual candidate :code:`Y = ∑_i p_i ρ_i M_i` of the measurement, which is
+        the optimal dual variable if the measurement is optimal."""
+        dual = np.einsum(
+            "nij,njr,nkr->ik", self._weighted, factors, factors.conj()
+        )
+        return (dual + dual.conj().T) / 2
+
+    @staticmethod
+    def _completeness(factors: np.ndarray) -> np.ndarray:
+        """Returns :code:`∑_i V_i V_i^*`."""
+        columns = factors.transpose(1, 0, 2).reshape(factors.shape[1], -1)
+        return columns @ columns.conj().T
+
+    def _normalize(self, factors: np.ndarray) -> np.ndarray:
+        """Returns the factors of the measurement :code:`S^{-1/2} M_i S^{-1/2}`, which sums to
+        the identity exactly."""
+        eigs, vecs = np.linalg.eigh(self._completeness(factors))
+        inv_sqrt = (vecs / np.sqrt(np.maximum(eigs, 1e-300))) @ vecs.conj().T
+        return inv_sqrt @ factors
+
+    def _value(self, factors: np.ndarray) -> float:
+        """Returns :code:`∑_i p_i tr(ρ_i V_i V_i^*)` for the compressed states."""
+        return float(np.real(np.vdot(factors, self._weighted @ factors)))
+
+    def _lift(self, factors: np.ndarray) -> Measurement:
+        """Returns the measurement of the whole space with the compressed factors, where the
+        first outcome also contains the complement of the support."""
+        lifted = [self._support @ factor for factor in factors]
+        lifted[0] = np.hstack([lifted[0], self._complement])
+        offsets = np.concatenate(
+            [[0], np.cumsum([factor.shape[1] for factor in lifted])]
+        )
+        return Measurement(factors=np.hstack(lifted), offsets=offsets)
@@ -13,13 +13,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Any
+import time
+from typing import Any, Callable, Optional, Union
 
 import cvxpy
 import numpy as np
 
 from qustop.opt_dist import PPT, Positive, Separable
-from qustop.core import Ensemble
+from qustop.core import Ensemble, Measurement
+from qustop.core.stats import SolveStats, solve_problem
+from qustop.opt_dist.low_rank import LowRank
+from qustop.opt_dist.verify import (
+    DualCertificate,
+    dual_from_measurement,
+    measurement_lower_bound,
+    verify_dual,
+)
 
 
 class OptDist:
@@ -40,48 +49,137 @@ class OptDist:
         self.solver = kwargs.get("solver", "SCS")
         self.verbose = kwargs.get("verbose", False)
         self.eps = kwargs.get("eps", 1e-8)
+        self.time_limit = kwargs.get("time_limit", None)
+        self.max_iters = kwargs.get("max_iters", None)
+        self.threshold: Optional[float] = kwargs.get("threshold", None)
+        self.band = kwargs.get("band", 1e-3)
+        self.screen_eps = kwargs.get("screen_eps", 1e-4)
+        self.measurement_tol = kwargs.get("measurement_tol", 1e-7)
         self.level = kwargs.get("level", 2)
+        self.kernel_parametrization = kwargs.get(
+            "kernel_parametrization", False
+        )
+        self.bipartitions = kwargs.get("bipartitions", None)
+        self.low_rank = kwargs.get("low_rank", False)
+        self.rank: Optional[int] = kwargs.get("rank", None)
+        self.gap_tol = kwargs.get("gap_tol", 1e-6)
+        self.decompose = kwargs.get("decompose", False)
+        self.block_basis: Optional[np.ndarray] = kwargs.get(
+            "block_basis", None
+        )
+        self.num_workers = kwargs.get("num_workers", 1)
+        self.seed: Optional[int] = kwargs.get("seed", None)
+        self.callback: Optional[Callable[[SolveStats], None]] = kwargs.get(
+            "callback", None
+        )
 
         self._optimal_value = None
         self._optimal_measurements: list[np.ndarray] = []
+        self._stats: Optional[SolveStats] = None
+        self._refined = False
+        self._opt = None
 
     @property
     def value(self) -> float:
         return self._optimal_value
 
     @property
-    def measurements(self) -> list[np.ndarray]:
-        if isinstance(self._optimal_measurements[0], cvxpy.Variable):
-            self._optimal_measurements = self.convert_measurements(
-                self._optimal_measurements
+    def stats(self) -> Optional[SolveStats]:
+        return self._stats
+
+    @property
+    def refined(self) -> bool:
+        """Whether the screened value was close to the threshold and was solved again."""
+        return self._refined
+
+    @property
+    def dual_variables(
+        self,
+    ) -> Optional[tuple[np.ndarray, Optional[np.ndarray]]]:
+        """The optimal dual variables `(Y, Q)` of a min-error problem with positive or PPT
+        measurements solved with `return_optimal_meas=False`, or `None` otherwise.
+
+        `Q` holds the variables of the PPT constraints with shape `(num_states, num_cuts, d, d)`
+        and is `None` for positive measurements.
+        """
+        return getattr(self._opt, "dual_variables", None)
+
+    @property
+    def measurements(self) -> Union[Measurement, list[None]]:
+        """The optimal measurement as a :code:`Measurement`, which stores its operators as
+        factors if they are numerically of low rank.
+
+        Eigenvalues below `measurement_tol` times the largest eigenvalue are discarded, the
+        operators are stored densely if it is `None`. If the solver stopped before producing a
+        solution, a list of `None` is returned instead.
+        """
+        if not isinstance(self._optimal_measurements, Measurement):
+            operators = self.convert_measurements(self._optimal_measurements)
+            if any(operator is None for operator in operators):
+                return operators
+            self._optimal_measurements = Measurement.from_operators(
+                operators, self.measurement_tol
             )
         return self._optimal_measurements
 
     @staticmethod
     def convert_measurements(measurements) -> list[np.ndarray]:
-        return [measurements[i].value for i in range(len(measurements))]
+        return [
+            meas.value if isinstance(meas, cvxpy.Expression) else meas
+            for meas in measurements
+        ]
 
     def solve(self) -> None:
         """Depending on the measurement method selected, solve the appropriate optimization problem.
 
+        If a `threshold` is given, the problem is first solved at the loose tolerance
+        `screen_eps`. Only if that value lies within `band` of the threshold is the problem solved
+        again at the tolerance `eps`, warm-started from the first solution.
+
+        If `low_rank` is set, a min-error problem with positive measurements is solved by the
+        factorized :code:`LowRank` solver instead, starting from factors with `rank` columns.
+        Its value is certified up to `gap_tol` by a verified dual bound. It honours `max_iters`
+        and `time_limit`, whereas `solver`, `verbose` and `eps` are not used, and the value is
+        not refined close to the `threshold`.
+
+        If `decompose` is set, positive measurements are optimized separately on each common
+        diagonal block of the states in the basis `block_basis`, in `num_workers` processes.
+
         Raises:
             ValueError:
                 * If the `dist_measurement` argument is not supported.
+                * If `low_rank` is set for measurements other than positive ones.
         """
-        if self.dist_measurement == "ppt":
+        eps = self.eps if self.threshold is None else self.screen_eps
+        if self.low_rank and self.dist_measurement != "pos":
+            raise ValueError(
+                f"Measurement type {self.dist_measurement} not supported by the low-rank "
+                f"solver, which only optimizes over positive measurements."
+            )
+        if self.low_rank:
+            opt = LowRank(
+                self.ensemble,
+                self.dist_method,
+                self.return_optimal_meas,
+                eps=self.gap_tol,
+                rank=self.rank,
+                max_iters=self.max_iters,
+                seed=self.seed,
+                time_limit=self.time_limit,
+            )
+        elif self.dist_measurement == "ppt":
             opt = PPT(
                 self.ensemble,
                 self.dist_method,
                 self.return_optimal_meas,
                 self.solver,
                 self.verbose,
-                self.eps,
+                eps,
+                self.kernel_parametrization,
+                self.bipartitions,
+                time_limit=self.time_limit,
+                max_iters=self.max_iters,
             )
-            if self.return_optimal_meas:
-                self._optimal_value, self._optimal_measurements = opt.solve()
-            else:
-                self._optimal_value = opt.solve()
-
         elif self.dist_measurement == "pos":
             opt = Positive(
                 self.ensemble,
@@ -89,12 +187,14 @@ class OptDist:
                 self.return_optimal_meas,
                 self.solver,
                 self.verbose,
-                self.eps,
+                eps,
+                self.kernel_parametrization,
+                time_limit=self.time_limit,
+                max_iters=self.max_iters,
+                decompose=self.decompose,
+                block_basis=self.block_basis,
+                num_workers=self.num_workers,
             )
-            if self.return_optimal_meas:
-                self._optimal_value, self._optimal_measurements = opt.solve()
-            else:
-                self._optimal_value = opt.solve()
         elif self.dist_measurement == "sep":
             opt = Separable(
                 self.ensemble,
@@ -102,14 +202,118 @@ class OptDist:
                 self.return_optimal_meas,
                 self.solver,
                 self.verbose,
-                self.eps,
+                eps,
                 self.level,
+                time_limit=self.time_limit,
+                max_iters=self.max_iters,
             )
-            if self.return_optimal_meas:
-                self._optimal_value, self._optimal_measurements = opt.solve()
-            else:
-                self._optimal_value = opt.solve()
         else:
             raise ValueError(
                 f"Measurement type {self.dist_method} not supported."
             )
+
+        if self.return_optimal_meas:
+            self._optimal_value, self._optimal_measurements = opt.solve()
+        else:
+            self._optimal_value = opt.solve()
+        self._stats = opt.stats
+        self._opt = opt
+
+        self._refined = False
+        if (
+            self.threshold is not None
+            and not self.low_rank
+            and opt.problem is not None
+            and self._optimal_value is not None
+            and abs(self._optimal_value - self.threshold) <= self.band
+        ):
+            self._refine(opt.problem)
+        if not self.low_rank:
+            self._certify()
+
+        if self.callback is not None:
+            self.callback(self._stats)
+
+    def verify(self) -> DualCertificate:
+        """Verifies the dual solution and returns its certificate, whose `upper_bound` is a
+        rigorous upper bound on the optimal value.
+
+        Raises:
+            ValueError:
+                * If no dual solution of a min-error problem is available.
+        """
+        if self.dual_variables is None:
+            raise ValueError(
+                "Verification requires the dual solution of a min-error problem with positive "
+                "or PPT measurements, solved with `return_optimal_meas=False`."
+            )
+        y_dual, q_duals = self.dual_variables
+        cuts = self._opt.cuts if q_duals is not None else None
+        return verify_dual(self.ensemble, y_dual, q_duals, cuts)
+
+    def _certify(self) -> None:
+        """Sets the `primal_bound` and `dual_bound` of the statistics of a min-error problem with
+        positive or PPT measurements from the last iterate of the solver.
+
+        The upper bound verifies the dual iterate, or the dual candidate of the measurement for a
+        primal solve, so it holds even if the solver was stopped by a limit. The lower bound is
+        the value of the repaired measurement, which is only a valid measurement for positive
+        measurements. Bounds that cannot be certified are left as `None`.
+        """
+        if (
+            self._stats is None
+            or self.dist_method != "min-error"
+            or self.dist_measurement not in ("pos", "ppt")
+        ):
+            return
+        if not self.return_optimal_meas:
+            dual_variables = self.dual_variables
+            if dual_variables is not None and dual_variables[0] is not None:
+                self._stats.dual_bound = self.verify().upper_bound
+            return
+
+        operators = self.measurements
+        if any(operator is None for operator in operators):
+            return
+        operators = np.asarray(operators)
+        self._stats.dual_bound = verify_dual(
+            self.ensemble, dual_from_measurement(self.ensemble, operators)
+        ).upper_bound
+        if self.dist_measurement == "pos":
+            self._stats.primal_bound = measurement_lower_bound(
+                self.ensemble, operators
+            )
+
+    def _refine(self, problem: cvxpy.Problem) -> None:
+        """Solves the screened problem again at the tolerance `eps`, warm-started from its
+        solution, and accumulates the statistics of both solves.
+
+        Both solves share the `time_limit`, so the refinement is skipped if the screening used it
+        up.
+        """
+        screen_stats = self._stats
+        time_left = None
+        if self.time_limit is not None:
+            time_left = self.time_limit - screen_stats.total_time
+            if time_left <= 0:
+                return
+        opt_val, self._stats = solve_problem(
+            problem,
+            time.perf_counter(),
+            solver=self.solver,
+            verbose=self.verbose,
+            eps=self.eps,
+            time_limit=time_left,
+            max_iters=self.max_iters,
+            warm_start=True,
+        )
+        if opt_val is None:
+            # Keep the screening result if the refinement did not produce an iterate.
+            self._stats = screen_stats
+            return
+
+        self._optimal_value = opt_val
+        self._stats.build_time += screen_stats.build_time
+        self._stats.compile_time += screen_stats.compile_time
+        self._stats.solver_time += screen_stats.solver_time
+        self._refined = True
@@ -13,10 +13,40 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import time
+from typing import Optional
+
 import cvxpy
 import numpy as np
 
 from qustop import Ensemble
+from qustop.core.blocks import (
+    block_decomposition,
+    embed_blocks,
+    restrict_ensemble,
+    solve_blocks,
+)
+from qustop.core.sdp import (
+    measurement_variables,
+    orthogonality_constraint,
+    weighted_inner_product,
+)
+from qustop.core.stats import SolveStats, merge_stats, solve_problem
+
+
+def _solve_block(item: tuple) -> tuple:
+    """Solves the problem of a single block and returns its value, measurements, dual variable
+    and statistics as arrays that can be sent between processes."""
+    args, kwargs = item
+    opt = Positive(*args, **kwargs)
+    # The third argument is `return_optimal_meas`.
+    if args[2]:
+        opt_val, meas = opt.solve()
+        meas = [meas_op.value for meas_op in meas]
+    else:
+        opt_val, meas = opt.solve(), None
+    dual = opt.dual_variables[0] if opt.dual_variables is not None else None
+    return opt_val, meas, dual, opt.stats
 
 
 class Positive:
@@ -30,16 +60,36 @@ class Positive:
         solver: str,
         verbose: bool,
         eps: float,
+        kernel_parametrization: bool = False,
+        time_limit: Optional[float] = None,
+        max_iters: Optional[int] = None,
+        decompose: bool = False,
+        block_basis: Optional[np.ndarray] = None,
+        num_workers: int = 1,
     ) -> None:
         """Computes either the primal or dual problem of the positive (global) SDP.
 
+        If all states are block diagonal in a common basis, e.g. flagged states, the problem
+        splits into independent problems on the blocks, whose values add up and whose
+        measurements are the direct sums of the measurements of the blocks.
+
         Args:
             ensemble:
             dist_method:
             return_optimal_meas: Whether the optimal measurements are to be returned.
-            solver: The SDP solver to use.
+            solver: The SDP solver to use, or "auto" to choose one from the size of the problem.
             verbose: Overrides the default of hiding the solver output.
             eps: Convergence tolerance.
+            kernel_parametrization: Whether the unambiguous measurement operators are
+                parametrized on the common kernel of the other states.
+            time_limit: The maximal number of seconds spent by the solver.
+            max_iters: The maximal number of iterations of the solver.
+            decompose: Whether to detect a common block decomposition of the states and solve
+                the problem of each block separately.
+            block_basis: An optional unitary whose columns are the basis in which the blocks
+                are detected.
+            num_workers: The number of worker processes solving the blocks, which are solved
+                in-process if 1.
         """
         self._ensemble = ensemble
         self._dist_method = dist_method
@@ -47,11 +97,46 @@ class Positive:
         self._solver = solver
         self._verbose = verbose
         self._eps = eps
+        self._time_limit = time_limit
+        self._max_iters = max_iters
+        self._kernel_parametrization = kernel_parametrization
+        self._decompose = decompose
+        self._block_basis = block_basis
+        self._num_workers = num_workers
 
         self._states = self._ensemble.density_matrices
         self._probs = self._ensemble.probs
 
+        self._stats: Optional[SolveStats] = None
+        self._problem: Optional[cvxpy.Problem] = None
+        self._dual_variables = None
+
+    @property
+    def stats(self) -> Optional[SolveStats]:
+        return self._stats
+
+    @property
+    def dual_variables(self) -> Optional[tuple[np.ndarray, None]]:
+        """The solution `(Y, None)` of the last min-error dual problem solved, or `None` if no such
+        problem was solved."""
+        if self._dual_variables is None:
+            return None
+        if isinstance(self._dual_variables, np.ndarray):
+            return self._dual_variables, None
+        return self._dual_variables.value, None
+
+    @property
+    def problem(self) -> Optional[cvxpy.Problem]:
+        """The last problem solved, e.g. to solve it again at a tighter tolerance, or `None` if
+        it was solved as separate blocks."""
+        return self._problem
+
     def solve(self):
+        if self._decompose:
+            blocks = block_decomposition(self._states, self._block_basis)
+            if len(blocks) > 1:
+                return self.block_problems(blocks)
+
         # Return the optimal value and the optimal measurements.
         if self._return_optimal_meas:
             return self.primal_problem()
@@ -59,12 +144,13 @@ class Positive:
         # Otherwise, it is often less computationally intensive to just solve the dual problem.
         return self.dual_problem()
 
-    def primal_problem(self) -> tuple[float, list[cvxpy.Variable]]:
+    def primal_problem(self) -> tuple[float, list[cvxpy.Expression]]:
         """Calculate primal problem for the pos (global) distinguishability SDP.
 
         The primal problem for the min-error case is defined in equation-20 from arXiv:1707.02571
         The primal problem for the unambiguous case is defined in equation- from arXiv:.
         """
+        build_start = time.perf_counter()
         # Unambiguous consists of `len(self._states)` + 1 measurement operators, where the outcome
         # of the `len(self._states)`+1^st corresponds to the inconclusive answer.
         num_measurements = (
@@ -74,42 +160,95 @@ class Positive:
         )
 
         # Define each measurement variable to be a PSD variable of appropriate dimension.
-        meas = [
-            cvxpy.Variable(self._ensemble.shape, hermitian=True)
-            for _ in range(num_measurements)
-        ]
+        meas, meas_vec, constraints = measurement_variables(
+            self._states,
+            num_measurements,
+            self._dist_method == "unambiguous"
+            and self._kernel_parametrization,
+        )
 
         # Objective function is the inner product between the states and measurements.
-        obj_func = [
-            self._probs[i] * cvxpy.trace(self._states[i].conj().T @ meas[i])
-            for i, _ in enumerate(self._states)
-        ]
+        objective = cvxpy.Maximize(
+            weighted_inner_product(
+                self._states, self._probs, meas_vec, num_measurements
+            )
+        )
 
-        # Valid collection of measurements need to sum to the identity operator and be
-        # positive semidefinite.
-        constraints = [cvxpy.sum(meas) == np.identity(self._ensemble.shape[0])]
-        for i in range(num_measurements):
-            constraints.append(meas[i] >> 0)
+        # Valid collection of measurements need to sum to the identity operator.
+        constraints.append(
+            cvxpy.sum(meas) == np.identity(self._ensemble.shape[0])
+        )
 
         # Unambiguous state discrimination has an additional constraint on the states and
         # measurements.
-        if self._dist_method == "unambiguous":
-            for i, _ in enumerate(self._states):
-                for j, _ in enumerate(self._states):
-                    if i != j:
-                        constraints.append(
-                            cvxpy.trace(self._states[j].conj().T @ meas[i])
-                            == 0
-                        )
+        if (
+            self._dist_method == "unambiguous"
+            and not self._kernel_parametrization
+        ):
+            constraints += orthogonality_constraint(
+                self._states, meas_vec, num_measurements
+            )
 
-        obj_sum = cvxpy.sum(obj_func)
-        objective = cvxpy.Maximize(cvxpy.real(obj_sum))
         problem = cvxpy.Problem(objective, constraints)
-        opt_val = problem.solve(
-            solver=self._solver, verbose=self._verbose, eps=self._eps
+        self._problem = problem
+        opt_val, self._stats = solve_problem(
+            problem,
+            build_start,
+            solver=self._solver,
+            verbose=self._verbose,
+            eps=self._eps,
+            time_limit=self._time_limit,
+            max_iters=self._max_iters,
         )
         return opt_val, meas
 
+    def block_problems(self, blocks: list[np.ndarray]):
+        """Solves the problem of each diagonal block of the states separately and recombines the
+        optimal values, measurements and dual variables.
+
+        Args:
+            blocks: The indices of each block, as returned by :code:`block_decomposition`.
+        """
+        items = [
+            (
+                (
+                    restrict_ensemble(
+                        self._ensemble, block, self._block_basis
+                    ),
+                    self._dist_method,
+                    self._return_optimal_meas,
+                    self._solver,
+                    self._verbose,
+                    self._eps,
+                    self._kernel_parametrization,
+                ),
+                {"time_limit": self._time_limit, "max_iters": self._max_iters},
+            )
+            for block in blocks
+        ]
+        values, meas, duals, stats = zip(
+            *solve_blocks(_solve_block, items, self._num_workers)
+        )
+        self._stats = merge_stats(list(stats))
+        self._problem = None
+        opt_val = None if None in values else sum(values)
+
+        if self._dist_method == "min-error" and not self._return_optimal_meas:
+            self._dual_variables = (
+                embed_blocks(duals, blocks, self._block_basis)
+                if opt_val is not None
+                else None
+            )
+
+        if not self._return_optimal_meas:
+            return opt_val
+        if opt_val is None:
+            return opt_val, [None] * len(meas[0])
+        return opt_val, [
+            embed_blocks(block_meas, blocks, self._block_basis)
+            for block_meas in zip(*meas)
+        ]
+
     def dual_problem(self) -> float:
         """Calculate dual problem for the positive (global) distinguishability SDP.
 
@@ -117,6 +256,7 @@ class Positive:
         The dual problem for the unambiguous case is defined in equation-4.73
         from https://uwspace.uwaterloo.ca/bitstream/handle/10012/9572/Cosentino_Alessandro.pdf.
         """
+        build_start = time.perf_counter()
         num_measurements = (
             len(self._states) + 1
             if self._dist_method == "unambiguous"
@@ -130,6 +270,7 @@ class Positive:
                 (y_var - self._probs[i] * self._states[i]) >> 0
                 for i in range(num_measurements)
             ]
+            self._dual_variables = y_var
 
         # This implements the dual problem (equation-4.73) from
         # https://uwspace.uwaterloo.ca/bitstream/handle/10012/9572/Cosentino_Alessandro.pdf:
@@ -155,8 +296,15 @@ class Positive:
 
         objective = cvxpy.Minimize(cvxpy.trace(cvxpy.real(y_var)))
         problem = cvxpy.Problem(objective, constraints)
-        opt_val = problem.solve(
-            solver=self._solver, verbose=self._verbose, eps=self._eps
+        self._problem = problem
+        opt_val, self._stats = solve_problem(
+            problem,
+            build_start,
+            solver=self._solver,
+            verbose=self._verbose,
+            eps=self._eps,
+            time_limit=self._time_limit,
+            max_iters=self._max_iters,
         )
 
         return opt_val
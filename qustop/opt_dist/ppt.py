@@ -13,13 +13,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Union
+import itertools
+import time
+from typing import Optional, Union
 
 import cvxpy
 import numpy as np
-from toqito.channels import partial_transpose
 
 from qustop import Ensemble
+from qustop.core.sdp import (
+    measurement_variables,
+    orthogonality_constraint,
+    partial_transpose,
+    weighted_inner_product,
+)
+from qustop.core.stats import SolveStats, solve_problem
 
 
 class PPT:
@@ -33,6 +41,10 @@ class PPT:
         solver: str,
         verbose: bool,
         eps: float,
+        kernel_parametrization: bool = False,
+        bipartitions: Optional[Union[str, list[list[int]]]] = None,
+        time_limit: Optional[float] = None,
+        max_iters: Optional[int] = None,
     ) -> None:
         """Computes either the primal or dual problem of the PPT SDP.
 
@@ -40,9 +52,16 @@ class PPT:
             ensemble:
             dist_method:
             return_optimal_meas: Whether the optimal measurements are to be returned.
-            solver: The SDP solver to use.
+            solver: The SDP solver to use, or "auto" to choose one from the size of the problem.
             verbose: Overrides the default of hiding the solver output.
             eps: Convergence tolerance.
+            kernel_parametrization: Whether the unambiguous measurement operators are
+                parametrized on the common kernel of the other states.
+            bipartitions: The cuts across which the measurements must be PPT. Either "all" for
+                every bipartition of the subsystems or a list of (1-indexed) subsystems to be
+                transposed, one per cut. By default, only the cut between Alice and Bob is used.
+            time_limit: The maximal number of seconds spent by the solver.
+            max_iters: The maximal number of iterations of the solver.
         """
         self._ensemble = ensemble
         self._dist_method = dist_method
@@ -50,17 +69,57 @@ class PPT:
         self._solver = solver
         self._verbose = verbose
         self._eps = eps
+        self._time_limit = time_limit
+        self._max_iters = max_iters
+        self._kernel_parametrization = kernel_parametrization
 
         self._states = self._ensemble.density_matrices
         self._probs = self._ensemble.probs
 
+        self._stats: Optional[SolveStats] = None
+        self._problem: Optional[cvxpy.Problem] = None
+        self._dual_variables = None
+
         self._dims = self._ensemble.dims
 
         # Assuming that all states in ensemble have systems oriented in the same way. PPT SDP requires
-        # us to take the partial transpose over Alice's subsystems.
-        self._sys = self._ensemble[0].alice_systems
+        # us to take the partial transpose over the positions of Alice's subsystems.
+        self._sys = self._ensemble[0].alice_positions
+
+        # Each cut is represented by the subsystems that are transposed.
+        self._cuts = self._prepare_cuts(bipartitions)
+
+    @property
+    def stats(self) -> Optional[SolveStats]:
+        return self._stats
+
+    @property
+    def cuts(self) -> list[tuple[int, ...]]:
+        """The subsystems transposed by each cut across which the measurements are PPT."""
+        return self._cuts
 
-    def solve(self) -> Union[float, tuple[float, list[cvxpy.Variable]]]:
+    @property
+    def dual_variables(self) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """The solution `(Y, Q)` of the last min-error dual problem solved, where `Q` has shape
+        `(num_states, len(cuts), d, d)`, or `None` if no such problem was solved."""
+        if self._dual_variables is None:
+            return None
+        y_var, dual_vars = self._dual_variables
+        q_duals = np.zeros(
+            (len(dual_vars), len(self._cuts)) + self._ensemble.shape,
+            dtype=complex,
+        )
+        for i, row in enumerate(dual_vars):
+            for k, dual_var in enumerate(row):
+                q_duals[i, k] = dual_var.value
+        return y_var.value, q_duals
+
+    @property
+    def problem(self) -> Optional[cvxpy.Problem]:
+        """The last problem solved, e.g. to solve it again at a tighter tolerance."""
+        return self._problem
+
+    def solve(self) -> Union[float, tuple[float, list[cvxpy.Expression]]]:
         """Solve either the primal or dual problem for the PPT SDP."""
         # Return the optimal value and the optimal measurements.
         if self._return_optimal_meas:
@@ -69,12 +128,13 @@ class PPT:
         # Otherwise, it is often less computationally intensive to just solve the dual problem.
         return self.dual_problem()
 
-    def primal_problem(self) -> tuple[float, list[cvxpy.Variable]]:
+    def primal_problem(self) -> tuple[float, list[cvxpy.Expression]]:
         """Calculate primal problem for the PPT distinguishability SDP.
 
         The primal problem for the min-error case is defined in equation-1 from arXiv:1205.1031.
         The primal problem for the unambiguous case is defined in equation-4 from arXiv:1205.1031.
         """
+        build_start = time.perf_counter()
         # Unambiguous consists of `len(self._states)` + 1 measurement operators, where the outcome
         # of the `len(self._states)`+1^st corresponds to the inconclusive answer.
         num_measurements = (
@@ -84,31 +144,29 @@ class PPT:
         )
 
         # Define each measurement variable to be a PSD variable of appropriate dimension.
-        meas = [
-            cvxpy.Variable(self._ensemble.shape, hermitian=True)
-            for _ in range(num_measurements)
-        ]
-
-        # Each measurement variable must be PPT.
-        constraints = [
-            partial_transpose(meas[i], self._sys, self._dims) >> 0
-            for i in range(num_measurements)
-        ]
-        # Each measurement must be PSD.
+        meas, meas_vec, constraints = measurement_variables(
+            self._states,
+            num_measurements,
+            self._dist_method == "unambiguous"
+            and self._kernel_parametrization,
+        )
+
+        # Each measurement variable must be PPT across each cut.
         for i in range(num_measurements):
-            constraints.append(meas[i] >> 0)
+            for cut in self._cuts:
+                constraints.append(
+                    partial_transpose(meas[i], cut, self._dims) >> 0
+                )
 
         # For all states, the inner product between each state with index `i` with each measurement
         # of index `j` must be equal to zero.
-        if self._dist_method == "unambiguous":
-            for i, _ in enumerate(self._states):
-                for j, _ in enumerate(self._states):
-                    if i != j:
-                        constraints.append(
-                            self._probs[j]
-                            * cvxpy.trace(self._states[j].conj().T @ meas[i])
-                            == 0
-                        )
+        if (
+            self._dist_method == "unambiguous"
+            and not self._kernel_parametrization
+        ):
+            constraints += orthogonality_constraint(
+                self._states, meas_vec, num_measurements
+            )
 
         # Valid collection of measurements need to sum to the identity
         # operator.
@@ -119,16 +177,22 @@ class PPT:
         # Construct the objective function by taking the inner product of each of the states with
         # each of the measurement variables scaled by the corresponding probability of the given
         # state being selected by the ensemble.
-        obj_func = [
-            self._probs[i] * cvxpy.trace(self._states[i].conj().T @ meas[i])
-            for i, _ in enumerate(self._states)
-        ]
-        obj_sum = cvxpy.sum(obj_func)
-        objective = cvxpy.Maximize(cvxpy.real(obj_sum))
+        objective = cvxpy.Maximize(
+            weighted_inner_product(
+                self._states, self._probs, meas_vec, num_measurements
+            )
+        )
 
         problem = cvxpy.Problem(objective, constraints)
-        opt_val = problem.solve(
-            solver=self._solver, verbose=self._verbose, eps=self._eps
+        self._problem = problem
+        opt_val, self._stats = solve_problem(
+            problem,
+            build_start,
+            solver=self._solver,
+            verbose=self._verbose,
+            eps=self._eps,
+            time_limit=self._time_limit,
+            max_iters=self._max_iters,
         )
 
         return opt_val, meas
@@ -138,6 +202,7 @@ class PPT:
         The dual problem for the min-error case is defined in equation-2 from arXiv:1205.1031.
         The dual problem for the unambiguous case is defined in equation-5 from arXiv:1205.1031.
         """
+        build_start = time.perf_counter()
         constraints = []
 
         y_var = cvxpy.Variable(self._ensemble.shape, hermitian=True)
@@ -147,23 +212,30 @@ class PPT:
             num_measurements = len(self._states)
 
             dual_vars = [
-                cvxpy.Variable(self._ensemble.shape, hermitian=True)
+                [
+                    cvxpy.Variable(self._ensemble.shape, hermitian=True)
+                    for _ in self._cuts
+                ]
                 for _ in range(num_measurements)
             ]
             constraints = [
                 y_var - self._probs[i] * self._states[i]
-                >> partial_transpose(dual_vars[i], self._sys, self._dims)
+                >> self._dual_partial_transpose(dual_vars[i])
                 for i in range(num_measurements)
             ]
             for i in range(num_measurements):
-                constraints.append(dual_vars[i] >> 0)
+                constraints += [dual_var >> 0 for dual_var in dual_vars[i]]
+            self._dual_variables = (y_var, dual_vars)
 
         # This implements the dual problem (equation-5) rom arXiv:1205.1031:
         if self._dist_method == "unambiguous":
             num_measurements = len(self._states) + 1
 
             dual_vars = [
-                cvxpy.Variable(self._ensemble.shape, PSD=True)
+                [
+                    cvxpy.Variable(self._ensemble.shape, PSD=True)
+                    for _ in self._cuts
+                ]
                 for _ in range(num_measurements)
             ]
             scalar_vars = [
@@ -182,17 +254,83 @@ class PPT:
                         )
                 constraints.append(
                     y_var - self._probs[j] * self._states[j] + sum_val
-                    >> partial_transpose(dual_vars[j], self._sys, self._dims)
+                    >> self._dual_partial_transpose(dual_vars[j])
                 )
             constraints.append(
-                y_var
-                >> partial_transpose(dual_vars[-1], self._sys, self._dims)
+                y_var >> self._dual_partial_transpose(dual_vars[-1])
             )
 
         objective = cvxpy.Minimize(cvxpy.trace(cvxpy.real(y_var)))
         problem = cvxpy.Problem(objective, constraints)
-        opt_val = problem.solve(
-            solver=self._solver, verbose=self._verbose, eps=self._eps
+        self._problem = problem
+        opt_val, self._stats = solve_problem(
+            problem,
+            build_start,
+            solver=self._solver,
+            verbose=self._verbose,
+            eps=self._eps,
+            time_limit=self._time_limit,
+            max_iters=self._max_iters,
         )
 
         return opt_val
+
+    def _dual_partial_transpose(
+        self, dual_vars: list[cvxpy.Variable]
+    ) -> cvxpy.Expression:
+        """Returns the sum of the partial transposes of the dual variables of each cut."""
+        if not self._cuts:
+            return np.zeros(self._ensemble.shape)
+        return cvxpy.sum(
+            [
+                partial_transpose(dual_var, cut, self._dims)
+                for dual_var, cut in zip(dual_vars, self._cuts)
+            ]
+        )
+
+    def _prepare_cuts(
+        self, bipartitions: Optional[Union[str, list[list[int]]]]
+    ) -> list[tuple[int, ...]]:
+        """Returns the distinct cuts across which the measurements must be PPT.
+
+        A measurement operator is PPT across a cut if and only if it is PPT with respect to the
+        complementary set of subsystems, as the two partial transposes differ by a full
+        transpose. Each cut is therefore represented by the side not containing the first
+        subsystem, and trivial and duplicate cuts are discarded.
+
+        Args:
+            bipartitions: Either "all", a list of subsystems to be transposed, or `None`.
+
+        Raises:
+            ValueError:
+                * If `bipartitions` is a string other than "all".
+                * If a subsystem in `bipartitions` is out of range.
+        """
+        num_sys = len(self._dims)
+        if bipartitions is None:
+            bipartitions = [self._sys]
+        elif isinstance(bipartitions, str):
+            if bipartitions != "all":
+                raise ValueError(
+                    f"Bipartitions {bipartitions} not supported, must be `all` or a list of "
+                    f"subsystems."
+                )
+            bipartitions = [
+                list(cut)
+                for size in range(1, num_sys)
+                for cut in itertools.combinations(range(1, num_sys + 1), size)
+            ]
+
+        cuts = []
+        for cut in bipartitions:
+            cut = set(cut)
+            if not cut.issubset(range(1, num_sys + 1)):
+                raise ValueError(
+                    f"The subsystems {sorted(cut)} must be between 1 and {num_sys}."
+                )
+            if 1 in cut:
+                cut = set(range(1, num_sys + 1)) - cut
+            cut = tuple(sorted(cut))
+            if cut and len(cut) < num_sys and cut not in cuts:
+                cuts.append(cut)
+        return cuts
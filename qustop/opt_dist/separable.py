@@ -13,15 +13,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Union
+import time
+from typing import Optional, Union
 
 import cvxpy
 import numpy as np
-from toqito.channels import partial_trace, partial_transpose
+from toqito.channels import partial_transpose
 from toqito.helper import cvx_kron
 from toqito.perms import symmetric_projection
 
 from qustop import Ensemble
+from qustop.core.sdp import symmetric_extension
+from qustop.core.stats import SolveStats, solve_problem
 
 
 class Separable:
@@ -36,6 +39,8 @@ class Separable:
         verbose: bool,
         eps: float,
         level: int,
+        time_limit: Optional[float] = None,
+        max_iters: Optional[int] = None,
     ) -> None:
         """Computes either the primal or dual problem of the separable measurement SDP.
 
@@ -43,10 +48,12 @@ class Separable:
             ensemble:
             dist_method:
             return_optimal_meas: Whether the optimal measurements are to be returned.
-            solver: The SDP solver to use.
+            solver: The SDP solver to use, or "auto" to choose one from the size of the problem.
             verbose: Overrides the default of hiding the solver output.
             eps: Convergence tolerance.
             level: Level of the hierarchy to compute.
+            time_limit: The maximal number of seconds spent by the solver.
+            max_iters: The maximal number of iterations of the solver.
         """
         self._ensemble = ensemble
         self._dist_method = dist_method
@@ -54,28 +61,26 @@ class Separable:
         self._solver = solver
         self._verbose = verbose
         self._eps = eps
+        self._time_limit = time_limit
+        self._max_iters = max_iters
         self._level = level
 
         self._states = self._ensemble.density_matrices
         self._probs = self._ensemble.probs
 
-        self._dims = self._ensemble.dims
-
-        self.dim_x, self.dim_y = self._ensemble[0].shape
-        self.dim_list = self._ensemble[0].dims
+        self._stats: Optional[SolveStats] = None
+        self._problem: Optional[cvxpy.Problem] = None
 
-        # The symmetrically extended list of spaces based on the level. That is
-        # Y_2 \otimes ... \otimes Y_{level}
-        self._sym_ext_sys_list = list(range(3, 3 + self._level - 1))
+        self._dims = self._ensemble.dims
 
-        # The symmetrically extended list of dimensions based on the level. That is
-        # (X_1 \otimes Y_1) \otimes Y_2 \otimes ... \otimes Y_{level}
-        self._sym_ext_dim_list = [self._dims[0]] * (self._level + 1)
+    @property
+    def stats(self) -> Optional[SolveStats]:
+        return self._stats
 
-        # dim(X_1) * dim(Y_1) * dim(Y_2) * ... * dim(Y_{level})
-        self._sym_ext_dims = self._ensemble.shape[0] * np.prod(
-            self._sym_ext_dim_list
-        )
+    @property
+    def problem(self) -> Optional[cvxpy.Problem]:
+        """The last problem solved, e.g. to solve it again at a tighter tolerance."""
+        return self._problem
 
     def solve(self) -> Union[float, tuple[float, list[cvxpy.Variable]]]:
         """Solve either the primal or dual problem for the separable SDP."""
@@ -89,49 +94,25 @@ class Separable:
 
     def primal_problem(self):
         r"""Compute optimal value of the symmetric extension hierarchy SDP."""
+        build_start = time.perf_counter()
         constraints = []
 
-        # TODO: This can be done in a better and more intuitive manner.
-        dim = int(np.log2(self.dim_x))
-        dim_list = (2 + self._level - 1) * [dim]
-        dim_xyy = np.prod(dim_list)
-
-        sym = symmetric_projection(dim, self._level)
-
         meas = [
             cvxpy.Variable(self._ensemble.shape, hermitian=True)
             for i, _ in enumerate(self._states)
         ]
-        x_var = [
-            cvxpy.Variable((dim_xyy, dim_xyy), hermitian=True)
-            for i, _ in enumerate(self._states)
-        ]
         obj_func = [
             self._probs[i] * cvxpy.trace(self._states[i].conj().T @ meas[i])
             for i, _ in enumerate(self._states)
         ]
 
         for k, _ in enumerate(self._states):
-            # Tr_{Y_2 \otimes ... \otimes Y_l}(X_k) = meas[k]:
-            constraints.append(
-                partial_trace(x_var[k], self._sym_ext_sys_list, dim_list)
-                == meas[k]
+            # Each measurement operator must admit a PPT symmetric extension.
+            _, ext_constraints = symmetric_extension(
+                meas[k], self._ensemble[0].bipartite_dims, self._level
             )
-            # (I_X \otimes Pi) X_k (I_X \otimes Pi) = X_k
-            # where "Pi" is the symmetric projection on (Y \ovee Y_2 \ovee ... \ovee Y_l)
-            constraints.append(
-                np.kron(np.identity(dim), sym)
-                @ x_var[k]
-                @ np.kron(np.identity(dim), sym)
-                == x_var[k]
-            )
-            constraints.append(partial_transpose(x_var[k], 1, dim_list) >> 0)
-            for sys in range(3, self._level + 2):
-                constraints.append(
-                    partial_transpose(x_var[k], sys, dim_list) >> 0
-                )
+            constraints += ext_constraints
             constraints.append(meas[k] >> 0)
-            constraints.append(x_var[k] >> 0)
 
         constraints.append(
             cvxpy.sum(meas) == np.identity(self._ensemble.shape[0])
@@ -140,20 +121,28 @@ class Separable:
         obj_sum = cvxpy.sum(obj_func)
         objective = cvxpy.Maximize(cvxpy.real(obj_sum))
         problem = cvxpy.Problem(objective, constraints)
-        opt_val = problem.solve(
-            solver=self._solver, verbose=self._verbose, eps=self._eps
+        self._problem = problem
+        opt_val, self._stats = solve_problem(
+            problem,
+            build_start,
+            solver=self._solver,
+            verbose=self._verbose,
+            eps=self._eps,
+            time_limit=self._time_limit,
+            max_iters=self._max_iters,
         )
 
         return opt_val, meas
 
     def dual_problem(self) -> float:
+        build_start = time.perf_counter()
         constraints = []
         q_vars = []
         r_vars = []
         s_vars = []
         z_vars = []
 
-        dim = int(np.log2(self.dim_x))
+        dim = int(np.log2(self._ensemble.shape[0]))
         dim_list = (2 + self._level - 1) * [dim]
         dim_xyy = np.prod(dim_list)
 
@@ -201,8 +190,15 @@ class Separable:
 
         objective = cvxpy.Minimize(cvxpy.trace(cvxpy.real(h_var)))
         problem = cvxpy.Problem(objective, constraints)
-        opt_val = problem.solve(
-            solver=self._solver, verbose=self._verbose, eps=self._eps
+        self._problem = problem
+        opt_val, self._stats = solve_problem(
+            problem,
+            build_start,
+            solver=self._solver,
+            verbose=self._verbose,
+            eps=self._eps,
+            time_limit=self._time_limit,
+            max_iters=self._max_iters,
         )
 
         return opt_val
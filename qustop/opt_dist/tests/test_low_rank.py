@@ -0,0 +1,117 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import numpy as np
+import pytest
+
+from qustop import Ensemble, OptDist, State
+from qustop.opt_dist import LowRank
+from qustop.random.samplers import haar_states, random_density_matrices
+
+
+def pure_ensemble(dim, num_states, seed=0):
+    rng = np.random.default_rng(seed)
+    return Ensemble(
+        [
+            State(ket.reshape(-1, 1), [dim])
+            for ket in haar_states(rng, num_states, dim)
+        ]
+    )
+
+
+def mixed_ensemble(dim, num_states, rank, seed=0):
+    rng = np.random.default_rng(seed)
+    return Ensemble(
+        [
+            State(rho, [dim])
+            for rho in random_density_matrices(rng, num_states, dim, rank)
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "ensemble",
+    [pure_ensemble(8, 4), mixed_ensemble(8, 4, 2), mixed_ensemble(6, 3, 6)],
+)
+def test_low_rank_matches_sdp(ensemble):
+    """The certified bounds of the factorized solver enclose the value of the SDP."""
+    low_rank = OptDist(ensemble, "pos", "min-error", low_rank=True, seed=0)
+    low_rank.solve()
+    res = OptDist(ensemble, "pos", "min-error", solver="CLARABEL", eps=None)
+    res.solve()
+
+    stats = low_rank.stats
+    assert stats.status == "optimal"
+    assert stats.solver == "BURER-MONTEIRO"
+    assert stats.dual_bound - stats.primal_bound <= 1e-6
+    np.testing.assert_allclose(low_rank.value, res.value, atol=1e-6)
+
+
+def test_low_rank_measurement():
+    """The lifted measurement is complete and attains the lower bound."""
+    ensemble = pure_ensemble(32, 3)
+    res = LowRank(ensemble, "min-error", True, seed=1)
+    value, measurement = res.solve()
+
+    assert res.support_dim == 3
+    assert measurement.is_low_rank
+    operators = measurement.to_array()
+    np.testing.assert_allclose(sum(operators), np.identity(32), atol=1e-10)
+    probs = measurement.probabilities(np.array(ensemble.density_matrices))
+    attained = np.sum(np.array(ensemble.probs) * np.diagonal(probs))
+    np.testing.assert_allclose(attained, value, atol=1e-10)
+    assert res.stats.dual_bound - value <= 1e-6
+
+
+def test_low_rank_escalates_rank():
+    """A spurious point of a rank that is too small for the optimal measurement is escaped."""
+    ensemble = mixed_ensemble(8, 2, 8, seed=2)
+    res = LowRank(ensemble, "min-error", True, seed=0)
+    value, measurement = res.solve()
+
+    assert res.rank == 8
+    assert res.stats.status == "optimal"
+    ranks = [
+        np.sum(np.linalg.eigvalsh(operator) > 1e-6)
+        for operator in measurement.to_array()
+    ]
+    assert ranks == [3, 5]
+    expected = OptDist(ensemble, "pos", "min-error", solver="CLARABEL")
+    expected.solve()
+    np.testing.assert_allclose(value, expected.value, atol=1e-6)
+
+
+def test_low_rank_time_limit():
+    """A solve stopped by its time limit returns certified bounds of its last iterate."""
+    ensemble = mixed_ensemble(16, 4, 16, seed=3)
+    res = OptDist(
+        ensemble, "pos", "min-error", low_rank=True, seed=0, time_limit=0.05
+    )
+    res.solve()
+
+    stats = res.stats
+    assert stats.total_time < 1
+    assert stats.status == "optimal_inaccurate"
+    expected = OptDist(ensemble, "pos", "min-error", solver="CLARABEL")
+    expected.solve()
+    assert stats.primal_bound <= expected.value + 1e-8
+    assert stats.dual_bound >= expected.value - 1e-8
+
+
+def test_low_rank_unsupported():
+    ensemble = pure_ensemble(4, 2)
+    with np.testing.assert_raises(ValueError):
+        LowRank(ensemble, "unambiguous", False)
+    with np.testing.assert_raises(ValueError):
+        OptDist(ensemble, "ppt", "min-error", low_rank=True).solve()
@@ -17,7 +17,9 @@
 import numpy as np
 from toqito.states import bell
 
-from qustop import Ensemble, OptDist, State
+from qustop import Ensemble, OptDist, SolveStats, State
+from qustop.core import stats
+from qustop.opt_dist import opt_dist, ppt
 
 
 def test_invalid_ensemble():
@@ -36,3 +38,161 @@ def test_invalid_ensemble():
             return_optimal_meas=True,
         )
         res.solve()
+
+
+def test_stats_and_callback():
+    """The statistics of the solve are recorded and passed to the callback."""
+    dims = [2, 2]
+    ensemble = Ensemble([State(bell(0), dims), State(bell(1), dims)])
+
+    recorded = []
+    res = OptDist(
+        ensemble=ensemble,
+        dist_measurement="pos",
+        dist_method="min-error",
+        return_optimal_meas=True,
+        callback=recorded.append,
+    )
+    res.solve()
+
+    assert isinstance(res.stats, SolveStats)
+    assert recorded == [res.stats]
+    assert res.stats.status == "optimal"
+    assert res.stats.num_variables > 0
+    assert res.stats.iterations > 0
+
+
+def test_auto_solver():
+    """With `solver="auto"`, a solver is chosen and recorded for each problem."""
+    dims = [2, 2]
+    ensemble = Ensemble([State(bell(i), dims) for i in range(3)])
+
+    for dist_measurement in ["pos", "ppt"]:
+        res = OptDist(
+            ensemble=ensemble,
+            dist_measurement=dist_measurement,
+            dist_method="min-error",
+            solver="auto",
+        )
+        res.solve()
+        expected = 1 if dist_measurement == "pos" else 2 / 3
+        np.testing.assert_allclose(res.value, expected, atol=1e-6)
+        assert res.stats.solver in res.stats.attempts[-1]
+
+
+def test_iteration_limit():
+    """A solve stopped by its iteration limit reports its status and certified bounds."""
+    dims = [2, 2]
+    ensemble = Ensemble([State(bell(i), dims) for i in range(3)])
+
+    res = OptDist(
+        ensemble=ensemble,
+        dist_measurement="ppt",
+        dist_method="min-error",
+        eps=1e-12,
+        max_iters=5,
+        time_limit=60,
+    )
+    res.solve()
+    assert res.stats.status == "optimal_inaccurate"
+    assert res.stats.iterations == 5
+    assert res.value == res.stats.last_primal_objective
+    assert res.stats.dual_bound >= res.value
+    assert res.stats.dual_bound >= 2 / 3
+    assert res.stats.primal_bound is None
+    assert len(res.measurements) == 3
+
+    for dist_measurement, return_optimal_meas in [
+        ("ppt", False),
+        ("pos", True),
+        ("pos", False),
+    ]:
+        res = OptDist(
+            ensemble=ensemble,
+            dist_measurement=dist_measurement,
+            dist_method="min-error",
+            return_optimal_meas=return_optimal_meas,
+            eps=1e-12,
+            max_iters=5,
+        )
+        res.solve()
+        expected = 1 if dist_measurement == "pos" else 2 / 3
+        assert res.stats.status == "optimal_inaccurate"
+        assert res.stats.dual_bound >= expected
+        if res.stats.primal_bound is not None:
+            assert res.stats.primal_bound <= expected + 1e-12
+
+
+def test_adaptive_accuracy():
+    """Values far from the threshold are screened, values close to it are refined."""
+    dims = [2, 2]
+    ensemble = Ensemble([State(bell(i), dims) for i in range(3)])
+
+    res = OptDist(ensemble, "ppt", "min-error", threshold=0.999, band=5e-4)
+    res.solve()
+    assert res.refined is False
+    np.testing.assert_allclose(res.value, 2 / 3, atol=1e-3)
+
+    recorded = []
+    res = OptDist(
+        ensemble,
+        "ppt",
+        "min-error",
+        threshold=2 / 3,
+        band=1e-3,
+        callback=recorded.append,
+    )
+    res.solve()
+    assert res.refined is True
+    assert recorded == [res.stats]
+    np.testing.assert_allclose(res.value, 2 / 3, atol=1e-7)
+    np.testing.assert_allclose(
+        sum(res.measurements), np.identity(4), atol=1e-6
+    )
+
+
+def test_adaptive_accuracy_time_limit(monkeypatch):
+    """The refinement only gets the time left by the screening solve."""
+    dims = [2, 2]
+    ensemble = Ensemble([State(bell(i), dims) for i in range(3)])
+
+    time_limits = []
+
+    def record(problem, build_start, **kwargs):
+        time_limits.append(kwargs["time_limit"])
+        return stats.solve_problem(problem, build_start, **kwargs)
+
+    monkeypatch.setattr(opt_dist, "solve_problem", record)
+    res = OptDist(
+        ensemble,
+        "ppt",
+        "min-error",
+        threshold=2 / 3,
+        band=1e-3,
+        time_limit=60,
+    )
+    res.solve()
+    assert res.refined is True
+    assert len(time_limits) == 1 and 0 < time_limits[0] < 60
+
+    # A screening solve that used up the time limit is not refined.
+    def slow(problem, build_start, **kwargs):
+        opt_val, solve_stats = stats.solve_problem(
+            problem, build_start, **kwargs
+        )
+        solve_stats.build_time += 60
+        return opt_val, solve_stats
+
+    monkeypatch.setattr(ppt, "solve_problem", slow)
+    time_limits.clear()
+    res = OptDist(
+        ensemble,
+        "ppt",
+        "min-error",
+        threshold=2 / 3,
+        band=1e-3,
+        time_limit=60,
+    )
+    res.solve()
+    assert res.refined is False
+    assert time_limits == []
@@ -15,6 +15,8 @@
 
 
 import numpy as np
+import pytest
+from scipy.linalg import block_diag
 from toqito.states import bell
 
 from qustop import Ensemble, OptDist, State
@@ -317,3 +319,88 @@ def test_state_distinguishability_bell_states():
     np.testing.assert_equal(
         np.isclose(dual_unambig_res.value, 1, atol=0.001), True
     )
+
+
+def test_unambiguous_kernel_parametrization_two_pure_states():
+    """Unambiguous discrimination of two pure states attains `1 - |<ψ_0|ψ_1>|`.
+
+    The measurements parametrized on the kernel of the other state should attain the same value
+    without any orthogonality constraints.
+    """
+    theta = np.pi / 6
+    psi_0 = np.array([[1, 0]]).T
+    psi_1 = np.array([[np.cos(theta), np.sin(theta)]]).T
+    ensemble = Ensemble([State(psi_0, [2]), State(psi_1, [2])])
+
+    for kernel_parametrization in [False, True]:
+        res = OptDist(
+            ensemble=ensemble,
+            dist_measurement="pos",
+            dist_method="unambiguous",
+            return_optimal_meas=True,
+            kernel_parametrization=kernel_parametrization,
+        )
+        res.solve()
+        np.testing.assert_equal(
+            np.isclose(res.value, 1 - np.cos(theta), atol=1e-4), True
+        )
+
+        # Each conclusive measurement operator is orthogonal to the other state.
+        meas = res.measurements
+        np.testing.assert_equal(
+            np.isclose(
+                np.trace(psi_1 @ psi_1.conj().T @ meas[0]), 0, atol=1e-4
+            ),
+            True,
+        )
+        np.testing.assert_equal(
+            np.isclose(
+                np.trace(psi_0 @ psi_0.conj().T @ meas[1]), 0, atol=1e-4
+            ),
+            True,
+        )
+
+
+@pytest.mark.parametrize("return_optimal_meas", [True, False])
+@pytest.mark.parametrize("dist_method", ["min-error", "unambiguous"])
+def test_block_diagonal_states(dist_method, return_optimal_meas):
+    """Block diagonal states hidden by a change of basis are solved block by block."""
+    rng = np.random.default_rng(0)
+    basis, _ = np.linalg.qr(rng.normal(size=(5, 5)))
+    states = []
+    for i in range(3):
+        mixed = rng.normal(size=(3, 3))
+        mixed = mixed @ mixed.T
+        pure = np.zeros((2, 2))
+        pure[i % 2, i % 2] = 1
+        states.append(
+            basis @ block_diag(mixed / np.trace(mixed) / 2, pure / 2) @ basis.T
+        )
+    ensemble = Ensemble([State(state, [5]) for state in states])
+
+    kwargs = {
+        "dist_measurement": "pos",
+        "dist_method": dist_method,
+        "return_optimal_meas": return_optimal_meas,
+        "solver": "CLARABEL",
+        "eps": None,
+    }
+    expected = OptDist(ensemble, **kwargs)
+    expected.solve()
+    res = OptDist(ensemble, decompose=True, block_basis=basis, **kwargs)
+    res.solve()
+
+    assert res.stats.num_variables < expected.stats.num_variables
+    np.testing.assert_allclose(res.value, expected.value, atol=1e-6)
+    if return_optimal_meas:
+        meas = res.measurements.to_array()
+        np.testing.assert_allclose(sum(meas), np.identity(5), atol=1e-6)
+        attained = sum(
+            np.trace(state @ meas_op) / 3
+            for state, meas_op in zip(states, meas)
+        )
+        np.testing.assert_allclose(attained, res.value, atol=1e-6)
+    elif dist_method == "min-error":
+        np.testing.assert_allclose(
+            np.trace(res.dual_variables[0]), res.value, atol=1e-6
+        )
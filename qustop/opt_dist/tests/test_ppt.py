@@ -18,9 +18,9 @@ import pytest
 from toqito.matrices import gen_pauli
 from toqito.matrix_ops import vec
 from toqito.perms import swap_operator
-from toqito.states import bell
+from toqito.states import basis, bell
 
-from qustop import Ensemble, OptDist, State
+from qustop import PPT, Ensemble, OptDist, State
 
 
 def test_ppt_distinguishability_one_state():
@@ -579,7 +579,7 @@ def test_entanglement_cost_ppt_four_bell_states():
     probs = [1 / 4, 1 / 4, 1 / 4, 1 / 4]
     ensemble = Ensemble(states, probs)
 
-    exp_res = 1 / 2 * (1 + np.sqrt(1 - eps ** 2))
+    exp_res = 1 / 2 * (1 + np.sqrt(1 - eps**2))
 
     # Solve the primal problem.
     primal_res = OptDist(
@@ -681,3 +681,151 @@ def test_distinguish_four_bell_states_measurements():
 
     bool_mat = np.isclose(expected_meas_3, res.measurements[3])
     np.testing.assert_equal(np.all(bool_mat), True)
+
+
+def test_ppt_unambiguous_kernel_parametrization():
+    """PPT unambiguous discrimination of two product states with and without kernel parametrization.
+
+    The states |0>|0> and |0>|ψ> can be unambiguously discriminated by Bob alone, so the optimal
+    value is `1 - |<0|ψ>|`.
+    """
+    theta = np.pi / 5
+    e_0 = np.array([[1, 0]]).T
+    psi = np.array([[np.cos(theta), np.sin(theta)]]).T
+    dims = [2, 2]
+    ensemble = Ensemble(
+        [State(np.kron(e_0, e_0), dims), State(np.kron(e_0, psi), dims)]
+    )
+
+    values = []
+    for kernel_parametrization in [False, True]:
+        res = OptDist(
+            ensemble=ensemble,
+            dist_measurement="ppt",
+            dist_method="unambiguous",
+            return_optimal_meas=True,
+            kernel_parametrization=kernel_parametrization,
+        )
+        res.solve()
+        values.append(res.value)
+        np.testing.assert_equal(
+            np.isclose(res.value, 1 - np.cos(theta), atol=1e-4), True
+        )
+    np.testing.assert_equal(np.isclose(values[0], values[1], atol=1e-4), True)
+
+
+def test_ppt_bipartitions_cuts():
+    """Equivalent and trivial cuts are removed from the bipartitions."""
+    e_0, e_1 = basis(2, 0), basis(2, 1)
+    dims = [2, 2, 2]
+    ghz = (
+        np.kron(np.kron(e_0, e_0), e_0) + np.kron(np.kron(e_1, e_1), e_1)
+    ) / np.sqrt(2)
+    ensemble = Ensemble([State(ghz, dims)])
+
+    ppt = PPT(
+        ensemble, "min-error", True, "SCS", False, 1e-8, bipartitions="all"
+    )
+    assert sorted(ppt._cuts) == [(2,), (2, 3), (3,)]
+
+    ppt = PPT(
+        ensemble,
+        "min-error",
+        True,
+        "SCS",
+        False,
+        1e-8,
+        bipartitions=[[1], [2, 3], [1, 2, 3]],
+    )
+    assert ppt._cuts == [(2, 3)]
+
+    with np.testing.assert_raises(ValueError):
+        PPT(
+            ensemble, "min-error", True, "SCS", False, 1e-8, bipartitions=[[4]]
+        )
+
+    with np.testing.assert_raises(ValueError):
+        PPT(
+            ensemble,
+            "min-error",
+            True,
+            "SCS",
+            False,
+            1e-8,
+            bipartitions="some",
+        )
+
+
+def test_ppt_all_bipartitions_ghz_states():
+    """The two GHZ states (|000> ± |111>)/√2 are perfectly distinguishable across all cuts."""
+    e_0, e_1 = basis(2, 0), basis(2, 1)
+    dims = [2, 2, 2]
+    e_000, e_111 = np.kron(np.kron(e_0, e_0), e_0), np.kron(
+        np.kron(e_1, e_1), e_1
+    )
+    states = [
+        State((e_000 + e_111) / np.sqrt(2), dims),
+        State((e_000 - e_111) / np.sqrt(2), dims),
+    ]
+    ensemble = Ensemble(states)
+
+    for return_optimal_meas in [True, False]:
+        res = OptDist(
+            ensemble,
+            "ppt",
+            "min-error",
+            return_optimal_meas=return_optimal_meas,
+            bipartitions="all",
+        )
+        res.solve()
+        np.testing.assert_equal(np.isclose(res.value, 1, atol=1e-4), True)
+
+
+def test_ppt_all_bipartitions_bipartite_bell_states():
+    """For two subsystems, all bipartitions reduce to the single cut between Alice and Bob."""
+    dims = [2, 2]
+    ensemble = Ensemble([State(bell(i), dims) for i in range(4)])
+
+    for return_optimal_meas in [True, False]:
+        res = OptDist(
+            ensemble,
+            "ppt",
+            "min-error",
+            return_optimal_meas=return_optimal_meas,
+            bipartitions="all",
+        )
+        res.solve()
+        np.testing.assert_equal(np.isclose(res.value, 1 / 2, atol=1e-4), True)
+
+
+def test_ppt_two_copies_alice_bob_cut():
+    """The copies are ordered A_1 A_2 B_1 B_2, so the default cut transposes the first two
+    positions and not the subsystems labelled 1 and 3, i.e. A_1 and B_1."""
+    bells = [State(bell(i), [2, 2]) for i in range(4)]
+    ppt = PPT(Ensemble(bells).copies(2), "min-error", True, "SCS", False, 1e-8)
+    assert ppt.cuts == [(3, 4)]
+
+
+def test_ppt_two_copies_noisy_bell_states():
+    """Across the cut between Alice and Bob, two copies of the noisy Bell states
+    `(B_i + I/4) / 2` are distinguished with probability 9/16, as for the states on `ℂ^4 ⊗ ℂ^4`.
+    The cut between the copies gives 5/8."""
+    states = [
+        State(bell(i) @ bell(i).T / 2 + np.identity(4) / 8, [2, 2])
+        for i in range(4)
+    ]
+    copies = Ensemble(states).copies(2)
+    res = OptDist(copies, "ppt", "min-error")
+    res.solve()
+    np.testing.assert_allclose(res.value, 9 / 16, atol=1e-5)
+
+    bipartite = Ensemble(
+        [State(state.value, [4, 4]) for state in copies.states]
+    )
+    res = OptDist(bipartite, "ppt", "min-error")
+    res.solve()
+    np.testing.assert_allclose(res.value, 9 / 16, atol=1e-5)
+
+    res = OptDist(copies, "ppt", "min-error", bipartitions=[[1, 3]])
+    res.solve()
+    np.testing.assert_allclose(res.value, 5 / 8, atol=1e-5)
@@ -0,0 +1,100 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import numpy as np
+import pytest
+from toqito.states import bell
+
+from qustop import Ensemble, OptDist, State
+from qustop.opt_dist import verify_dual
+from qustop.opt_dist.verify import psd_projection
+
+
+def bell_ensemble():
+    return Ensemble([State(bell(i), [2, 2]) for i in range(3)])
+
+
+def test_psd_projection():
+    mat = np.diag([1.0, -2.0, 3.0])
+    np.testing.assert_allclose(
+        psd_projection(mat[None])[0], np.diag([1, 0, 3])
+    )
+
+
+@pytest.mark.parametrize(
+    "dist_measurement, expected", [("pos", 1), ("ppt", 2 / 3)]
+)
+@pytest.mark.parametrize("eps", [1e-8, 1e-3])
+def test_verify_solver_dual(dist_measurement, expected, eps):
+    """Verified dual solutions bound the optimal value from above, even at loose tolerances."""
+    res = OptDist(
+        bell_ensemble(),
+        dist_measurement,
+        "min-error",
+        return_optimal_meas=False,
+        eps=eps,
+    )
+    res.solve()
+    certificate = res.verify()
+    np.testing.assert_allclose(certificate.value, res.value)
+    assert certificate.upper_bound >= expected - 1e-12
+    np.testing.assert_allclose(
+        certificate.upper_bound, expected, atol=10 * eps
+    )
+
+
+def test_verify_infeasible_candidate():
+    """An infeasible candidate is shifted until it is feasible."""
+    ensemble = bell_ensemble()
+    certificate = verify_dual(ensemble, np.zeros((4, 4)))
+    assert not certificate.is_feasible
+    np.testing.assert_allclose(certificate.shift, 1 / 3)
+    np.testing.assert_allclose(certificate.upper_bound, 4 / 3)
+
+    # Y = I / 6 with Q_i = |β_{3-i}><β_{3-i}| / 3 is an optimal PPT certificate for the Bell
+    # states |β_0>, |β_1>, |β_2>.
+    q_duals = np.array(
+        [[bell(3 - i) @ bell(3 - i).conj().T / 3] for i in range(3)]
+    )
+    y_dual = np.identity(4) / 6
+    certificate = verify_dual(ensemble, y_dual, q_duals)
+    np.testing.assert_allclose(certificate.upper_bound, 2 / 3, atol=1e-12)
+
+    np.testing.assert_raises(
+        ValueError, verify_dual, ensemble, y_dual, q_duals[:2]
+    )
+
+
+def test_verify_two_copies_default_cut():
+    """The default cut of two copies is between Alice's copies and Bob's, at positions 1 and 2."""
+    ensemble = bell_ensemble().copies(2)
+    rng = np.random.default_rng(0)
+    q_duals = rng.normal(size=(3, 1, 16, 16))
+    q_duals = q_duals + q_duals.transpose(0, 1, 3, 2)
+    y_dual = np.identity(16)
+    np.testing.assert_allclose(
+        verify_dual(ensemble, y_dual, q_duals).min_eigenvalues,
+        verify_dual(ensemble, y_dual, q_duals, [[1, 2]]).min_eigenvalues,
+    )
+    assert not np.allclose(
+        verify_dual(ensemble, y_dual, q_duals).min_eigenvalues,
+        verify_dual(ensemble, y_dual, q_duals, [[1, 3]]).min_eigenvalues,
+    )
+
+
+def test_verify_requires_dual():
+    res = OptDist(bell_ensemble(), "ppt", "min-error")
+    res.solve()
+    assert res.dual_variables is None
+    np.testing.assert_raises(ValueError, res.verify)
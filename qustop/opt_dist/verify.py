@@ -0,0 +1,185 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Verification of dual certificates of the min-error distinguishability SDPs without a solver.
+
+The dual of the min-error SDP with PPT measurements (equation-2 from arXiv:1205.1031) is
+
+    minimize tr(Y)  subject to  Y - p_i ρ_i ⪰ Σ_c Q_{i,c}^{T_c},  Q_{i,c} ⪰ 0,
+
+where `c` runs over the cuts across which the measurements are PPT. Without cuts, it is the dual
+of the SDP with positive measurements. By weak duality, `tr(Y)` of any feasible point is an upper
+bound on the optimal probability of distinguishing the states.
+
+A candidate returned by a solver, cached from an earlier run or computed at a loose tolerance is
+generally slightly infeasible. Each `Q_{i,c}` is projected onto the positive semidefinite cone and
+`Y` is shifted by the smallest multiple of the identity making all constraints hold, which yields
+a feasible point and hence a rigorous upper bound at the cost of a few batched eigendecompositions.
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+
+from qustop.core import Ensemble
+from qustop.core.partial import partial_transpose_batch
+
+
+class DualCertificate:
+    """The outcome of verifying a candidate dual solution."""
+
+    def __init__(
+        self,
+        value: float,
+        min_eigenvalues: np.ndarray,
+        shift: float,
+        dim: int,
+    ) -> None:
+        """Initializes a certificate.
+
+        Args:
+            value: The dual objective `tr(Y)` of the candidate.
+            min_eigenvalues: The smallest eigenvalue of the slack of each constraint.
+            shift: The multiple of the identity added to `Y` to make the candidate feasible.
+            dim: The dimension of `Y`.
+        """
+        self.value = value
+        self.min_eigenvalues = min_eigenvalues
+        self.shift = shift
+        self.dim = dim
+
+    def __str__(self) -> str:
+        return (
+            f"DualCertificate: \n "
+            f"value = {self.value}, \n "
+            f"shift = {self.shift}, \n "
+            f"upper_bound = {self.upper_bound}, \n"
+        )
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    @property
+    def upper_bound(self) -> float:
+        """The dual objective of the shifted, feasible candidate."""
+        return self.value + self.dim * self.shift
+
+    @property
+    def is_feasible(self) -> bool:
+        """Whether the candidate is feasible without a shift."""
+        return self.shift == 0
+
+
+def psd_projection(mats: np.ndarray) -> np.ndarray:
+    """Returns the nearest positive semidefinite matrix to the Hermitian part of each matrix."""
+    herm = (mats + mats.conj().swapaxes(-1, -2)) / 2
+    eigs, vecs = np.linalg.eigh(herm)
+    return (vecs * np.maximum(eigs, 0)[..., None, :]) @ vecs.conj().swapaxes(
+        -1, -2
+    )
+
+
+def verify_dual(
+    ensemble: Ensemble,
+    y_dual: np.ndarray,
+    q_duals: Optional[np.ndarray] = None,
+    cuts: Optional[Sequence[Sequence[int]]] = None,
+) -> DualCertificate:
+    """Verifies a candidate dual solution of the min-error SDP and returns its certificate.
+
+    Args:
+        ensemble: The ensemble of states.
+        y_dual: The candidate `Y`, a `(d, d)` matrix.
+        q_duals: The candidate `Q_{i,c}` as an array of shape `(n, len(cuts), d, d)`, or `None`
+            for the SDP with positive measurements.
+        cuts: The (1-indexed) subsystems transposed by each cut. Defaults to Alice's subsystems.
+
+    Raises:
+        ValueError:
+            * If the shape of `q_duals` does not match the ensemble and the cuts.
+    """
+    states = np.array(ensemble.density_matrices, dtype=complex)
+    probs = np.asarray(ensemble.probs)
+    num, dim = states.shape[0], states.shape[1]
+
+    y_dual = np.asarray(y_dual, dtype=complex)
+    y_dual = (y_dual + y_dual.conj().T) / 2
+    slack = y_dual[None] - probs[:, None, None] * states
+
+    if q_duals is not None:
+        cuts = [ensemble[0].alice_positions] if cuts is None else cuts
+        q_duals = np.asarray(q_duals, dtype=complex)
+        if q_duals.shape != (num, len(cuts), dim, dim):
+            raise ValueError(
+                f"The dual variables of shape {q_duals.shape} do not match the "
+                f"{num} states of dimension {dim} and the {len(cuts)} cuts."
+            )
+        for k, cut in enumerate(cuts):
+            slack -= partial_transpose_batch(
+                psd_projection(q_duals[:, k]), cut, ensemble.dims
+            )
+
+    min_eigs = np.linalg.eigvalsh(slack)[:, 0]
+
+    # `eigvalsh` is backward stable, so each computed eigenvalue is within a small multiple of
+    # the machine precision times the norm of the matrix of the exact one.
+    rounding = dim * np.finfo(float).eps * np.linalg.norm(slack, axis=(1, 2))
+    shift = float(max(np.max(rounding - min_eigs), 0.0))
+
+    return DualCertificate(
+        float(np.real(np.trace(y_dual))), min_eigs, shift, dim
+    )
+
+
+def dual_from_measurement(
+    ensemble: Ensemble, measurements: np.ndarray
+) -> np.ndarray:
+    """Returns the candidate dual solution `Y = Σ_i p_i ρ_i M_i` of a candidate measurement.
+
+    For an optimal measurement, the Hermitian part of this matrix is an optimal `Y`, so passing it
+    to :code:`verify_dual` turns the last primal iterate of a solver into an upper bound.
+
+    Args:
+        ensemble: The ensemble of states.
+        measurements: The candidate measurement operators, an array of shape `(n, d, d)`.
+    """
+    states = np.array(ensemble.density_matrices, dtype=complex)
+    probs = np.asarray(ensemble.probs)
+    y_dual = np.einsum("n,nij,njk->ik", probs, states, measurements)
+    return (y_dual + y_dual.conj().T) / 2
+
+
+def measurement_lower_bound(
+    ensemble: Ensemble, measurements: np.ndarray
+) -> Optional[float]:
+    """Returns the success probability of a candidate measurement repaired into a positive one.
+
+    Each operator is projected onto the positive semidefinite cone, giving `M_i`, and conjugated
+    by `S^{-1/2}` with `S = Σ_i M_i`, which yields a measurement whose success probability is a
+    lower bound on the optimal one with positive measurements, up to rounding. It is `None` if `S`
+    is numerically singular.
+
+    Args:
+        ensemble: The ensemble of states.
+        measurements: The candidate measurement operators, an array of shape `(n, d, d)`.
+    """
+    operators = psd_projection(np.asarray(measurements, dtype=complex))
+    eigs, vecs = np.linalg.eigh(operators.sum(axis=0))
+    if eigs[0] <= eigs.shape[0] * np.finfo(float).eps * eigs[-1]:
+        return None
+    inv_sqrt = (vecs / np.sqrt(eigs)) @ vecs.conj().T
+    repaired = inv_sqrt @ operators @ inv_sqrt
+
+    states = np.array(ensemble.density_matrices, dtype=complex)
+    probs = np.asarray(ensemble.probs)
+    return float(np.real(np.einsum("n,nij,nji->", probs, states, repaired)))
@@ -13,13 +13,74 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Any
+import importlib.util
+import math
+import time
+from typing import Any, Callable, Optional
 
 import cvxpy
 import numpy as np
-import picos
 
 from qustop.core import Ensemble
+from qustop.core.blocks import (
+    block_decomposition,
+    embed_blocks,
+    restrict_ensemble,
+    solve_blocks,
+)
+from qustop.core.sdp import (
+    measurement_variables,
+    inner_product_operator,
+    orthogonality_constraint,
+    partial_transpose,
+    symmetric_extension,
+    weighted_inner_product,
+)
+from qustop.core.solvers import AUTO
+from qustop.core.stats import (
+    MemoryTracker,
+    SolveStats,
+    merge_stats,
+    solve_problem,
+)
+
+
+BACKENDS = ("auto", "cvxpy", "picos")
+DIST_MEASUREMENTS = ("pos", "ppt", "sep")
+
+
+def backend_solver(solver: str, backend: str) -> Optional[str]:
+    """Spell a solver name the way the given modelling backend expects it.
+
+    cvxpy registers its solvers in upper case (``"CVXOPT"``) while picos uses
+    lower case names (``"cvxopt"``). With ``"auto"``, picos picks a solver itself.
+    """
+    if solver.lower() == AUTO:
+        return AUTO if backend == "cvxpy" else None
+    return solver.upper() if backend == "cvxpy" else solver.lower()
+
+
+def picos_installed_solvers() -> list[str]:
+    """The solvers picos can reach, or none if picos is not installed."""
+    if importlib.util.find_spec("picos") is None:
+        return []
+    import picos
+
+    return picos.available_solvers()
+
+
+def _solve_block(item: tuple) -> tuple:
+    """Solves the exclusion problem of a single block and returns its value, measurements and
+    statistics as arrays that can be sent between processes."""
+    ensemble, dist_method, kwargs = item
+    res = OptExclude(ensemble, dist_method, **kwargs)
+    res.solve()
+    meas = (
+        [np.asarray(meas_op) for meas_op in res.measurements]
+        if kwargs["return_optimal_meas"] and res.value is not None
+        else None
+    )
+    return res.value, meas, res.stats
 
 
 class OptExclude:
@@ -36,6 +97,29 @@ class OptExclude:
         self._solver = kwargs.get("solver", "SCS")
         self._verbose = kwargs.get("verbose", False)
         self._eps = kwargs.get("eps", 1e-8)
+        self._time_limit = kwargs.get("time_limit", None)
+        self._max_iters = kwargs.get("max_iters", None)
+        self._backend = kwargs.get("backend", "auto")
+        self._dist_measurement = kwargs.get("dist_measurement", "pos")
+        self._level = kwargs.get("level", 2)
+        self._decompose = kwargs.get("decompose", False)
+        self._block_basis: Optional[np.ndarray] = kwargs.get(
+            "block_basis", None
+        )
+        self._num_workers = kwargs.get("num_workers", 1)
+        self._callback: Optional[Callable[[SolveStats], None]] = kwargs.get(
+            "callback", None
+        )
+
+        if self._backend not in BACKENDS:
+            raise ValueError(
+                f"Backend {self._backend} not supported. Choose from {BACKENDS}."
+            )
+        if self._dist_measurement not in DIST_MEASUREMENTS:
+            raise ValueError(
+                f"Measurement type {self._dist_measurement} not supported. Choose from "
+                f"{DIST_MEASUREMENTS}."
+            )
 
         self._states = self._ensemble.density_matrices
         self._probs = self._ensemble.probs
@@ -44,14 +128,19 @@ class OptExclude:
 
         self._optimal_value = None
         self._optimal_measurements: list[np.ndarray] = []
+        self._stats: Optional[SolveStats] = None
 
     @property
     def value(self) -> float:
         return self._optimal_value
 
+    @property
+    def stats(self) -> Optional[SolveStats]:
+        return self._stats
+
     @property
     def measurements(self) -> list[np.ndarray]:
-        if isinstance(self._optimal_measurements[0], cvxpy.Variable):
+        if isinstance(self._optimal_measurements[0], cvxpy.Expression):
             self._optimal_measurements = self.convert_measurements(
                 self._optimal_measurements
             )
@@ -62,120 +151,392 @@ class OptExclude:
         return [measurements[i].value for i in range(len(measurements))]
 
     def solve(self) -> None:
-        """Solve either the primal or dual problem for the state exclusion SDP."""
-        # Return the optimal value and the optimal measurements.
-        if self._return_optimal_meas:
+        """Solve either the primal or dual problem for the state exclusion SDP.
+
+        With `decompose`, the problem is solved separately on each common diagonal block of the
+        states in the basis `block_basis`, in `num_workers` processes. This applies to positive
+        measurements and to min-error or unambiguous exclusion, whose values add up over the
+        blocks.
+
+        Raises:
+            ValueError:
+                * If `decompose` is set for worst-case exclusion or restricted measurements.
+        """
+        if self._decompose:
+            if (
+                self._dist_method == "worst-case"
+                or self._dist_measurement != "pos"
+            ):
+                raise ValueError(
+                    f"Block decomposition not supported for {self._dist_method} exclusion "
+                    f"with {self._dist_measurement} measurements."
+                )
+            blocks = block_decomposition(self._states, self._block_basis)
+            if len(blocks) > 1:
+                self.block_problems(blocks)
+                if self._callback is not None:
+                    self._callback(self._stats)
+                return
+
+        # Return the optimal value and the optimal measurements. Only the primal problem is
+        # formulated for worst-case exclusion and for PPT or separable measurements.
+        if (
+            self._return_optimal_meas
+            or self._dist_method == "worst-case"
+            or self._dist_measurement != "pos"
+        ):
             self.primal_problem()
 
         # Otherwise, it is often less computationally intensive to just solve the dual problem.
         else:
             self.dual_problem()
 
+        if self._callback is not None and self._stats is not None:
+            self._callback(self._stats)
+
     def primal_problem(self) -> None:
         """Calculate primal problem for the state exclusion SDP.
 
         The primal problem for the min-error case is defined in equation-3 from arXiv:1306.4683.
         The primal problem for the unambiguous case is defined in equation-37 from arXiv:1306.4683.
+        The worst-case problem minimizes the largest probability of outputting any of the states.
         """
+        build_start = time.perf_counter()
         num_measurements = len(self._states)
 
         # Define each measurement variable to be a PSD variable of appropriate dimension.
-        meas = [
-            cvxpy.Variable(self._ensemble.shape, hermitian=True)
-            for _ in range(num_measurements)
-        ]
+        meas, meas_vec, psd_constraints = measurement_variables(
+            self._states, num_measurements
+        )
+
+        # Restrict the measurements to PPT or separable ones if requested.
+        restrictions = self._measurement_constraints(meas)
 
         # Unambiguous state discrimination has an additional constraint on the states and measurements.
         if self._dist_method == "unambiguous":
             # Objective function is the inner product between the states and measurements.
-            obj_func = [
-                self._probs[i]
-                * cvxpy.trace(self._states[j].conj().T @ meas[i])
+            pairs = [
+                (j, i)
                 for i, _ in enumerate(self._states)
                 for j, _ in enumerate(self._states)
             ]
+            weights = [self._probs[i] for _, i in pairs]
+            objective = cvxpy.Maximize(
+                weighted_inner_product(
+                    self._states, weights, meas_vec, num_measurements, pairs
+                )
+            )
+
             # Valid collection of measurements need to sum to the identity operator and be positive semidefinite.
             constraints = [
                 cvxpy.sum(meas) <= np.identity(self._ensemble.shape[0])
             ]
-            for i in range(num_measurements):
-                constraints.append(meas[i] >> 0)
-
-            for i in range(num_measurements):
-                constraints.append(
-                    cvxpy.trace(self._states[i].conj().T @ meas[i]) == 0
-                )
-
-            obj_sum = cvxpy.sum(obj_func)
-            objective = cvxpy.Maximize(cvxpy.real(obj_sum))
+            constraints += psd_constraints
+            constraints += restrictions
+
+            constraints += orthogonality_constraint(
+                self._states,
+                meas_vec,
+                num_measurements,
+                [(i, i) for i in range(num_measurements)],
+            )
 
             problem = cvxpy.Problem(objective, constraints)
-            opt_val = problem.solve(
-                solver=self._solver, verbose=self._verbose, eps=self._eps
+            opt_val, self._stats = solve_problem(
+                problem,
+                build_start,
+                solver=backend_solver(self._solver, "cvxpy"),
+                verbose=self._verbose,
+                eps=self._eps,
+                time_limit=self._time_limit,
+                max_iters=self._max_iters,
             )
             self._optimal_value = opt_val
             self._optimal_measurements = meas
 
         elif self._dist_method == "min-error":
             # Objective function is the inner product between the states and measurements.
-            obj_func = [
-                self._probs[i]
-                * cvxpy.trace(self._states[i].conj().T @ meas[i])
-                for i, _ in enumerate(self._states)
-            ]
+            objective = cvxpy.Minimize(
+                weighted_inner_product(
+                    self._states, self._probs, meas_vec, num_measurements
+                )
+            )
 
             # Valid collection of measurements need to sum to the identity operator and be positive semidefinite.
             constraints = [
                 cvxpy.sum(meas) == np.identity(self._ensemble.shape[0])
             ]
-            for i in range(num_measurements):
-                constraints.append(meas[i] >> 0)
-
-            obj_sum = cvxpy.sum(obj_func)
-            objective = cvxpy.Minimize(cvxpy.real(obj_sum))
+            constraints += psd_constraints
+            constraints += restrictions
 
             problem = cvxpy.Problem(objective, constraints)
-            opt_val = problem.solve(
-                solver=self._solver, verbose=self._verbose, eps=self._eps
+            opt_val, self._stats = solve_problem(
+                problem,
+                build_start,
+                solver=backend_solver(self._solver, "cvxpy"),
+                verbose=self._verbose,
+                eps=self._eps,
+                time_limit=self._time_limit,
+                max_iters=self._max_iters,
             )
             self._optimal_value = opt_val
             self._optimal_measurements = meas
         elif self._dist_method == "worst-case":
-            pass
+            # The largest probability of outputting the state that was actually prepared.
+            t_var = cvxpy.Variable()
+            objective = cvxpy.Minimize(t_var)
+
+            operator = inner_product_operator(
+                self._states,
+                [(i, i) for i in range(num_measurements)],
+                num_measurements,
+            )
+            constraints = [
+                cvxpy.sum(meas) == np.identity(self._ensemble.shape[0]),
+                cvxpy.real(operator @ meas_vec) <= t_var,
+            ]
+            constraints += psd_constraints
+            constraints += restrictions
+
+            problem = cvxpy.Problem(objective, constraints)
+            opt_val, self._stats = solve_problem(
+                problem,
+                build_start,
+                solver=backend_solver(self._solver, "cvxpy"),
+                verbose=self._verbose,
+                eps=self._eps,
+                time_limit=self._time_limit,
+                max_iters=self._max_iters,
+            )
+            self._optimal_value = opt_val
+            self._optimal_measurements = meas
         else:
-            pass
+            raise ValueError(
+                f"Exclusion method {self._dist_method} not supported."
+            )
 
-    def dual_problem(self) -> None:
-        if self._dist_method == "unambiguous":
-            problem = picos.Problem()
+    def block_problems(self, blocks: list[np.ndarray]) -> None:
+        """Solves the exclusion problem of each diagonal block of the states separately and
+        recombines the optimal values and measurements.
 
-            # Set up density matrices as problem parameters.
-            density_matrices = []
+        Args:
+            blocks: The indices of each block, as returned by :code:`block_decomposition`.
+        """
+        kwargs = {
+            "return_optimal_meas": self._return_optimal_meas,
+            "solver": self._solver,
+            "verbose": self._verbose,
+            "eps": self._eps,
+            "time_limit": self._time_limit,
+            "max_iters": self._max_iters,
+            "backend": self._backend,
+        }
+        items = [
+            (
+                restrict_ensemble(self._ensemble, block, self._block_basis),
+                self._dist_method,
+                kwargs,
+            )
+            for block in blocks
+        ]
+        values, meas, stats = zip(
+            *solve_blocks(_solve_block, items, self._num_workers)
+        )
+        stats = [stat for stat in stats if stat is not None]
+        self._stats = merge_stats(stats) if stats else None
+        self._optimal_value = None if None in values else sum(values)
+        if self._return_optimal_meas:
+            self._optimal_measurements = (
+                [
+                    embed_blocks(block_meas, blocks, self._block_basis)
+                    for block_meas in zip(*meas)
+                ]
+                if self._optimal_value is not None
+                else [None] * len(self._states)
+            )
 
-            for i, state in enumerate(self._states):
-                density_matrices.append(
-                    picos.Constant("P[{0}]".format(i), state)
+    def _measurement_constraints(
+        self, meas: list[cvxpy.Variable]
+    ) -> list[cvxpy.Constraint]:
+        """Returns the constraints restricting the measurements to the selected class.
+
+        PPT measurements are PPT across the cut between Alice and Bob. Separable measurements are
+        relaxed to those admitting a PPT symmetric extension at the given level.
+        """
+        constraints = []
+        if self._dist_measurement == "ppt":
+            sys = self._ensemble[0].alice_positions
+            for meas_op in meas:
+                constraints.append(
+                    partial_transpose(meas_op, sys, self._dims) >> 0
+                )
+        elif self._dist_measurement == "sep":
+            for meas_op in meas:
+                _, ext_constraints = symmetric_extension(
+                    meas_op, self._ensemble[0].bipartite_dims, self._level
                 )
+                constraints += ext_constraints
+        return constraints
 
-            # Set up the Lagrange multiplier matrix:
-            Y = picos.HermitianVariable("Y", self._states[0].shape)
+    @property
+    def backend(self) -> str:
+        """The modelling backend used for the dual problem.
+
+        With ``backend="auto"``, cvxpy is preferred whenever it can reach the requested
+        solver, since it builds the dual faster and avoids importing picos altogether.
+        picos is only used for solvers that are exclusively available through it. The choice
+        only depends on the solver, the size of the problem and the cost of building it are not
+        taken into account.
+
+        Raises:
+            ValueError:
+                * If the solver is not available through the backend, or through either backend
+                  with ``backend="auto"``.
+        """
+        cvxpy_solvers = cvxpy.installed_solvers()
+        picos_solvers = picos_installed_solvers()
+        if self._backend == "cvxpy" or (
+            self._backend == "auto"
+            and backend_solver(self._solver, "cvxpy") in [AUTO] + cvxpy_solvers
+        ):
+            return "cvxpy"
+        if backend_solver(self._solver, "picos") in [None] + picos_solvers:
+            return "picos"
+        if self._backend == "picos":
+            raise ValueError(
+                f"Solver {self._solver} not supported by the picos backend. Choose from "
+                f"{picos_solvers}."
+            )
+        raise ValueError(
+            f"Solver {self._solver} not supported. Choose from {cvxpy_solvers} with cvxpy or "
+            f"{picos_solvers} with picos."
+        )
 
-            # Add constraints:
-            problem.add_list_of_constraints([Y << p for p in density_matrices])
+    def dual_problem(self) -> None:
+        """Calculate dual problem for the state exclusion SDP with the selected backend.
 
-            # Add objective:
-            problem.set_objective("max", "I" | Y)
+        The dual maximizes `tr(Y)` subject to `Y ⪯ w_i ρ_i`, where the weights `w_i` are the
+        probabilities of the states for min-error exclusion and one for unambiguous exclusion.
+        The optimal measurement operators are the dual variables of these constraints.
 
-            # Solve the problem:
-            solution = problem.solve(
-                solver=self._solver, verbosity=self._verbose
+        Raises:
+            ValueError:
+                * If the dual problem is not formulated for the exclusion method.
+        """
+        if self._dist_method not in ("min-error", "unambiguous"):
+            raise ValueError(
+                f"The dual problem of {self._dist_method} exclusion is not supported, solve "
+                f"the primal problem with `return_optimal_meas=True`."
             )
+        if self.backend == "picos":
+            self._picos_dual_problem()
+        else:
+            self._cvxpy_dual_problem()
 
-            # Extract the optimal measurements:
-            measurements = [
-                problem.get_constraint(k).dual
-                for k in range(len(self._states))
-            ]
+    @property
+    def _dual_weights(self) -> list[float]:
+        """The weights `w_i` of the constraints `Y ⪯ w_i ρ_i` of the dual problem."""
+        if self._dist_method == "min-error":
+            return list(self._probs)
+        return [1.0] * len(self._states)
+
+    def _cvxpy_dual_problem(self) -> None:
+        build_start = time.perf_counter()
+
+        # Set up the Lagrange multiplier matrix:
+        y_var = cvxpy.Variable(self._states[0].shape, hermitian=True)
+
+        # The optimal measurements are the dual variables of these constraints.
+        constraints = [
+            weight * state - y_var >> 0
+            for weight, state in zip(self._dual_weights, self._states)
+        ]
+        objective = cvxpy.Maximize(cvxpy.real(cvxpy.trace(y_var)))
+
+        problem = cvxpy.Problem(objective, constraints)
+        opt_val, self._stats = solve_problem(
+            problem,
+            build_start,
+            solver=backend_solver(self._solver, "cvxpy"),
+            verbose=self._verbose,
+            eps=self._eps,
+            time_limit=self._time_limit,
+            max_iters=self._max_iters,
+        )
+        self._optimal_value = opt_val
+        # cvxpy reduces a Hermitian constraint `X ⪰ 0` to the real constraint
+        # `[[Re X, -Im X], [Im X, Re X]] ⪰ 0`, which counts each entry of `X` twice, so the dual
+        # value it reports is half the measurement operator.
+        self._optimal_measurements = [
+            2 * constraint.dual_value
+            if constraint.dual_value is not None
+            else None
+            for constraint in constraints
+        ]
+
+    def _picos_dual_problem(self) -> None:
+        import picos
+
+        build_start = time.perf_counter()
+        problem = picos.Problem()
+
+        # Set up density matrices as problem parameters.
+        density_matrices = []
+
+        for i, (weight, state) in enumerate(
+            zip(self._dual_weights, self._states)
+        ):
+            density_matrices.append(
+                picos.Constant("P[{0}]".format(i), weight * state)
+            )
+
+        # Set up the Lagrange multiplier matrix:
+        Y = picos.HermitianVariable("Y", self._states[0].shape)
+
+        # Add constraints:
+        problem.add_list_of_constraints([Y << p for p in density_matrices])
+
+        # Add objective:
+        problem.set_objective("max", "I" | Y)
+
+        # Solve the problem:
+        build_time = time.perf_counter() - build_start
+        solve_start = time.perf_counter()
+        with MemoryTracker() as memory:
+            solution = problem.solve(
+                solver=backend_solver(self._solver, "picos"),
+                verbosity=self._verbose,
+                # picos only accepts whole seconds.
+                timelimit=(
+                    math.ceil(self._time_limit)
+                    if self._time_limit is not None
+                    else None
+                ),
+                max_iterations=self._max_iters,
+            )
+        total_time = time.perf_counter() - solve_start
+
+        # Picos only reports the time spent by the solver itself, the
+        # remainder is spent reformulating the problem.
+        self._stats = SolveStats(
+            build_time=build_time,
+            compile_time=max(total_time - solution.searchTime, 0.0),
+            solver_time=solution.searchTime,
+            status=solution.claimedStatus,
+            solver=solution.solver,
+            num_variables=sum(var.dim for var in problem.variables.values()),
+            num_constraints=sum(
+                int(np.prod(con.size)) for con in problem.constraints.values()
+            ),
+            peak_memory=memory.peak,
+        )
+
+        # Extract the optimal measurements. The dual variables picos reports are the complex
+        # conjugates of the operators `M_i` with `(w_i ρ_i - Y) M_i = 0`.
+        measurements = [
+            np.conj(np.asarray(problem.get_constraint(k).dual))
+            for k in range(len(self._states))
+        ]
 
-            self._optimal_value = solution.value
-            self._optimal_measurements = measurements
+        self._optimal_value = solution.value
+        self._optimal_measurements = measurements
@@ -15,7 +15,9 @@
 
 
 import numpy as np
-from toqito.states import bell
+import pytest
+from scipy.linalg import block_diag
+from toqito.states import basis, bell
 
 from qustop import Ensemble, OptExclude, State
 
@@ -75,4 +77,267 @@ def test_unambiguous_state_exclusion_two_states_dual():
         return_optimal_meas=False,
     )
     res.solve()
-    np.testing.assert_equal(np.isclose(res.value, 0), True)
\ No newline at end of file
+    np.testing.assert_equal(np.isclose(res.value, 0), True)
+
+
+def test_state_exclusion_stats():
+    """Statistics are recorded for both the primal and dual problems."""
+    dims = [2, 2]
+    ensemble = Ensemble([State(bell(0), dims), State(bell(1), dims)])
+
+    recorded = []
+    primal_res = OptExclude(
+        ensemble=ensemble,
+        dist_method="min-error",
+        return_optimal_meas=True,
+        callback=recorded.append,
+    )
+    primal_res.solve()
+    assert primal_res.stats.status == "optimal"
+    assert recorded == [primal_res.stats]
+
+    dual_res = OptExclude(
+        ensemble=ensemble,
+        solver="cvxopt",
+        dist_method="unambiguous",
+        return_optimal_meas=False,
+    )
+    dual_res.solve()
+    assert dual_res.stats.solver.lower() == "cvxopt"
+    assert dual_res.stats.num_variables > 0
+
+
+def test_state_exclusion_time_limit():
+    """A time limit is passed to the solver and the status of the solve is recorded."""
+    dims = [2, 2]
+    ensemble = Ensemble([State(bell(i), dims) for i in range(4)])
+    res = OptExclude(ensemble=ensemble, dist_method="min-error", time_limit=60)
+    res.solve()
+    assert res.stats.status == "optimal"
+    np.testing.assert_allclose(res.value, 0, atol=1e-6)
+
+    res = OptExclude(
+        ensemble=ensemble,
+        dist_method="min-error",
+        dist_measurement="ppt",
+        eps=1e-12,
+        max_iters=2,
+    )
+    res.solve()
+    assert res.stats.status == "optimal_inaccurate"
+    assert res.stats.last_primal_objective is not None
+
+
+@pytest.mark.parametrize("backend", ["cvxpy", "picos"])
+def test_unambiguous_state_exclusion_dual_backends(backend):
+    """Both modelling backends solve the dual and return valid measurements."""
+    dims = [2, 2]
+    ensemble = Ensemble([State(bell(i), dims) for i in range(4)])
+
+    res = OptExclude(
+        ensemble=ensemble,
+        solver="cvxopt",
+        dist_method="unambiguous",
+        return_optimal_meas=False,
+        backend=backend,
+    )
+    res.solve()
+    assert res.backend == backend
+    np.testing.assert_equal(np.isclose(res.value, 0, atol=1e-6), True)
+    np.testing.assert_allclose(
+        sum(np.asarray(meas) for meas in res.measurements),
+        np.identity(4),
+        atol=1e-6,
+    )
+
+
+def random_density_matrices(num, dim):
+    rng = np.random.default_rng(1)
+    mats = rng.normal(size=(num, dim, dim)) + 1j * rng.normal(
+        size=(num, dim, dim)
+    )
+    mats = mats @ mats.conj().transpose(0, 2, 1)
+    return [mat / np.trace(mat) for mat in mats]
+
+
+@pytest.mark.parametrize("dist_method", ["min-error", "unambiguous"])
+def test_state_exclusion_dual_measurements(dist_method):
+    """The dual problems of both backends return the same optimal measurements of complex
+    states, which attain the optimal value."""
+    states = random_density_matrices(3, 3)
+    probs = [0.5, 0.3, 0.2]
+    ensemble = Ensemble([State(state, [3]) for state in states], probs)
+    weights = probs if dist_method == "min-error" else [1, 1, 1]
+
+    results = {}
+    for backend in ["cvxpy", "picos"]:
+        res = OptExclude(
+            ensemble=ensemble,
+            solver="cvxopt",
+            dist_method=dist_method,
+            return_optimal_meas=False,
+            backend=backend,
+        )
+        res.solve()
+        meas = [np.asarray(op) for op in res.measurements]
+        np.testing.assert_allclose(sum(meas), np.identity(3), atol=1e-6)
+        for op in meas:
+            assert np.linalg.eigvalsh(op)[0] > -1e-6
+        np.testing.assert_allclose(
+            sum(
+                weight * np.real(np.trace(state @ op))
+                for weight, state, op in zip(weights, states, meas)
+            ),
+            res.value,
+            atol=1e-6,
+        )
+        results[backend] = res.value, meas
+
+    np.testing.assert_allclose(
+        results["cvxpy"][0], results["picos"][0], atol=1e-6
+    )
+    for op_cvxpy, op_picos in zip(results["cvxpy"][1], results["picos"][1]):
+        np.testing.assert_allclose(op_cvxpy, op_picos, atol=1e-4)
+
+    if dist_method == "min-error":
+        primal = OptExclude(ensemble=ensemble, dist_method="min-error")
+        primal.solve()
+        np.testing.assert_allclose(
+            primal.value, results["cvxpy"][0], atol=1e-6
+        )
+
+    with np.testing.assert_raises(ValueError):
+        OptExclude(ensemble=ensemble, dist_method="worst-case").dual_problem()
+
+
+def test_backend_selection():
+    """cvxpy is selected automatically for solvers it can reach, and solvers that cannot be
+    reached through the backend are rejected."""
+    ensemble = Ensemble([State(bell(0), [2, 2])])
+    res = OptExclude(
+        ensemble=ensemble, solver="cvxopt", dist_method="unambiguous"
+    )
+    assert res.backend == "cvxpy"
+
+    res = OptExclude(
+        ensemble=Ensemble([State(bell(i), [2, 2]) for i in range(2)]),
+        solver="auto",
+        dist_method="min-error",
+    )
+    assert res.backend == "cvxpy"
+    res.solve()
+    np.testing.assert_allclose(res.value, 0, atol=1e-6)
+
+    with np.testing.assert_raises(ValueError):
+        OptExclude(
+            ensemble=ensemble, dist_method="unambiguous", backend="mosek"
+        )
+
+    # The default solver SCS is only reachable through cvxpy.
+    res = OptExclude(
+        ensemble=ensemble,
+        dist_method="unambiguous",
+        return_optimal_meas=False,
+        backend="picos",
+    )
+    np.testing.assert_raises(ValueError, res.solve)
+
+    res = OptExclude(
+        ensemble=ensemble,
+        solver="unknown",
+        dist_method="unambiguous",
+        return_optimal_meas=False,
+    )
+    np.testing.assert_raises(ValueError, res.solve)
+
+
+def test_worst_case_state_exclusion():
+    """Worst-case exclusion of two states does not depend on the prior."""
+    e_0, e_1 = basis(2, 0), basis(2, 1)
+    e_p = (e_0 + e_1) / np.sqrt(2)
+    ensemble = Ensemble([State(e_0, [2]), State(e_p, [2])], [0.3, 0.7])
+
+    res = OptExclude(ensemble=ensemble, dist_method="worst-case")
+    res.solve()
+    np.testing.assert_equal(
+        np.isclose(res.value, (1 - 1 / np.sqrt(2)) / 2, atol=1e-6), True
+    )
+
+
+@pytest.mark.parametrize("dist_measurement", ["pos", "ppt", "sep"])
+def test_restricted_state_exclusion_bell_states(dist_measurement):
+    """The four Bell states can be excluded with a product measurement."""
+    ensemble = Ensemble([State(bell(i), [2, 2]) for i in range(4)])
+
+    for dist_method in ["min-error", "worst-case"]:
+        res = OptExclude(
+            ensemble=ensemble,
+            dist_method=dist_method,
+            dist_measurement=dist_measurement,
+        )
+        res.solve()
+        np.testing.assert_equal(np.isclose(res.value, 0, atol=1e-6), True)
+
+
+@pytest.mark.parametrize("dist_measurement", ["ppt", "sep"])
+def test_restricted_state_exclusion_isotropic(dist_measurement):
+    """A Bell state and its orthogonal complement cannot be excluded with PPT measurements."""
+    phi = bell(0) * bell(0).conj().T
+    ensemble = Ensemble(
+        [State(phi, [2, 2]), State((np.identity(4) - phi) / 3, [2, 2])]
+    )
+
+    res = OptExclude(ensemble=ensemble, dist_method="min-error")
+    res.solve()
+    np.testing.assert_equal(np.isclose(res.value, 0, atol=1e-6), True)
+
+    res = OptExclude(
+        ensemble=ensemble,
+        dist_method="worst-case",
+        dist_measurement=dist_measurement,
+        return_optimal_meas=False,
+    )
+    res.solve()
+    np.testing.assert_equal(np.isclose(res.value, 1 / 4, atol=1e-6), True)
+
+    with np.testing.assert_raises(ValueError):
+        OptExclude(
+            ensemble=ensemble, dist_method="min-error", dist_measurement="locc"
+        )
+
+
+def test_block_diagonal_state_exclusion():
+    """Flagged states are excluded block by block, in worker processes."""
+    rng = np.random.default_rng(0)
+    states = []
+    for _ in range(3):
+        blocks = [rng.normal(size=(2, 2)) for _ in range(2)]
+        blocks = [block @ block.T for block in blocks]
+        states.append(
+            block_diag(*[block / np.trace(block) / 2 for block in blocks])
+        )
+    ensemble = Ensemble([State(state, [4]) for state in states])
+
+    for dist_method, return_optimal_meas in [
+        ("min-error", True),
+        ("unambiguous", False),
+    ]:
+        kwargs = {
+            "return_optimal_meas": return_optimal_meas,
+            "solver": "CLARABEL",
+            "eps": None,
+        }
+        expected = OptExclude(ensemble, dist_method, **kwargs)
+        expected.solve()
+        res = OptExclude(
+            ensemble, dist_method, decompose=True, num_workers=2, **kwargs
+        )
+        res.solve()
+        np.testing.assert_allclose(res.value, expected.value, atol=1e-6)
+        if return_optimal_meas:
+            np.testing.assert_allclose(
+                sum(res.measurements), np.identity(4), atol=1e-6
+            )
+
+    with np.testing.assert_raises(ValueError):
+        OptExclude(ensemble, "worst-case", decompose=True).solve()
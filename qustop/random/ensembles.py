@@ -0,0 +1,164 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Reproducible streams of random ensembles."""
+from typing import Iterator, Optional
+
+import numpy as np
+
+from qustop.core import Ensemble, ProductState, State
+from qustop.random.samplers import (
+    haar_states,
+    haar_unitaries,
+    local_states,
+    random_density_matrices,
+)
+
+
+class EnsembleSampler:
+    """A lazy, reproducible stream of random ensembles.
+
+    The ensembles are drawn in batches of `batch_size`. Ensemble `k` is drawn from a NumPy
+    generator seeded with the `k`-th child of the seed sequence of `seed`, so the stream does not
+    depend on the batch size and any ensemble of the stream can be regenerated on its own with
+    :code:`ensemble_at` without drawing the ones before it. Only one batch is held in memory at a
+    time.
+    """
+
+    kinds = ("pure", "mixed", "product", "orthogonal")
+
+    def __init__(
+        self,
+        kind: str,
+        num_states: int,
+        dims: list[int],
+        num_ensembles: Optional[int] = None,
+        seed: Optional[int] = None,
+        batch_size: int = 256,
+        rank: Optional[int] = None,
+    ) -> None:
+        """Initializes a stream of random ensembles.
+
+        Args:
+            kind: The kind of random states, one of:
+                * "pure": Haar random pure states.
+                * "mixed": Random density matrices of the given `rank`.
+                * "product": Products of Haar random pure states on each subsystem, given as
+                  :code:`ProductState` objects.
+                * "orthogonal": Mutually orthogonal pure states given by the columns of a Haar
+                  random unitary.
+            num_states: The number of states in each ensemble.
+            dims: The dimensions of the subsystems of each state.
+            num_ensembles: The length of the stream, which is infinite by default.
+            seed: The seed of the stream. A random seed is used by default.
+            batch_size: The number of ensembles drawn at once.
+            rank: The rank of the "mixed" states, full rank by default.
+
+        Raises:
+            ValueError:
+                * If `kind` is not supported.
+                * If more orthogonal states are requested than the dimension allows.
+        """
+        if kind not in self.kinds:
+            raise ValueError(
+                f"Ensemble kind {kind} not supported. Choose from {self.kinds}."
+            )
+        self._kind = kind
+        self._num_states = num_states
+        self._dims = list(dims)
+        self._dim = int(np.prod(dims))
+        self._num_ensembles = num_ensembles
+        self._batch_size = batch_size
+        self._rank = rank
+        self._seed_seq = np.random.SeedSequence(seed)
+
+        if kind == "orthogonal" and num_states > self._dim:
+            raise ValueError(
+                f"At most {self._dim} mutually orthogonal states exist in dimension {self._dim}."
+            )
+
+    def __len__(self) -> int:
+        if self._num_ensembles is None:
+            raise TypeError("An infinite stream of ensembles has no length.")
+        return self._num_ensembles
+
+    def __iter__(self) -> Iterator[Ensemble]:
+        index = 0
+        while self._num_ensembles is None or index < self._num_ensembles:
+            for states in self.batch(index // self._batch_size):
+                if (
+                    self._num_ensembles is not None
+                    and index >= self._num_ensembles
+                ):
+                    return
+                yield self._ensemble(states)
+                index += 1
+
+    @property
+    def seed(self) -> int:
+        """The entropy of the seed sequence, which reproduces the whole stream."""
+        return self._seed_seq.entropy
+
+    def batch(self, k: int) -> np.ndarray:
+        """Returns the states of the `k`-th batch of ensembles.
+
+        The result has shape `(batch_size, num_states, dim)` for pure states,
+        `(batch_size, num_states, dim, dim)` for mixed states and
+        `(batch_size, num_states, sum(dims))` for product states, whose local vectors are
+        concatenated.
+        """
+        start = k * self._batch_size
+        return np.stack(
+            [self._sample(start + i) for i in range(self._batch_size)]
+        )
+
+    def ensemble_at(self, k: int) -> Ensemble:
+        """Returns the `k`-th ensemble of the stream."""
+        if (
+            self._num_ensembles is not None
+            and not 0 <= k < self._num_ensembles
+        ):
+            raise IndexError(
+                f"Ensemble {k} is out of range for a stream of {self._num_ensembles}."
+            )
+        return self._ensemble(self._sample(k))
+
+    def _sample(self, index: int) -> np.ndarray:
+        """Returns the states of the `index`-th ensemble, in the layout of :code:`batch`."""
+        rng = np.random.default_rng(
+            np.random.SeedSequence(self._seed_seq.entropy, spawn_key=(index,))
+        )
+        if self._kind == "pure":
+            return haar_states(rng, self._num_states, self._dim)
+        if self._kind == "mixed":
+            return random_density_matrices(
+                rng, self._num_states, self._dim, self._rank
+            )
+        if self._kind == "product":
+            return local_states(rng, self._num_states, self._dims)
+
+        # The first columns of a unitary are mutually orthogonal.
+        unitary = haar_unitaries(rng, 1, self._dim)[0]
+        return unitary[:, : self._num_states].T
+
+    def _ensemble(self, states: np.ndarray) -> Ensemble:
+        """Wraps the sampled vectors or density matrices of one ensemble."""
+        if self._kind == "product":
+            splits = np.cumsum(self._dims)[:-1]
+            return Ensemble(
+                [ProductState(np.split(state, splits)) for state in states]
+            )
+        if states.ndim == 2:
+            states = states[:, :, np.newaxis]
+        return Ensemble([State(state, self._dims) for state in states])
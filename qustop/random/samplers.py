@@ -0,0 +1,106 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Batched samplers of random quantum states and unitaries."""
+import numpy as np
+
+
+def _ginibre(rng: np.random.Generator, shape: tuple[int, ...]) -> np.ndarray:
+    """Returns an array of i.i.d. standard complex Gaussian entries."""
+    return (
+        rng.standard_normal(shape) + 1j * rng.standard_normal(shape)
+    ) / np.sqrt(2)
+
+
+def haar_states(rng: np.random.Generator, num: int, dim: int) -> np.ndarray:
+    """Returns `num` Haar random pure states of dimension `dim` as the rows of an array.
+
+    Args:
+        rng: The random number generator to draw from.
+        num: The number of states.
+        dim: The dimension of each state.
+    """
+    vecs = _ginibre(rng, (num, dim))
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def haar_unitaries(rng: np.random.Generator, num: int, dim: int) -> np.ndarray:
+    """Returns an array of shape `(num, dim, dim)` of Haar random unitaries.
+
+    The QR decomposition of a stack of Ginibre matrices is taken at once, and the phases of the
+    diagonal of `R` are absorbed into `Q` so that the distribution is exactly the Haar measure.
+
+    Args:
+        rng: The random number generator to draw from.
+        num: The number of unitaries.
+        dim: The dimension of each unitary.
+    """
+    q_mat, r_mat = np.linalg.qr(_ginibre(rng, (num, dim, dim)))
+    diag = np.diagonal(r_mat, axis1=1, axis2=2)
+    return q_mat * (diag / np.abs(diag))[:, np.newaxis, :]
+
+
+def random_density_matrices(
+    rng: np.random.Generator, num: int, dim: int, rank: int = None
+) -> np.ndarray:
+    """Returns an array of shape `(num, dim, dim)` of random density matrices.
+
+    The matrices are distributed according to the Hilbert-Schmidt measure when `rank` is `dim`
+    and are otherwise the partial traces of Haar random pure states on a `dim * rank` system.
+
+    Args:
+        rng: The random number generator to draw from.
+        num: The number of density matrices.
+        dim: The dimension of each density matrix.
+        rank: The rank of each density matrix, `dim` by default.
+    """
+    rank = dim if rank is None else rank
+    gin = _ginibre(rng, (num, dim, rank))
+    rho = gin @ gin.conj().transpose(0, 2, 1)
+    return (
+        rho / np.trace(rho, axis1=1, axis2=2).real[:, np.newaxis, np.newaxis]
+    )
+
+
+def local_states(
+    rng: np.random.Generator, num: int, dims: list[int]
+) -> np.ndarray:
+    """Returns the Haar random local pure states of `num` product states as the rows of an array.
+
+    Each row concatenates the local vectors of one product state, so it has `sum(dims)` entries.
+
+    Args:
+        rng: The random number generator to draw from.
+        num: The number of states.
+        dims: The dimension of each local system.
+    """
+    return np.concatenate([haar_states(rng, num, dim) for dim in dims], axis=1)
+
+
+def product_states(
+    rng: np.random.Generator, num: int, dims: list[int]
+) -> np.ndarray:
+    """Returns `num` products of Haar random local pure states as the rows of an array.
+
+    Args:
+        rng: The random number generator to draw from.
+        num: The number of states.
+        dims: The dimension of each local system.
+    """
+    vecs = np.ones((num, 1), dtype=complex)
+    for local in np.split(
+        local_states(rng, num, dims), np.cumsum(dims)[:-1], axis=1
+    ):
+        vecs = np.einsum("ni,nj->nij", vecs, local).reshape(num, -1)
+    return vecs
@@ -0,0 +1,95 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import numpy as np
+import pytest
+
+from qustop import ProductState
+from qustop.random import EnsembleSampler
+
+
+@pytest.mark.parametrize("kind", ["pure", "mixed", "product", "orthogonal"])
+def test_ensemble_at_matches_stream(kind):
+    """Each ensemble of the stream can be regenerated on its own."""
+    sampler = EnsembleSampler(
+        kind, 3, [2, 2], num_ensembles=10, seed=1, batch_size=4
+    )
+    ensembles = list(sampler)
+    assert len(ensembles) == len(sampler) == 10
+
+    for k in [0, 5, 9]:
+        for rho, sigma in zip(
+            ensembles[k].density_matrices,
+            sampler.ensemble_at(k).density_matrices,
+        ):
+            np.testing.assert_allclose(rho, sigma)
+        assert ensembles[k].dims == [2, 2]
+
+
+def test_stream_reproducible_from_seed():
+    """Two streams with the same seed are identical, different seeds differ."""
+    first = next(iter(EnsembleSampler("pure", 2, [3], seed=5)))
+    second = next(iter(EnsembleSampler("pure", 2, [3], seed=5)))
+    third = next(iter(EnsembleSampler("pure", 2, [3], seed=6)))
+    np.testing.assert_allclose(first[0].value, second[0].value)
+    assert not np.allclose(first[0].value, third[0].value)
+
+
+@pytest.mark.parametrize("kind", ["pure", "mixed", "product", "orthogonal"])
+def test_stream_independent_of_batch_size(kind):
+    """The ensembles of a stream do not depend on the batch size they are drawn in."""
+    streams = [
+        list(
+            EnsembleSampler(
+                kind, 3, [2, 2], num_ensembles=7, seed=2, batch_size=size
+            )
+        )
+        for size in [1, 3, 256]
+    ]
+    for ensembles in streams[1:]:
+        for first, second in zip(streams[0], ensembles):
+            np.testing.assert_allclose(
+                first.density_matrices, second.density_matrices
+            )
+
+
+def test_product_ensembles():
+    """Product ensembles consist of product states."""
+    ensemble = EnsembleSampler("product", 3, [2, 3], seed=0).ensemble_at(2)
+    assert all(isinstance(state, ProductState) for state in ensemble)
+    assert [len(vector) for vector in ensemble[0].vectors] == [2, 3]
+    np.testing.assert_allclose(np.trace(ensemble[1].value), 1, atol=1e-12)
+
+
+def test_orthogonal_ensembles():
+    """Orthogonal ensembles consist of mutually orthogonal pure states."""
+    ensemble = EnsembleSampler("orthogonal", 4, [2, 2], seed=0).ensemble_at(3)
+    rhos = ensemble.density_matrices
+    overlaps = np.array(
+        [[np.trace(rho @ sigma) for sigma in rhos] for rho in rhos]
+    )
+    np.testing.assert_allclose(overlaps, np.identity(4), atol=1e-12)
+
+
+def test_invalid_sampler():
+    """Unsupported kinds and too many orthogonal states are rejected."""
+    with np.testing.assert_raises(ValueError):
+        EnsembleSampler("gaussian", 2, [2])
+    with np.testing.assert_raises(ValueError):
+        EnsembleSampler("orthogonal", 3, [2])
+    with np.testing.assert_raises(IndexError):
+        EnsembleSampler("pure", 2, [2], num_ensembles=3).ensemble_at(3)
+    with np.testing.assert_raises(TypeError):
+        len(EnsembleSampler("pure", 2, [2]))
@@ -0,0 +1,65 @@
+# Copyright (C) 2021 Vincent Russo
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import numpy as np
+from toqito.matrix_props import is_density
+
+from qustop.random import (
+    haar_states,
+    haar_unitaries,
+    product_states,
+    random_density_matrices,
+)
+
+
+def test_haar_states_normalized():
+    """Haar random states are unit vectors."""
+    vecs = haar_states(np.random.default_rng(0), 10, 3)
+    np.testing.assert_equal(vecs.shape, (10, 3))
+    np.testing.assert_allclose(np.linalg.norm(vecs, axis=1), 1)
+
+
+def test_haar_unitaries_unitary():
+    """Haar random unitaries are unitary."""
+    unitaries = haar_unitaries(np.random.default_rng(0), 5, 4)
+    np.testing.assert_allclose(
+        unitaries @ unitaries.conj().transpose(0, 2, 1),
+        np.broadcast_to(np.identity(4), (5, 4, 4)),
+        atol=1e-12,
+    )
+
+
+def test_random_density_matrices_rank():
+    """Random density matrices are valid and of the requested rank."""
+    rhos = random_density_matrices(np.random.default_rng(0), 5, 4, rank=2)
+    assert all(is_density(rho) for rho in rhos)
+    np.testing.assert_equal(np.linalg.matrix_rank(rhos), [2] * 5)
+
+
+def test_product_states():
+    """Product states have Schmidt rank one across the subsystems."""
+    vecs = product_states(np.random.default_rng(0), 4, [2, 3])
+    np.testing.assert_equal(vecs.shape, (4, 6))
+    np.testing.assert_equal(
+        np.linalg.matrix_rank(vecs.reshape(4, 2, 3)), [1] * 4
+    )
+
+
+def test_samplers_reproducible():
+    """Samplers only depend on the state of the generator."""
+    np.testing.assert_allclose(
+        haar_states(np.random.default_rng(7), 3, 2),
+        haar_states(np.random.default_rng(7), 3, 2),
+    )
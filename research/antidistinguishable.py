@@ -12,19 +12,166 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
-import pickle
+"""Screen random ensembles of pure states for antidistinguishability.
+
+A set of states is antidistinguishable if a measurement exists that never outputs the state that
+was prepared, i.e. if the optimal value of the conclusive state exclusion SDP is zero. Most random
+ensembles are decided by cheap conditions on their Gram matrix, so only the remaining ones are
+passed to the SDP in a pool of worker processes:
+
+    1. Any orthogonal pair of states can be excluded by projecting onto one of them.
+    2. Two states are antidistinguishable if and only if they are orthogonal.
+    3. Three pure states with squared overlaps `a`, `b` and `c` are antidistinguishable if and
+       only if `a + b + c < 1` and `(1 - a - b - c)^2 >= 4abc` (Caves, Fuchs and Schack,
+       Phys. Rev. A 66, 062111).
+    4. `n` pure states with all overlaps larger than `(n - 2) / (n - 1)` are never
+       antidistinguishable (Johnston, Russo and Sikora, 2023).
+
+Each result is appended to a JSONL file as soon as it is known, and the number of ensembles
+decided by each stage is kept in a sidecar JSON file.
+"""
+import itertools
+import json
+import multiprocessing
+import time
+from collections import Counter
+from typing import Iterable, Iterator, Optional
 
 import numpy as np
 
 from qustop import Ensemble, OptExclude, State
+from qustop.random import EnsembleSampler
 
+STAGES = (
+    "orthogonal_pair",
+    "two_states",
+    "three_pure_states",
+    "overlap_bound",
+    "sdp",
+)
 
-def generate_random_ensemble(dim: int) -> np.ndarray:
-    pass
 
+def overlaps(ensemble: Ensemble) -> np.ndarray:
+    """Returns the matrix of overlaps `tr(rho_i rho_j)` between the states of the ensemble.
 
-if __name__ == "__main__":
-    ensemble = generate_random_ensemble(2)
+    For pure states, these are the squared absolute values of the entries of the Gram matrix.
+    """
+    vecs = np.array([state.flatten() for state in ensemble.density_matrices])
+    return np.real(vecs.conj() @ vecs.T)
+
+
+def screen(
+    ensemble: Ensemble, tol: float = 1e-10
+) -> tuple[Optional[bool], Optional[str]]:
+    """Decides antidistinguishability from the overlaps of the states if possible.
+
+    Returns the decision together with the stage that made it, or `(None, None)` if the ensemble
+    needs to be passed to the SDP.
+    """
+    num_states = len(ensemble)
+    fid = overlaps(ensemble)
+    off_diag = fid[~np.eye(num_states, dtype=bool)]
+
+    if num_states > 1 and np.min(off_diag) <= tol:
+        return True, "orthogonal_pair"
+    if num_states <= 2:
+        return False, "two_states"
+
+    # The remaining conditions only hold for pure states.
+    if not np.allclose(np.diag(fid), 1):
+        return None, None
+
+    if num_states == 3:
+        a, b, c = fid[0, 1], fid[0, 2], fid[1, 2]
+        decision = a + b + c < 1 and (1 - a - b - c) ** 2 >= 4 * a * b * c
+        return bool(decision), "three_pure_states"
+
+    if np.min(np.sqrt(off_diag)) > (num_states - 2) / (num_states - 1):
+        return False, "overlap_bound"
+    return None, None
 
 
-#    OptExclude(ensemble, "unambiguous")
+def solve_exclusion(
+    item: tuple[int, list[np.ndarray]], tol: float = 1e-6
+) -> dict:
+    """Solves the conclusive state exclusion SDP for an undecided ensemble.
+
+    The ensemble is passed as a list of density matrices to keep the messages to the worker
+    processes small.
+    """
+    index, states = item
+    ensemble = Ensemble([State(state, [state.shape[0]]) for state in states])
+    res = OptExclude(ensemble, "min-error")
+    res.solve()
+    return {
+        "index": index,
+        "antidistinguishable": bool(res.value <= tol),
+        "stage": "sdp",
+        "value": res.value,
+        "time": res.stats.total_time,
+    }
+
+
+def run(
+    ensembles: Iterable[Ensemble],
+    path: str,
+    num_workers: Optional[int] = None,
+    batch_size: int = 256,
+) -> Counter:
+    """Screens the ensembles and streams one JSON record per ensemble to `path`.
+
+    The ensembles are consumed in batches of `batch_size`, so arbitrarily long streams can be
+    screened. Returns the number of decisions `(stage, antidistinguishable)` made by each stage,
+    which are also written to `path + ".counts.json"` after every batch.
+    """
+    counts = Counter()
+    ensembles: Iterator[Ensemble] = iter(ensembles)
+    offset = 0
+    with open(path, "w") as out, multiprocessing.Pool(num_workers) as pool:
+        while batch := list(itertools.islice(ensembles, batch_size)):
+            undecided = []
+            for index, ensemble in enumerate(batch, start=offset):
+                start = time.perf_counter()
+                decision, stage = screen(ensemble)
+                if decision is None:
+                    undecided.append((index, ensemble.density_matrices))
+                    continue
+                record = {
+                    "index": index,
+                    "antidistinguishable": decision,
+                    "stage": stage,
+                    "value": None,
+                    "time": time.perf_counter() - start,
+                }
+                out.write(json.dumps(record) + "\n")
+                counts[stage, decision] += 1
+
+            for record in pool.imap_unordered(solve_exclusion, undecided):
+                out.write(json.dumps(record) + "\n")
+                counts["sdp", record["antidistinguishable"]] += 1
+
+            out.flush()
+            offset += len(batch)
+            write_counts(counts, path + ".counts.json")
+    return counts
+
+
+def write_counts(counts: Counter, path: str) -> None:
+    """Writes the number of ensembles decided by each stage to `path`."""
+    summary = {
+        stage: {
+            "antidistinguishable": counts[stage, True],
+            "not_antidistinguishable": counts[stage, False],
+        }
+        for stage in STAGES
+    }
+    with open(path, "w") as out:
+        json.dump(summary, out, indent=2)
+
+
+if __name__ == "__main__":
+    stream = EnsembleSampler("pure", 4, [3], num_ensembles=10_000, seed=2021)
+    for (stage, decision), count in sorted(
+        run(stream, "antidistinguishable.jsonl").items()
+    ):
+        print(f"{stage} (antidistinguishable={decision}): {count}")
@@ -12,46 +12,71 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
-import pickle
-
 import numpy as np
-from scipy.stats import unitary_group
-
-from qustop import Ensemble, OptDist, State
 
+from qustop import OptDist
+from qustop.io import ResultsLog
+from qustop.random import EnsembleSampler
 
-def generate_random_two_copy_ensemble(num_states: int) -> Ensemble:
-    # Generate an ensemble of random mutually orthogonal and pure states.
-    # In this case, the ensemble consists of four states, but we could
-    # potentially have any n >= 1 number of states in the ensemble.
-    group = unitary_group.rvs(num_states)
-    states = [np.atleast_2d(group[:, i]).T for i in range(num_states)]
 
-    # Create the two-copy ensemble.
-    dims = [2] * num_states
-    ensemble = [
-        State(np.kron(state, state), dims) for _, state in enumerate(states)
-    ]
-    return Ensemble(ensemble)
+def run(
+    num_states: int,
+    num_trials: int,
+    seed: int = 2021,
+    log_path: str = "two_copy_problem.jsonl",
+    dims: tuple[int, int] = (2, 2),
+) -> None:
+    # Random mutually orthogonal and pure states shared by Alice and Bob, who
+    # hold subsystems of dimensions `dims`. In this case, the ensemble
+    # consists of four states, but we could potentially have any number of
+    # states up to the dimension of the ensemble. The stream is
+    # reproducible from the seed, so an interrupted search resumes with the
+    # ensembles missing from the log.
+    sampler = EnsembleSampler(
+        "orthogonal", num_states, list(dims), num_trials, seed
+    )
+    with ResultsLog(log_path) as log:
+        for index, ensemble in enumerate(sampler):
+            # The two copies are ordered A_1 A_2 B_1 B_2, so that the PPT
+            # cut separates Alice's copies from Bob's.
+            ensemble_2_copies = ensemble.copies(2)
+            fingerprint = ensemble_2_copies.fingerprint
+            if fingerprint in log:
+                continue
 
+            # Solve the two-copy PPT distinguishability SDPs. Only whether the
+            # value is within 1e-3 of 1 matters, so the SDP is screened at a
+            # loose tolerance and only refined close to that boundary.
+            ppt_2_copy = OptDist(
+                ensemble_2_copies,
+                "ppt",
+                "min-error",
+                threshold=0.999,
+                band=5e-4,
+            )
+            ppt_2_copy.solve()
 
-def run(num_states: int, num_trials: int) -> None:
-    for test in range(num_trials):
-        ensemble_2_copies = generate_random_two_copy_ensemble(num_states)
+            # If the PPT value of the two-copy ensemble is below some
+            # threshold of perfect distinguishability, such an example has
+            # been found, in which case, we want to ensure we capture the
+            # values and states!
+            found = not np.isclose(ppt_2_copy.value, 1, atol=0.001)
+            log.write(
+                {
+                    "fingerprint": fingerprint,
+                    "index": index,
+                    "value": ppt_2_copy.value,
+                    "found": found,
+                    "time": ppt_2_copy.stats.total_time,
+                    "refined": ppt_2_copy.refined,
+                },
+                arrays={"states": np.array(ensemble.density_matrices)}
+                if found
+                else None,
+            )
 
-        # Solve the two-copy PPT distinguishability SDPs.
-        ppt_2_copy = OptDist(ensemble_2_copies, "ppt", "min-error")
-        ppt_2_copy.solve()
-
-        # If the PPT value of the two-copy ensemble is below some threshold
-        # of perfect distinguishability, such an example has been found, in
-        # which case, we want to ensure we capture the values and states!
-        if not np.isclose(ppt_2_copy.value, 1, atol=0.001):
+            # In any case, print out the two-copy values of the ensembles
+            # as we progress through the trials.
             print(f"PPT 2-copy: {ppt_2_copy.value}")
-            with open("FOUND.pickle", "wb") as f:
-                pickle.dump([ensemble_2_copies], f)
-            break
-
-        # In any case, print out the two-copy values of the ensembles
-        # as we progress through the trials.
-        print(f"PPT 2-copy: {ppt_2_copy.value}")
+            if found:
+                break
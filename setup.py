@@ -33,5 +33,6 @@ setuptools.setup(
     ],
     python_requires=">=3.9",
     install_requires=requirements,
+    entry_points={"console_scripts": ["qustop=qustop.batch.cli:main"]},
     test_suite="tests",
 )